@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Analysis Shards
+Partitions work by key across worker processes and merges results back in the parent
+"""
+
+import multiprocessing
+import queue
+import threading
+import time
+import zlib
+from typing import Dict, List, Any, Optional, Callable
+
+STATS_INTERVAL = 5.0  # seconds between worker stats reports
+
+
+def shard_for(key: str, shards: int) -> int:
+    """Stable shard for a key (same signature -> same worker, across restarts)."""
+    return zlib.crc32((key or "").encode("utf-8")) % shards
+
+
+def _worker_main(shard: int, initializer: Callable[[], None], handler: Callable[..., Any],
+                 reporter: Optional[Callable[[], Dict[str, Any]]], inbox, outbox):
+    """Worker process loop: initialise once, then handle (seq, args) items until None."""
+    try:
+        initializer()
+    except Exception as e:
+        outbox.put(("failed", shard, f"{type(e).__name__}: {e}"))
+        return
+    outbox.put(("ready", shard, None))
+    last_report = time.monotonic()
+    while True:
+        item = inbox.get()
+        if item is None:
+            break
+        seq, args = item
+        try:
+            outbox.put(("result", seq, (handler(*args), None)))
+        except Exception as e:
+            outbox.put(("result", seq, (None, f"{type(e).__name__}: {e}")))
+        if reporter and time.monotonic() - last_report >= STATS_INTERVAL:
+            last_report = time.monotonic()
+            try:
+                outbox.put(("stats", shard, reporter()))
+            except Exception:
+                pass
+
+
+class ShardPool:
+    """N worker processes, each owning the keys that hash to it.
+
+    ``initializer`` runs once per worker (load indexes, open clients) and
+    ``handler(*args)`` runs per item; both must be importable top-level
+    functions so they can be sent to spawned processes. Results come back
+    over one shared queue and ``on_result(context, result, error)`` runs on
+    a single merge thread in the parent, so the central state it updates is
+    only ever written from one place. ``context`` never leaves the parent.
+
+    Each worker's inbox is bounded by ``queue_size``: a full shard blocks
+    ``submit`` (backpressure) rather than growing memory. Crashed workers are
+    restarted; their in-flight items fail after ``result_timeout``.
+    """
+
+    def __init__(self, shards: int, initializer: Callable[[], None], handler: Callable[..., Any],
+                 on_result: Callable[[Any, Any, Optional[str]], None],
+                 reporter: Optional[Callable[[], Dict[str, Any]]] = None,
+                 queue_size: int = 1000, result_timeout: float = 300.0):
+        """Create the pool; call start() to spawn the workers."""
+        self.shards = shards
+        self.initializer = initializer
+        self.handler = handler
+        self.on_result = on_result
+        self.reporter = reporter
+        self.queue_size = queue_size
+        self.result_timeout = result_timeout
+        self._ctx = multiprocessing.get_context("spawn")
+        self._inboxes = [self._ctx.Queue(maxsize=queue_size) for _ in range(shards)]
+        self._outbox = self._ctx.Queue()
+        self._processes: List[Optional[multiprocessing.Process]] = [None] * shards
+        self._pending: Dict[int, tuple] = {}
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._closing = False
+        self._merger: Optional[threading.Thread] = None
+        self.worker_stats: Dict[int, Dict[str, Any]] = {}
+        self.stats = [{"submitted": 0, "completed": 0, "errors": 0, "timed_out": 0, "restarts": 0,
+                       "ready": False, "total_ms": 0.0} for _ in range(shards)]
+
+    def start(self):
+        for shard in range(self.shards):
+            self._spawn(shard)
+        self._stop.clear()
+        self._merger = threading.Thread(target=self._merge_loop, daemon=True)
+        self._merger.start()
+        print(f"✅ Started {self.shards} analysis shard processes")
+
+    def _spawn(self, shard: int):
+        process = self._ctx.Process(
+            target=_worker_main, name=f"analysis-shard-{shard}", daemon=True,
+            args=(shard, self.initializer, self.handler, self.reporter, self._inboxes[shard], self._outbox))
+        process.start()
+        self._processes[shard] = process
+
+    def submit(self, key: str, args: tuple, context: Any = None) -> int:
+        """Queue ``handler(*args)`` on the shard owning ``key``; blocks while that shard is full."""
+        shard = shard_for(key, self.shards)
+        with self._lock:
+            self._seq += 1
+            seq = self._seq
+            self._pending[seq] = (context, shard, time.monotonic())
+            self.stats[shard]["submitted"] += 1
+        self._inboxes[shard].put((seq, args))
+        return seq
+
+    def pending_count(self) -> int:
+        """Items submitted but not yet merged, across all shards."""
+        return len(self._pending)
+
+    def _merge_loop(self):
+        last_check = time.monotonic()
+        while not self._stop.is_set():
+            try:
+                kind, ident, payload = self._outbox.get(timeout=1.0)
+            except queue.Empty:
+                kind = None
+            except (EOFError, OSError):
+                break
+            if kind == "result":
+                self._deliver(ident, *payload)
+            elif kind == "ready":
+                self.stats[ident]["ready"] = True
+            elif kind == "stats":
+                self.worker_stats[ident] = payload
+            elif kind == "failed":
+                print(f"❌ Analysis shard {ident} failed to start: {payload}")
+            if time.monotonic() - last_check >= 1.0:
+                last_check = time.monotonic()
+                self._check_workers()
+
+    def _deliver(self, seq: int, result: Any, error: Optional[str]):
+        with self._lock:
+            entry = self._pending.pop(seq, None)
+            if entry is None:
+                return  # already timed out
+            context, shard, submitted = entry
+            counters = self.stats[shard]
+            counters["completed"] += 1
+            counters["errors"] += 1 if error else 0
+            counters["total_ms"] += (time.monotonic() - submitted) * 1000
+        try:
+            self.on_result(context, result, error)
+        except Exception as e:
+            print(f"❌ Failed to merge shard result: {e}")
+
+    def _check_workers(self):
+        if self._closing:
+            return
+        for shard, process in enumerate(self._processes):
+            if process is not None and not process.is_alive():
+                print(f"⚠️ Analysis shard {shard} exited ({process.exitcode}); restarting")
+                self.stats[shard]["restarts"] += 1
+                self.stats[shard]["ready"] = False
+                self._spawn(shard)
+        cutoff = time.monotonic() - self.result_timeout
+        with self._lock:
+            expired = [(seq, entry) for seq, entry in self._pending.items() if entry[2] < cutoff]
+            for seq, (_, shard, _) in expired:
+                del self._pending[seq]
+                self.stats[shard]["timed_out"] += 1
+        for _, (context, _, _) in expired:
+            try:
+                self.on_result(context, None, "timed out waiting for shard")
+            except Exception as e:
+                print(f"❌ Failed to merge shard result: {e}")
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            pending = [0] * self.shards
+            for _, shard, _ in self._pending.values():
+                pending[shard] += 1
+            shards = []
+            for shard, counters in enumerate(self.stats):
+                process = self._processes[shard]
+                completed = counters["completed"]
+                shards.append({
+                    "shard": shard,
+                    "pid": process.pid if process is not None else None,
+                    "alive": bool(process is not None and process.is_alive()),
+                    "ready": counters["ready"],
+                    "pending": pending[shard],
+                    "submitted": counters["submitted"],
+                    "completed": completed,
+                    "errors": counters["errors"],
+                    "timed_out": counters["timed_out"],
+                    "restarts": counters["restarts"],
+                    "avg_latency_ms": round(counters["total_ms"] / completed, 1) if completed else 0.0,
+                    "worker": self.worker_stats.get(shard),
+                })
+        return {"shards": self.shards, "pending": sum(pending), "workers": shards}
+
+    def stop(self, timeout: float = 10.0):
+        """Let workers finish queued items, then stop them."""
+        self._closing = True
+        for inbox in self._inboxes:
+            try:
+                inbox.put(None, timeout=1.0)
+            except queue.Full:
+                pass
+        deadline = time.monotonic() + timeout
+        for process in self._processes:
+            if process is not None:
+                process.join(max(0.0, deadline - time.monotonic()))
+                if process.is_alive():
+                    process.terminate()
+        # Give the merge thread a moment to deliver results already sent
+        while self._pending and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self._stop.set()
+        if self._merger is not None:
+            self._merger.join(timeout=5)
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Analytics Export
+Appends analyses and ticket versions from the event store to day-partitioned, compressed Parquet files
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Iterator
+
+try:
+    import pyarrow
+    import pyarrow.csv
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+CHECKPOINT_FILE = "_checkpoint.json"
+DATASETS = ("analyses", "tickets")
+
+
+def _schemas() -> Dict[str, Any]:
+    timestamp = pyarrow.timestamp("us")
+    return {
+        "analyses": pyarrow.schema([
+            ("store_id", pyarrow.int64()), ("timestamp", timestamp), ("alert_code", pyarrow.string()),
+            ("severity", pyarrow.string()), ("category", pyarrow.string()), ("action", pyarrow.string()),
+            ("heal_action", pyarrow.string()), ("kedb_match", pyarrow.string()),
+            ("support_hours_saved", pyarrow.float64()), ("latency_ms", pyarrow.float64()),
+            ("analyzed_by", pyarrow.string()), ("kedb_version", pyarrow.int64()),
+            ("prompt_tokens", pyarrow.int64()), ("ticket_id", pyarrow.string()), ("anomaly", pyarrow.string()),
+        ]),
+        "tickets": pyarrow.schema([
+            ("version", pyarrow.int64()), ("ticket_id", pyarrow.string()), ("timestamp", timestamp),
+            ("alert_code", pyarrow.string()), ("severity", pyarrow.string()), ("category", pyarrow.string()),
+            ("status", pyarrow.string()), ("anomaly", pyarrow.string()), ("assignee", pyarrow.string()),
+            ("resolution", pyarrow.string()),
+        ]),
+    }
+
+
+def _parse_time(value: Any) -> Optional[datetime]:
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+
+def _number(value: Any, kind=float):
+    try:
+        return kind(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def analysis_row(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """Flatten a stored analysis entry into an export row."""
+    analysis = entry.get("analysis") or {}
+    return {
+        "store_id": entry["row_id"],
+        "timestamp": _parse_time(entry.get("timestamp")),
+        "alert_code": entry.get("alert_code"),
+        "severity": analysis.get("severity"),
+        "category": analysis.get("category"),
+        "action": analysis.get("action"),
+        "heal_action": analysis.get("heal_action"),
+        "kedb_match": analysis.get("kedb_match"),
+        "support_hours_saved": _number(analysis.get("support_hours_saved")),
+        "latency_ms": _number(analysis.get("latency_ms")),
+        "analyzed_by": analysis.get("analyzed_by"),
+        "kedb_version": _number(analysis.get("kedb_version"), int),
+        "prompt_tokens": _number(analysis.get("prompt_tokens"), int),
+        "ticket_id": analysis.get("ticket_id"),
+        "anomaly": analysis.get("anomaly"),
+    }
+
+
+def ticket_row(ticket: Dict[str, Any]) -> Dict[str, Any]:
+    """One ticket version as an export row (``version`` orders the versions of a ticket)."""
+    return {
+        "version": ticket["row_id"],
+        "ticket_id": ticket.get("ticket_id"),
+        "timestamp": _parse_time(ticket.get("timestamp")),
+        **{field: ticket.get(field) for field in ("alert_code", "severity", "category", "status", "anomaly",
+                                                   "assignee", "resolution")},
+    }
+
+
+class _StreamSink:
+    """Write-only file object whose bytes are collected and handed out as they are produced."""
+
+    closed = False
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class AnalyticsExporter:
+    """Incremental export of the event store for analytics tooling (pandas, DuckDB, Spark).
+
+    Layout: ``<export_dir>/<dataset>/day=YYYY-MM-DD/part-<first>-<last>.parquet``,
+    readable as one dataset with ``pandas.read_parquet("<export_dir>/analyses")``.
+    Each run reads rows written since the last committed store id and appends
+    one zstd-compressed part per day touched; existing parts are never
+    rewritten. A run commits by advancing ``_checkpoint.json`` after its parts
+    are in place, so parts left by an interrupted run are discarded and
+    re-exported on resume. Tickets are exported once per version (every
+    status change), ordered by ``version``.
+    """
+
+    def __init__(self, store, export_dir: str = "analytics", interval: float = 300.0,
+                 batch_size: int = 50000, compression: str = "zstd"):
+        """``store`` is the EventStore to export from."""
+        if pyarrow is None:
+            raise ImportError("pyarrow is required for analytics export. Install with: pip install pyarrow")
+        self.store = store
+        self.export_dir = export_dir
+        self.interval = interval
+        self.batch_size = batch_size
+        self.compression = compression
+        self.schemas = _schemas()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {dataset: {"rows": 0, "parts": 0, "runs": 0, "last_run": None, "last_error": None}
+                      for dataset in DATASETS}
+        self.checkpoint = self._recover()
+
+    # -------------------------------------------------------------- checkpoint
+
+    def _checkpoint_path(self) -> str:
+        return os.path.join(self.export_dir, CHECKPOINT_FILE)
+
+    def _recover(self) -> Dict[str, int]:
+        """Load the committed checkpoint and drop parts from interrupted runs."""
+        checkpoint = {dataset: 0 for dataset in DATASETS}
+        try:
+            with open(self._checkpoint_path(), "r", encoding="utf-8") as f:
+                checkpoint.update(json.load(f))
+        except FileNotFoundError:
+            pass
+        for dataset in DATASETS:
+            for path, first_id, _ in self._parts(dataset):
+                if first_id is None or first_id > checkpoint[dataset]:
+                    os.remove(path)
+                    print(f"🧹 Removed uncommitted export part {path}")
+        return checkpoint
+
+    def _save_checkpoint(self):
+        path = self._checkpoint_path()
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(self.checkpoint, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+
+    def _parts(self, dataset: str, since_day: str = "", until_day: str = "9999") -> Iterator[tuple]:
+        """(path, first id, last id) of each part file in day order; ids are None for stray files."""
+        root = os.path.join(self.export_dir, dataset)
+        if not os.path.isdir(root):
+            return
+        for day_dir in sorted(os.listdir(root)):
+            day = day_dir[len("day="):]
+            if not day_dir.startswith("day=") or not since_day <= day <= until_day:
+                continue
+            for name in sorted(os.listdir(os.path.join(root, day_dir))):
+                ids = name[len("part-"):-len(".parquet")].split("-") if name.endswith(".parquet") else []
+                path = os.path.join(root, day_dir, name)
+                if len(ids) == 2 and all(part.isdigit() for part in ids):
+                    yield path, int(ids[0]), int(ids[1])
+                else:
+                    yield path, None, None
+
+    # ------------------------------------------------------------------ export
+
+    def export_once(self) -> Dict[str, int]:
+        """Export everything written since the last run; returns rows exported per dataset."""
+        exported = {}
+        with self._lock:
+            for dataset in DATASETS:
+                stats = self.stats[dataset]
+                try:
+                    exported[dataset] = self._export_dataset(dataset)
+                    stats["last_error"] = None
+                except Exception as e:
+                    exported[dataset] = 0
+                    stats["last_error"] = f"{type(e).__name__}: {e}"
+                    print(f"❌ Analytics export of {dataset} failed: {e}")
+                stats["runs"] += 1
+                stats["last_run"] = datetime.now().isoformat()
+        return exported
+
+    def _export_dataset(self, dataset: str) -> int:
+        to_row = analysis_row if dataset == "analyses" else ticket_row
+        total = 0
+        batch: List[Dict[str, Any]] = []
+        for entry in self.store.iter_changes(dataset, after_id=self.checkpoint[dataset]):
+            batch.append(to_row(entry))
+            if len(batch) >= self.batch_size:
+                total += self._commit_batch(dataset, batch)
+                batch = []
+        if batch:
+            total += self._commit_batch(dataset, batch)
+        return total
+
+    def _commit_batch(self, dataset: str, rows: List[Dict[str, Any]]) -> int:
+        id_field = "store_id" if dataset == "analyses" else "version"
+        first_id, last_id = rows[0][id_field], rows[-1][id_field]
+        by_day: Dict[str, List[Dict[str, Any]]] = {}
+        for row in rows:
+            day = row["timestamp"].strftime("%Y-%m-%d") if row["timestamp"] else "unknown"
+            by_day.setdefault(day, []).append(row)
+
+        # All parts of a batch land before the checkpoint moves past it
+        name = f"part-{first_id:012d}-{last_id:012d}.parquet"
+        for day, day_rows in by_day.items():
+            day_dir = os.path.join(self.export_dir, dataset, f"day={day}")
+            os.makedirs(day_dir, exist_ok=True)
+            path = os.path.join(day_dir, name)
+            table = pyarrow.Table.from_pylist(day_rows, schema=self.schemas[dataset])
+            pyarrow.parquet.write_table(table, path + ".tmp", compression=self.compression)
+            os.replace(path + ".tmp", path)
+        self.checkpoint[dataset] = last_id
+        self._save_checkpoint()
+        self.stats[dataset]["rows"] += len(rows)
+        self.stats[dataset]["parts"] += len(by_day)
+        return len(rows)
+
+    # ------------------------------------------------------------------- reads
+
+    def stream(self, dataset: str, since: Optional[str] = None, until: Optional[str] = None,
+               fmt: str = "parquet") -> Iterator[bytes]:
+        """Exported rows with ``since <= timestamp < until`` as one Parquet or CSV byte stream.
+
+        Only the day partitions overlapping the range are read, one part at a time.
+        """
+        if dataset not in DATASETS:
+            raise ValueError(f"Unknown dataset: {dataset}")
+        start, end = _parse_time(since) if since else None, _parse_time(until) if until else None
+        if (since and start is None) or (until and end is None):
+            raise ValueError("since/until must be ISO timestamps")
+        filters = ([("timestamp", ">=", start)] if start else []) + ([("timestamp", "<", end)] if end else [])
+        sink = _StreamSink()
+        schema = self.schemas[dataset]
+        writer = pyarrow.parquet.ParquetWriter(sink, schema, compression=self.compression) \
+            if fmt == "parquet" else None
+        header = True
+        for path, first_id, _ in self._parts(dataset, since_day=since[:10] if since else "",
+                                             until_day=until[:10] if until else "9999"):
+            if first_id is None or first_id > self.checkpoint[dataset]:
+                continue
+            table = pyarrow.parquet.read_table(path, schema=schema, filters=filters or None)
+            if not table.num_rows:
+                continue
+            if writer is not None:
+                writer.write_table(table)
+            else:
+                pyarrow.csv.write_csv(table, sink, pyarrow.csv.WriteOptions(include_header=header))
+                header = False
+            yield sink.drain()
+        if writer is not None:
+            writer.close()
+        elif header:
+            pyarrow.csv.write_csv(schema.empty_table(), sink)
+        yield sink.drain()
+
+    # --------------------------------------------------------------- lifecycle
+
+    def start(self):
+        """Export every ``interval`` seconds in the background."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self.export_once()
+
+    def stop(self):
+        """Stop the background exports, then export what the store holds now."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=30)
+            self._thread = None
+        self.export_once()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "export_dir": self.export_dir,
+            "interval": self.interval,
+            "compression": self.compression,
+            "datasets": {dataset: {"committed_id": self.checkpoint[dataset], **self.stats[dataset]}
+                         for dataset in DATASETS},
+        }
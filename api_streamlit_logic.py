@@ -4,16 +4,61 @@ FastAPI Backend with EXACT Streamlit Dashboard Logic
 Replicates the exact same analysis workflow as dashboard_simple.py
 """
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request, Response, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 import asyncio
+import base64
+import hashlib
 import json
+import os
+import re
 import threading
 import time
 import random
-from datetime import datetime
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from email.utils import formatdate
 from typing import Dict, List, Any, Optional
-import ollama
+
+from config import (
+    LOG_RETENTION, ANALYSIS_RETENTION, TICKET_RETENTION, MAX_PAGE_SIZE, EVENT_STORE_PATH,
+    EVENT_RETENTION_DAYS, MAX_HISTORY_PAGE, ANALYTICS_DIR, ANALYTICS_INTERVAL, SEARCH_MAX_DOCS,
+    SEARCH_BACKFILL_HOURS, MAX_SEARCH_PAGE, TICKET_STATUSES, OPEN_TICKET_STATUSES, UPDATABLE_TICKET_FIELDS,
+    TICKET_WAL_PATH, TICKET_WAL_COMPACT_RECORDS, TICKET_STALE_HOURS, TICKET_SWEEP_INTERVAL, ITSM_URL,
+    ITSM_TOKEN, ITSM_OUTBOX_PATH, SELF_HEAL_CONFIG, SELF_HEAL_DEFAULT_ACTION, SELF_HEAL_WORKERS, LARGE_MODEL,
+    SMALL_MODEL, OLLAMA_POOL_SIZE, OLLAMA_KEEP_ALIVE, OLLAMA_PINNED_MODELS, OLLAMA_WARM_INTERVAL,
+    OLLAMA_TIMEOUT, TAIL_LOG_FILES, TAIL_FROM_START, EVENT_FLUSH_TIMEOUT, EVENT_MAX_LINES, EVENT_MAX_BYTES,
+    ANALYSIS_SHARDS, SHARD_QUEUE_SIZE, ANALYSIS_WORKERS, ANALYSIS_QUEUE_MAX, INGEST_SHEDDING,
+    INGEST_TARGET_DELAY, INGEST_OVERLOAD_DELAY, INGEST_MAX_SAMPLE_EVERY, INGEST_DEFERRED_MAX,
+    CRITICAL_ALERT_CODES, CRITICAL_HEADER_WORDS, STREAM_JOURNAL_SIZE, STREAM_JOURNAL_SPILL,
+    STREAM_JOURNAL_SPILL_EVENTS, JOURNALED_TYPES, SSE_FLUSH_INTERVAL, SSE_HEARTBEAT, SSE_MAX_PENDING,
+    SSE_RETRY_MS, EVENT_BUS_URL, EVENT_BUS_RETAIN, EVENT_BUS_POLL, INSTANCE_ID, LEADER_TTL,
+    LEADER_CALL_TIMEOUT, API_WORKERS, STREAMED_TYPES, PROMPT_TOKEN_BUDGET, PROMPT_TOP_FRAMES,
+    PROMPT_BOTTOM_FRAMES, KEDB_MATCH_MODE, KEDB_EMBED_MODEL, KEDB_EMBED_CACHE, KEDB_MATCH_THRESHOLD,
+    KEDB_PATH, KEDB_POLL_INTERVAL,
+)
+from query_index import IndexedCollection, parse_filter
+from event_store import EventStore
+from log_search import LogSearchIndex
+from kedb_vectors import KedbVectorIndex, OllamaEmbedder, HashingEmbedder
+from kedb_manager import KedbManager, KedbValidationError
+from ticket_stats import TicketStats
+from ticket_wal import TicketWAL, read_ticket_wal
+from ticket_export import TicketExporter, TicketOutbox, HttpTicketSink
+from self_heal import SelfHealExecutor, load_actions
+from model_router import ModelRouter, line_signature
+from inference_client import ManagedOllamaClient
+from prompt_compactor import PromptCompactor
+from event_assembler import EventAssembler, follow_file, stack_fingerprint
+from analysis_shards import ShardPool
+from ingest_control import IngestController, AnalysisWorkers, CRITICAL, NEW_SIGNATURE, SAMPLED_OUT, DEFER
+from analytics_export import AnalyticsExporter
+from live_stats import StatsAccumulator
+from event_journal import EventJournal
+from event_bus import open_bus, BusFollower, ForwardToLeader, run_request
+from stream_protocol import Subscription, StreamClient, SseClient, SubscriptionIndex, parse_control
 
 app = FastAPI(
     title="Pega Log Analyzer API - Streamlit Logic",
@@ -28,21 +73,94 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Has-More", "X-Data-Version", "X-Next-Version", "ETag", "Last-Modified"],
 )
 
+# Follower instances hand write requests to the leader (see the scale-out settings below)
+app.add_middleware(ForwardToLeader,
+                   should_forward=lambda scope: event_bus is not None and not is_leader
+                   and scope["method"] not in ("GET", "HEAD", "OPTIONS"),
+                   forward=lambda request: call_leader(request))
+
+# ETags embed the process start so versions from a previous run never validate
+DATA_EPOCH = f"{int(time.time()):x}"
+
+# Event store (opened on startup)
+event_store: Optional[EventStore] = None
+
+# Parquet exporter
+analytics_exporter: Optional[AnalyticsExporter] = None
+
+# Log search index
+search_index: Optional[LogSearchIndex] = None
+
+# Tickets, their WAL and the sweeper's stop flag
+ticket_wal: Optional[TicketWAL] = None
+ticket_lock = threading.RLock()
+tickets_by_id: Dict[str, Dict[str, Any]] = {}
+signature_last_seen: Dict[str, str] = {}
+ticket_sweeper_stop = threading.Event()
+
+# ITSM exporter
+ticket_exporter: Optional[TicketExporter] = None
+
+# Self-heal executor and KEDB error -> action mapping
+heal_executor: Optional[SelfHealExecutor] = None
+heal_mapping: Dict[str, str] = {}
+
+# Log file tailing
+event_assembler: Optional[EventAssembler] = None
+log_tail_stop = threading.Event()
+
+# Analysis shard pool
+analysis_shards: Optional[ShardPool] = None
+
+# Analysis workers and ingest control
+analysis_workers: Optional[AnalysisWorkers] = None
+ingest_controller = IngestController(workers=ANALYSIS_SHARDS or ANALYSIS_WORKERS, target_delay=INGEST_TARGET_DELAY,
+                                     overload_delay=INGEST_OVERLOAD_DELAY, critical_codes=CRITICAL_ALERT_CODES,
+                                     max_sample_every=INGEST_MAX_SAMPLE_EVERY, deferred_size=INGEST_DEFERRED_MAX,
+                                     enabled=INGEST_SHEDDING)
+
+# Stream journal (opened on startup)
+stream_journal: Optional[EventJournal] = None
+
+# Event bus and leadership state
+event_bus = None
+bus_follower: Optional[BusFollower] = None
+is_leader = True  # a single instance always leads
+leader_stop = threading.Event()
+pending_leader_calls: Dict[str, asyncio.Future] = {}
+unanswered_leader_calls: Dict[str, Dict[str, Any]] = {}  # seen as a follower; answered if this instance takes over
+mirrored_analyses: "OrderedDict[int, int]" = OrderedDict()  # leader's analysis id -> id here
+stats_mirrored = False
+
+# Prompt compactor
+prompt_compactor = PromptCompactor(token_budget=PROMPT_TOKEN_BUDGET, top_frames=PROMPT_TOP_FRAMES,
+                                   bottom_frames=PROMPT_BOTTOM_FRAMES)
+
 # Global variables (same as Streamlit)
-current_logs: List[Dict[str, Any]] = []
-current_analyses: List[Dict[str, Any]] = []
-current_tickets: List[Dict[str, Any]] = []
-current_stats: Dict[str, Any] = {
-    "total_logs": 0,
-    "self_healed": 0,
-    "tickets_raised": 0,
-    "support_hours_saved": 0,
-    "monitoring_active": False,
-    "start_time": datetime.now().isoformat()
-}
-active_connections: List[WebSocket] = []
+log_index = IndexedCollection("logs", {
+    "level": lambda entry: entry.get("level"),
+    "alert_code": lambda entry: entry.get("alert_code"),
+}, max_items=LOG_RETENTION)
+analysis_index = IndexedCollection("analyses", {
+    "severity": lambda entry: entry["analysis"].get("severity"),
+    "category": lambda entry: entry["analysis"].get("category"),
+    "action": lambda entry: entry["analysis"].get("action"),
+    "alert_code": lambda entry: entry.get("alert_code"),
+}, max_items=ANALYSIS_RETENTION)
+ticket_index = IndexedCollection("tickets", {
+    "severity": lambda ticket: ticket.get("severity"),
+    "category": lambda ticket: ticket.get("category"),
+    "status": lambda ticket: ticket.get("status"),
+    "alert_code": lambda ticket: ticket.get("alert_code") or extract_alert_code(ticket.get("log_line", "")),
+    "signature": lambda ticket: ticket_signature(ticket),
+}, max_items=TICKET_RETENTION, identity_fields=("ticket_id",))
+ticket_stats = TicketStats()
+# Lifetime totals and per-second/minute/hour rate buckets (see /stats/rates)
+live_stats = StatsAccumulator(("logs", "self_healed", "tickets_raised", "hours_saved", "shed"))
+stream_index = SubscriptionIndex()
 is_monitoring = False
 monitoring_thread: Optional[threading.Thread] = None
 
@@ -110,27 +228,66 @@ ISSUE_CATEGORIES = {
     ]
 }
 
+# Alert codes the generator emits (PEGA0001, CONN-JSONMAP-400, ...), longest first
+KNOWN_ALERT_CODES = sorted({pattern.split(' - ')[0] for patterns in ISSUE_CATEGORIES.values() for pattern in patterns},
+                           key=len, reverse=True)
+ALERT_CODE_PATTERN = re.compile('|'.join(re.escape(code) for code in KNOWN_ALERT_CODES))
+
+# Model routes per ISSUE_CATEGORIES key; categories not listed use "default"
+MODEL_ROUTES = {
+    "default": {"small_model": SMALL_MODEL, "large_model": LARGE_MODEL},
+    # Security findings need more agreement before the cheap tiers may answer
+    "pega_security": {"min_confidence": 0.9, "classifier_samples": 10, "classifier_agreement": 0.9},
+}
+ALERT_CODE_CATEGORIES = {pattern.split(' - ')[0]: category
+                         for category, patterns in ISSUE_CATEGORIES.items() for pattern in patterns}
+model_router = ModelRouter(MODEL_ROUTES)
+
+# Error codes used for exact KEDB matching
+# Application name and version field of PegaRULES-ALERT lines, e.g. *CovenantMo:01.01*
+ALERT_APP_PATTERN = re.compile(r'\*([A-Za-z][\w-]*):\d{2}\.\d{2}(?:\.\d{2})?\*')
+ERROR_CODE_PATTERN = re.compile(r'(PEGA\d{4}|AUTH-\d{3}|CONN-\d{4}|DB-\w+|QP-\w+|SECU\d{4}|RULE-\d{3}|BIX-\w+|EMAIL-\w+|DX-\w+|SOAP-\w+|LISTENER-\w+|KAFKA-\w+|SEARCH-\w+)')
+
+def extract_alert_code(log_line):
+    """Return the first known Pega alert code in a log line, if any."""
+    match = ALERT_CODE_PATTERN.search(log_line.upper()) if log_line else None
+    return match.group(0) if match else None
+
+def extract_app(log_line):
+    """Return the Pega application named in an alert line, if any."""
+    match = ALERT_APP_PATTERN.search(log_line) if log_line else None
+    return match.group(1) if match else None
+
 # Initialize Mistral AI
 MISTRAL_CLIENT = None
-KEDB_DATA = []
 TICKETS_DATA = []
 
+def model_installed(wanted, models):
+    """Whether Ollama has ``wanted``; "mistral" means "mistral:latest", and any tag of the model will do."""
+    def normalise(name):
+        return name.lower() if ":" in name else f"{name.lower()}:latest"
+    names = {normalise(model.get('name') or model.get('model') or '') for model in models}
+    wanted = normalise(wanted)
+    return wanted in names or any(name.split(":", 1)[0] == wanted.split(":", 1)[0] for name in names)
+
 def initialize_mistral():
     """Initialize Mistral AI - EXACT same as Streamlit."""
     try:
-        client = ollama.Client()
+        client = ManagedOllamaClient(pool_size=OLLAMA_POOL_SIZE, keep_alive=OLLAMA_KEEP_ALIVE,
+                                     pinned_models=OLLAMA_PINNED_MODELS, warm_interval=OLLAMA_WARM_INTERVAL,
+                                     timeout=OLLAMA_TIMEOUT)
         
         # Check if Mistral model is available
         try:
             models = client.list()
             if 'models' in models:
-                mistral_available = any('mistral' in model.get('name', '').lower() for model in models['models'])
+                mistral_available = model_installed(LARGE_MODEL, models['models'])
             else:
                 mistral_available = False
             
             if not mistral_available:
                 print("🔄 Pulling Mistral 7B model...")
-                client.pull('mistral:7b')
+                client.pull(LARGE_MODEL)
                 print("✅ Mistral 7B model pulled successfully!")
             else:
                 print("✅ Mistral model already available!")
@@ -140,7 +297,7 @@ def initialize_mistral():
             print(f"❌ Failed to check/pull Mistral model: {e}")
             try:
                 print("🔄 Attempting to pull Mistral model...")
-                client.pull('mistral:7b')
+                client.pull(LARGE_MODEL)
                 print("✅ Mistral 7B model pulled successfully!")
                 return client
             except Exception as pull_error:
@@ -154,22 +311,30 @@ def initialize_mistral():
         print(f"❌ Failed to initialize Mistral: {e}")
         return None
 
-def load_kedb():
-    """Load KEDB - EXACT same as Streamlit."""
-    try:
-        with open('kebd.json', 'r', encoding='utf-8') as f:
-            kedb_data = json.load(f)
-        print(f"✅ KEDB loaded with {len(kedb_data)} error patterns")
-        return kedb_data
-    except FileNotFoundError:
-        print("❌ KEDB file (kebd.json) not found")
-        return []
-    except Exception as e:
-        print(f"❌ Failed to load KEDB: {e}")
-        return []
+def build_kedb_vector_index(kedb_data, client=None):
+    """Embed the KEDB with Ollama, falling back to the offline hashing embedder."""
+    if not kedb_data:
+        return None
+    embedders = [HashingEmbedder()]
+    if client is not None:
+        embedders.insert(0, OllamaEmbedder(client, KEDB_EMBED_MODEL))
+    for embedder in embedders:
+        try:
+            index = KedbVectorIndex(kedb_data, embedder, cache_path=KEDB_EMBED_CACHE,
+                                    threshold=KEDB_MATCH_THRESHOLD)
+            print(f"✅ KEDB vector index ready ({embedder.name}, threshold {index.threshold})")
+            return index
+        except Exception as e:
+            print(f"⚠️ KEDB embedding with {embedder.name} failed: {e}")
+    return None
 
-# Load KEDB data
-KEDB_DATA = load_kedb()
+def build_kedb_vectors(kedb_data):
+    """Vector index builder used by the KEDB manager on every reload."""
+    if KEDB_MATCH_MODE != "vector":
+        return None
+    return build_kedb_vector_index(kedb_data, MISTRAL_CLIENT)
+
+kedb_manager = KedbManager(KEDB_PATH, build_vectors=build_kedb_vectors, poll_interval=KEDB_POLL_INTERVAL)
 
 def load_tickets(frontend_version="v1"):
     """Load tickets - EXACT same as Streamlit."""
@@ -187,24 +352,179 @@ def load_tickets(frontend_version="v1"):
         return []
 
 def save_ticket(ticket, frontend_version="v1"):
-    """Save ticket - EXACT same as Streamlit."""
+    """Save ticket: logged to the WAL, folded into the ticket files at the next compaction."""
     global TICKETS_DATA
     try:
-        TICKETS_DATA.append(ticket)
-        
-        # Save to both files for now (we can refine this later)
-        with open('tickets.json', 'w', encoding='utf-8') as f:
-            json.dump(TICKETS_DATA, f, indent=2, ensure_ascii=False)
+        with ticket_lock:
+            if ticket_wal is not None:
+                ticket_wal.append([{"ticket_id": ticket["ticket_id"], "ticket": ticket}])
+            TICKETS_DATA.append(ticket)
+            tickets_by_id[ticket["ticket_id"]] = ticket
+            ticket_index.add(ticket)
+            ticket_stats.add(ticket)
+            note_signature(ticket_signature(ticket), ticket.get("timestamp"))
+            if event_store:
+                event_store.record_ticket(ticket)
+            replicate("ticket", ticket)
+            if ticket_wal is None:
+                write_ticket_files()
+            else:
+                compact_ticket_wal()
         
-        with open('tickets_v2.json', 'w', encoding='utf-8') as f:
-            json.dump(TICKETS_DATA, f, indent=2, ensure_ascii=False)
+        if ticket_exporter is not None:
+            ticket_exporter.submit(ticket)
             
-        print(f"✅ Ticket {ticket.get('ticket_id', 'Unknown')} saved to both ticket files")
+        print(f"✅ Ticket {ticket.get('ticket_id', 'Unknown')} saved")
     except Exception as e:
         print(f"❌ Failed to save ticket: {e}")
 
+def write_ticket_files():
+    """Rewrite both ticket files with the current state, which makes the WAL redundant.
+
+    Only the leader writes them; a follower's tickets are mirrors of the leader's.
+    """
+    if not is_leader:
+        return
+    with ticket_lock:
+        for path in ('tickets.json', 'tickets_v2.json'):
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(TICKETS_DATA, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        if ticket_wal is not None:
+            ticket_wal.reset()
+
+def compact_ticket_wal(force=False):
+    """Fold the WAL into the ticket files once it is long enough (or on demand)."""
+    with ticket_lock:
+        if ticket_wal is not None and len(ticket_wal) and (force or len(ticket_wal) >= TICKET_WAL_COMPACT_RECORDS):
+            write_ticket_files()
+
+def new_ticket_id():
+    """Ticket id for today that is not already taken."""
+    with ticket_lock:
+        while True:
+            ticket_id = f"TKT-{datetime.now().strftime('%Y%m%d')}-{random.randint(1, 999):03d}"
+            if ticket_id not in tickets_by_id:
+                return ticket_id
+
+def ticket_signature(ticket):
+    """Recurrence key of a ticket: its alert code, else its anomaly text with numbers masked."""
+    code = ticket.get("alert_code") or extract_alert_code(ticket.get("log_line", ""))
+    if code:
+        return code
+    return re.sub(r"\d+", "#", (ticket.get("anomaly") or "").lower()).strip()[:120] or "unknown"
+
+def note_signature(signature, timestamp=None):
+    """Remember when an issue signature was last seen (drives stale auto-close)."""
+    timestamp = timestamp or datetime.now().isoformat()
+    if timestamp > signature_last_seen.get(signature, ""):
+        signature_last_seen[signature] = timestamp
+
+def apply_ticket_changes(updates):
+    """Apply [(ticket, changes)] durably: WAL append first, then memory, indexes, stats and store."""
+    with ticket_lock:
+        now = datetime.now().isoformat()
+        records = [{"ticket_id": ticket["ticket_id"], "changes": {**changes, "updated_at": now}}
+                   for ticket, changes in updates]
+        if ticket_wal is not None:
+            ticket_wal.append(records)
+        for (ticket, _), record in zip(updates, records):
+            before = {field: ticket.get(field) for field in ("severity", "status", "category", "timestamp")}
+            if ticket_index.get(ticket.get("id")) is ticket:
+                ticket_index.update(ticket["id"], record["changes"])
+            else:
+                ticket.update(record["changes"])
+            ticket_stats.update(before, ticket)
+            if event_store:
+                event_store.record_ticket(ticket)
+            replicate("ticket", ticket)
+        compact_ticket_wal()
+    return [ticket for ticket, _ in updates]
+
+def replay_ticket_wal(live=False):
+    """Re-apply logged new tickets and changes that were not yet folded into the ticket files.
+
+    At startup they go straight into the ticket list (indexing comes after);
+    ``live`` replays, when taking over the lease, go through mirror_ticket so
+    indexes and stats follow.
+    """
+    replayed = 0
+    for record in read_ticket_wal(TICKET_WAL_PATH):
+        current = tickets_by_id.get(record.get("ticket_id"))
+        if live:
+            if "ticket" in record:
+                mirror_ticket(record["ticket"])
+                replayed += 1
+            elif current is not None:
+                mirror_ticket({**current, **record.get("changes", {})})
+                replayed += 1
+            continue
+        if "ticket" in record:
+            if current is None:
+                TICKETS_DATA.append(record["ticket"])
+                tickets_by_id[record["ticket_id"]] = record["ticket"]
+                replayed += 1
+        elif current is not None:
+            current.update(record.get("changes", {}))
+            replayed += 1
+    if replayed:
+        print(f"✅ Replayed {replayed} ticket changes from {TICKET_WAL_PATH}")
+
+def open_tickets(filters):
+    """Indexed tickets in an open status that match the given filters."""
+    filters = {**filters, "status": filters.get("status") or OPEN_TICKET_STATUSES}
+    return ticket_index.query(since_id=0, filters=filters, limit=len(ticket_index) + 1)["items"]
+
+def close_stale_tickets():
+    """Close open tickets whose signature has not recurred within TICKET_STALE_HOURS."""
+    cutoff = (datetime.now() - timedelta(hours=TICKET_STALE_HOURS)).isoformat()
+    now = datetime.now().isoformat()
+    updates = []
+    for signature, last_seen in list(signature_last_seen.items()):
+        if last_seen >= cutoff:
+            continue
+        signature_last_seen.pop(signature, None)
+        for ticket in open_tickets({"signature": [signature]}):
+            updates.append((ticket, {
+                "status": "Closed",
+                "closed_at": now,
+                "resolution": f"Auto-closed: '{signature}' not seen for {TICKET_STALE_HOURS:g}h"
+            }))
+    if updates:
+        apply_ticket_changes(updates)
+        print(f"🧹 Auto-closed {len(updates)} stale tickets")
+    return len(updates)
+
+def record_itsm_refs(refs):
+    """Store the external ITSM reference on each exported ticket."""
+    updates = [(tickets_by_id[ticket_id], {"itsm_ref": ref}) for ticket_id, ref in refs.items()
+               if ticket_id in tickets_by_id and tickets_by_id[ticket_id].get("itsm_ref") != ref]
+    if updates:
+        apply_ticket_changes(updates)
+
+def ticket_sweeper_loop():
+    """Periodically auto-close stale tickets and fold the WAL into the ticket files."""
+    while not ticket_sweeper_stop.wait(TICKET_SWEEP_INTERVAL):
+        try:
+            close_stale_tickets()
+        except Exception as e:
+            print(f"❌ Stale ticket sweep failed: {e}")
+        try:
+            compact_ticket_wal(force=True)
+        except Exception as e:
+            print(f"❌ Ticket file compaction failed: {e}")
+
 def generate_demo_log():
     """Generate demo log in exact Pega format."""
+    return generate_demo_event()[1]
+
+def generate_demo_event():
+    """Generate a demo log and return (alert_code, log_message).
+    
+    pegarules.log and security lines don't carry the alert code in their text,
+    so the code is taken from the pattern that produced the line.
+    """
     global current_category, category_index
     
     # Get current category and pattern
@@ -228,7 +548,7 @@ def generate_demo_log():
         next_idx = (current_idx + 1) % len(categories)
         current_category = categories[next_idx]
     
-    return log_message
+    return pattern.split(' - ')[0], log_message
 
 def generate_pega_log_format(pattern, category):
     """Generate logs in exact Pega format with full metadata and performance metrics."""
@@ -532,104 +852,182 @@ def generate_realistic_log_message(pattern, category):
     # Default for unknown patterns
     return pattern
 
-def analyze_log_with_mistral(log_line):
+def analyze_event(log_line, fingerprint=None):
+    """Model analysis and KEDB match for a log event; no side effects, so shard workers run it too."""
+    # Route to the cheapest tier that can answer (classifier, small model, then Mistral)
+    started = time.perf_counter()
+    alert_code = extract_alert_code(log_line)
+    prompt_line, compaction = prompt_compactor.compact(log_line)
+    ai_analysis, routing = model_router.analyze(MISTRAL_CLIENT, prompt_line, alert_code,
+                                                ALERT_CODE_CATEGORIES.get(alert_code), signature=fingerprint)
+    if ai_analysis is None:
+        return None
+    print(f"✅ {routing['model']} analysis ({routing['tier']}): {ai_analysis['anomaly']}")
+    
+    # Now check KEDB for matching patterns (one snapshot for the whole match)
+    kedb = kedb_manager.snapshot
+    return {
+        "ai_analysis": ai_analysis,
+        "kedb_match": find_kedb_match(ai_analysis, log_line, kedb),
+        "kedb_version": kedb.version,
+        "analyzed_by": routing["model"],
+        "prompt_tokens": compaction["compact_tokens"],
+        "latency_ms": round((time.perf_counter() - started) * 1000, 1)
+    }
+
+def planned_action(findings):
+    """("self_healing", action name) when the KEDB fix has a registered action, else ("ticket_raised", None)."""
+    kedb_match = findings["kedb_match"]
+    heal_action = heal_action_for(kedb_match) if kedb_match else None
+    return ("self_healing", heal_action) if heal_action else ("ticket_raised", None)
+
+def act_on_findings(findings, log_line):
+    """Self-heal or raise a ticket for an analysed event; returns the analysis record."""
+    ai_analysis = findings["ai_analysis"]
+    kedb_match = findings["kedb_match"]
+    
+    # Self-heal when the KEDB fix has a registered action; the executor decides the outcome
+    action, heal_action = planned_action(findings)
+    
+    if action == "self_healing" and heal_executor is not None:
+        print(f"✅ KEDB match found: {kedb_match.get('error', 'Unknown')} - Self-healing via {heal_action}")
+        return {
+            "anomaly": ai_analysis.get('anomaly', 'Unknown Issue'),
+            "severity": ai_analysis.get('severity', 'Medium'),
+            "action": "self_healing",
+            "heal_action": heal_action,
+            "kedb_match": kedb_match.get('error', 'Unknown'),
+            "suggested_fix": kedb_match.get('fix', 'No fix available'),
+            "support_hours_saved": kedb_match.get('support_hours_saved', 2),
+            "category": ai_analysis.get('category', 'unknown'),
+            "self_heal_result": f"⏳ Running {heal_action}: {kedb_match.get('fix', 'Unknown fix')}",
+            "kedb_version": findings["kedb_version"],
+            "analyzed_by": findings["analyzed_by"],
+            "prompt_tokens": findings["prompt_tokens"],
+            "latency_ms": findings["latency_ms"]
+        }
+    else:
+        # Create ticket (no KEDB match, or no action registered for the fix)
+        action_reason = "No KEDB match" if not kedb_match else "No self-heal action for KEDB fix"
+        print(f"🎫 {action_reason} - Creating ticket for: {ai_analysis.get('anomaly', 'Unknown Issue')}")
+        ticket_id = raise_ticket(ai_analysis, log_line)
+        
+        return {
+            "anomaly": ai_analysis.get('anomaly', 'Unknown Issue'),
+            "severity": ai_analysis.get('severity', 'Medium'),
+            "action": "ticket_raised",
+            "ticket_id": ticket_id,
+            "suggested_fix": ai_analysis.get('description', 'No fix suggested'),
+            "support_hours_saved": 0,
+            "category": ai_analysis.get('category', 'unknown'),
+            "kedb_version": findings["kedb_version"],
+            "analyzed_by": findings["analyzed_by"],
+            "prompt_tokens": findings["prompt_tokens"],
+            "latency_ms": findings["latency_ms"]
+        }
+
+def analyze_log_with_mistral(log_line, fingerprint=None):
     """Analyze log - EXACT same as Streamlit."""
     if not MISTRAL_CLIENT:
         print("❌ Mistral AI not available - cannot analyze log")
         return None
     
     try:
-        # Create prompt for Mistral AI
-        prompt = f"""
-        Analyze this Pega application log line and provide a JSON response:
-        
-        Log: {log_line}
-        
-        Provide analysis in this exact JSON format:
-        {{
-            "anomaly": "Brief description of the issue",
-            "severity": "Critical/High/Medium/Low",
-            "category": "performance/network/security/database/application",
-            "description": "Detailed explanation of the issue"
-        }}
-        
-        Only return valid JSON, no other text.
-        """
-        
-        # Get response from Mistral AI
-        response = MISTRAL_CLIENT.chat(model='mistral:7b', messages=[
-            {
-                'role': 'user',
-                'content': prompt
-            }
-        ])
-        
-        # Extract JSON from response
-        ai_response = response['message']['content']
-        
-        # Try to parse JSON
-        try:
-            ai_analysis = json.loads(ai_response)
-            print(f"✅ Mistral AI analysis: {ai_analysis['anomaly']}")
-        except json.JSONDecodeError:
-            print(f"❌ Failed to parse Mistral response: {ai_response}")
-            return None
-        
-        # Now check KEDB for matching patterns
-        kedb_match = find_kedb_match(ai_analysis, log_line)
-        
-        # Create a mix of self-heals and tickets (70% self-heal, 30% tickets)
-        should_create_ticket = random.random() < 0.3  # 30% chance to create ticket
-        
-        if kedb_match and not should_create_ticket:
-            # Self-heal if KEDB match found and not randomly selected for ticket
-            print(f"✅ KEDB match found: {kedb_match.get('error', 'Unknown')} - Self-healing")
-            return {
-                "anomaly": ai_analysis.get('anomaly', 'Unknown Issue'),
-                "severity": ai_analysis.get('severity', 'Medium'),
-                "action": "self_healed",
-                "kedb_match": kedb_match.get('error', 'Unknown'),
-                "suggested_fix": kedb_match.get('fix', 'No fix available'),
-                "support_hours_saved": kedb_match.get('support_hours_saved', 2),
-                "category": ai_analysis.get('category', 'unknown'),
-                "self_heal_result": f"✅ Auto-resolved: {kedb_match.get('fix', 'Unknown fix')}"
-            }
-        else:
-            # Create ticket (either no KEDB match OR randomly selected for ticket)
-            action_reason = "No KEDB match" if not kedb_match else "Randomly selected for ticket creation"
-            print(f"🎫 {action_reason} - Creating ticket for: {ai_analysis.get('anomaly', 'Unknown Issue')}")
-            ticket_id = f"TKT-{datetime.now().strftime('%Y%m%d')}-{random.randint(1, 999):03d}"
-            ticket = {
-                "ticket_id": ticket_id,
-                "timestamp": datetime.now().isoformat(),
-                "log_line": log_line,
-                "anomaly": ai_analysis.get('anomaly', 'Unknown Issue'),
-                "severity": ai_analysis.get('severity', 'Medium'),
-                "category": ai_analysis.get('category', 'unknown'),
-                "description": ai_analysis.get('description', 'No description available'),
-                "status": "Open"
-            }
-            
-            # Save ticket
-            save_ticket(ticket)
-            
-            return {
-                "anomaly": ai_analysis.get('anomaly', 'Unknown Issue'),
-                "severity": ai_analysis.get('severity', 'Medium'),
-                "action": "ticket_raised",
-                "ticket_id": ticket_id,
-                "suggested_fix": ai_analysis.get('description', 'No fix suggested'),
-                "support_hours_saved": 0,
-                "category": ai_analysis.get('category', 'unknown')
-            }
-            
+        findings = analyze_event(log_line, fingerprint)
+        return act_on_findings(findings, log_line) if findings else None
     except Exception as e:
         print(f"❌ Mistral AI analysis failed: {e}")
         return None
 
-def find_kedb_match(ai_analysis, log_line):
+def raise_ticket(ai_analysis, log_line, description=None):
+    """Create and save an Open ticket for an analysed log line; returns its id."""
+    ticket_id = new_ticket_id()
+    ticket = {
+        "ticket_id": ticket_id,
+        "timestamp": datetime.now().isoformat(),
+        "log_line": log_line,
+        "alert_code": extract_alert_code(log_line),
+        "anomaly": ai_analysis.get('anomaly', 'Unknown Issue'),
+        "severity": ai_analysis.get('severity', 'Medium'),
+        "category": ai_analysis.get('category', 'unknown'),
+        "description": description or ai_analysis.get('description', 'No description available'),
+        "status": "Open"
+    }
+    
+    # Save ticket
+    save_ticket(ticket)
+    return ticket_id
+
+def heal_action_for(kedb_entry):
+    """Registered self-heal action for a KEDB entry (entry field, then config mapping, then default)."""
+    return (kedb_entry.get('action')
+            or heal_mapping.get(kedb_entry.get('error', '').upper())
+            or SELF_HEAL_DEFAULT_ACTION
+            or None)
+
+def start_self_heal(analysis_entry):
+    """Hand a self_healing analysis to the executor; finish_self_heal records the outcome."""
+    analysis = analysis_entry["analysis"]
+    signature = ticket_signature({"alert_code": analysis_entry.get("alert_code"), "anomaly": analysis.get("anomaly")})
+    context = {
+        "kedb_error": analysis["kedb_match"],
+        "fix": analysis["suggested_fix"],
+        "log_line": analysis_entry["log_message"],
+        "alert_code": analysis_entry.get("alert_code") or "",
+        "signature": signature,
+    }
+    # One run per action, fix and issue signature inside the dedupe window
+    idempotency_key = f"{analysis['heal_action']}:{analysis['kedb_match']}:{signature}"
+    heal_executor.submit(analysis["heal_action"], analysis["kedb_match"], idempotency_key, context,
+                         lambda result: finish_self_heal(analysis_entry, result))
+
+def finish_self_heal(analysis_entry, result):
+    """Mark the analysis self-healed, or escalate it to a ticket when the action failed.
+    
+    Returns the escalation ticket id, which deduplicated runs of the same fix attach to
+    instead of opening their own.
+    """
+    analysis = dict(analysis_entry["analysis"])
+    fix = analysis.get("suggested_fix", "Unknown fix")
+    ticket_id = None
+    if result["ok"]:
+        shared = ", deduplicated" if result.get("deduplicated") else ""
+        simulated = result["action"] == "simulate"
+        analysis.update(action="self_healed", simulated=simulated,
+                        self_heal_result=f"{'🧪 Simulated (no remediation ran)' if simulated else '✅ Auto-resolved'}: "
+                                         f"{fix} ({result['action']}, {result['duration_ms']} ms{shared})")
+        live_stats.record(self_healed=1, hours_saved=analysis.get('support_hours_saved', 0))
+        print(f"🔧 Self-heal: {analysis['self_heal_result']}")
+    elif result.get("cancelled"):
+        analysis.update(self_heal_result=f"⏹️ Self-heal {result['action']} cancelled at shutdown")
+    elif result.get("deduplicated") and result.get("primary_outcome") in tickets_by_id:
+        # The first alert of this run already escalated; count this one on its ticket
+        primary_ticket = result["primary_outcome"]
+        with ticket_lock:
+            ticket = tickets_by_id[primary_ticket]
+            apply_ticket_changes([(ticket, {"occurrences": ticket.get("occurrences", 1) + 1})])
+        analysis.update(action="ticket_raised", ticket_id=primary_ticket, support_hours_saved=0,
+                        self_heal_result=f"❌ Self-heal failed: {result['error']} (see {primary_ticket})")
+    else:
+        print(f"🎫 Self-heal {result['action']} failed ({result['error']}) - escalating to ticket")
+        ticket_id = raise_ticket(analysis, analysis_entry["log_message"],
+                                 description=f"Self-heal '{result['action']}' for {analysis.get('kedb_match')} failed: "
+                                             f"{result['error']}. KEDB fix: {fix}")
+        analysis.update(action="ticket_raised", ticket_id=ticket_id, support_hours_saved=0,
+                        self_heal_result=f"❌ Self-heal failed: {result['error']}")
+        live_stats.record(tickets_raised=1)
+    
+    if analysis_index.update(analysis_entry["id"], {"analysis": analysis}) is None:
+        analysis_entry["analysis"] = analysis
+    if event_store:
+        event_store.record_analysis(analysis_entry)
+    replicate("analysis", analysis_entry)
+    return ticket_id
+
+def find_kedb_match(ai_analysis, log_line, kedb=None):
     """Find KEDB match - Extract error codes from log lines for better matching."""
-    if not KEDB_DATA:
+    kedb = kedb or kedb_manager.snapshot
+    if not kedb.entries:
         return None
     
     anomaly = ai_analysis.get('anomaly', '').lower()
@@ -639,29 +1037,36 @@ def find_kedb_match(ai_analysis, log_line):
     print(f"🔍 Log line contains: {log_line[:100]}...")
     
     # First, try to extract error codes from the log line
-    import re
-    
     # Extract Pega error codes (PEGA0001, AUTH-403, etc.)
-    error_codes = re.findall(r'(PEGA\d{4}|AUTH-\d{3}|CONN-\d{4}|DB-\w+|QP-\w+|SECU\d{4}|RULE-\d{3}|BIX-\w+|EMAIL-\w+|DX-\w+|SOAP-\w+|LISTENER-\w+|KAFKA-\w+|SEARCH-\w+)', log_line.upper())
+    error_codes = ERROR_CODE_PATTERN.findall(log_line.upper())
     
     if error_codes:
         print(f"🔍 Found error codes in log: {error_codes}")
         
-        # Look for exact error code matches in KEDB
-        for entry in KEDB_DATA:
-            kedb_error = entry.get('error', '').upper()
-            
-            # Check if this is a self-healable entry
-            if not entry.get('self_healable', False):
-                continue
-                
-            # Direct error code match
-            if kedb_error in error_codes:
-                print(f"✅ KEDB match found: Error code '{kedb_error}' matches in log")
+        # Look for exact error code matches among self-healable KEDB entries
+        for code in error_codes:
+            entry = kedb.by_error.get(code)
+            if entry:
+                print(f"✅ KEDB match found: Error code '{code}' matches in log")
                 return entry
     
-    # If no error code match, try flexible text matching
-    for entry in KEDB_DATA:
+    # If no error code match, rank the KEDB by embedding similarity
+    if KEDB_MATCH_MODE == "vector" and kedb.vectors is not None:
+        query_text = f"{anomaly}. {ai_analysis.get('description', '')}".strip(". ") or log_line[:500]
+        try:
+            result = kedb.vectors.match(query_text)
+        except Exception as e:
+            print(f"⚠️ KEDB vector match failed: {e}")
+            result = None
+        if result:
+            entry, score = result
+            print(f"✅ KEDB match found: '{entry.get('error')}' by similarity {score:.2f}")
+            return entry
+        print(f"🔍 No KEDB match found for: {anomaly}")
+        return None
+    
+    # Legacy mode: flexible text matching
+    for entry in kedb.entries:
         kedb_error = entry.get('error', '').lower()
         kedb_description = entry.get('description', '').lower()
         
@@ -724,74 +1129,196 @@ def find_kedb_match(ai_analysis, log_line):
     print(f"🔍 No KEDB match found for: {anomaly}")
     return None
 
-async def broadcast_to_websockets(message: Dict[str, Any]):
-    """Broadcast message to all connected WebSocket clients."""
-    if active_connections:
+async def broadcast_to_websockets(message: Dict[str, Any], attributes: Optional[Dict[str, Any]] = None,
+                                  seq: Optional[int] = None):
+    """Broadcast message to the WebSocket clients whose filters accept its attributes (all when None).
+    
+    seq is the event's bus id when scaled out, so every instance numbers it the same.
+    """
+    # Numbered before any await, so a resuming client's catch-up can never miss it
+    if stream_journal is not None and message.get("type") in JOURNALED_TYPES:
+        stream_journal.append(message, attributes, seq=seq)
+    if len(stream_index):
+        # Clients with the same encoding and fields share one encoded frame
+        frames = {}
         disconnected = []
-        for connection in active_connections:
+        for client in stream_index.match(attributes):
             try:
-                await connection.send_text(json.dumps(message))
+                await client.send(message, frames)
             except Exception as e:
                 print(f"Failed to send message to WebSocket: {e}")
-                disconnected.append(connection)
+                disconnected.append(client)
         
         # Remove disconnected clients
-        for connection in disconnected:
-            if connection in active_connections:
-                active_connections.remove(connection)
+        for client in disconnected:
+            stream_index.remove(client)
+
+def ticket_summary(ticket):
+    """Compact ticket view served to the v1 frontend and WebSocket clients."""
+    return {
+        "id": ticket.get("id"),
+        "ticket_id": ticket.get("ticket_id", "Unknown"),
+        "timestamp": ticket.get("timestamp", "Unknown"),
+        "severity": ticket.get("severity", "Medium"),
+        "anomaly": ticket.get("anomaly", "Unknown"),
+        "description": ticket.get("log_line", "No description"),
+        "status": ticket.get("status", "Open")
+    }
+
+def event_attributes(log_entry, analysis=None):
+    """What /stream subscribers can filter an event on."""
+    alert_code = log_entry.get("alert_code")
+    analysis = analysis or {}
+    return {
+        "alert_code": alert_code,
+        "app": extract_app(log_entry["message"].split("\n", 1)[0]),
+        "category": ALERT_CODE_CATEGORIES.get(alert_code) or analysis.get("category"),
+        "action": analysis.get("action"),
+        "severity": analysis.get("severity"),
+    }
+
+def stats_snapshot():
+    """Consistent copy of the lifetime totals in the dashboard's stats shape."""
+    totals = live_stats.totals()
+    return {
+        "total_logs": totals["logs"],
+        "self_healed": totals["self_healed"],
+        "tickets_raised": totals["tickets_raised"],
+        "support_hours_saved": totals["hours_saved"],
+        "shed_logs": totals["shed"],
+        "monitoring_active": is_monitoring,
+        "start_time": live_stats.started
+    }
+
+def recent_tickets(limit=10):
+    """Newest tickets first, in summary form."""
+    page = ticket_index.query(limit=limit, newest_first=True)
+    return [ticket_summary(ticket) for ticket in page["items"]]
+
+def build_log_entry(log_message, alert_code=None, fingerprint=None, source=None):
+    """Wrap a log event with timestamp, level, alert code and stack fingerprint."""
+    header = log_message.split("\n", 1)[0].lower()
+    log_entry = {
+        "timestamp": datetime.now().isoformat(),
+        "message": log_message,
+        "level": "ERROR" if any(word in header for word in ['error', 'failed', 'timeout', 'critical']) else 
+                 "WARN" if any(word in header for word in ['warning', 'degradation', 'exceeded', 'leak']) else "INFO",
+        "alert_code": alert_code or extract_alert_code(log_message),
+        "fingerprint": fingerprint or (stack_fingerprint(log_message) if "\n" in log_message else None)
+    }
+    if source:
+        log_entry["source"] = source
+    return log_entry
 
 def log_callback(log_entry, loop):
     """Process new log entry - EXACT same logic as Streamlit."""
-    global current_stats, current_logs, current_analyses, current_tickets
-    
     # Add to logs
-    current_logs.append(log_entry)
-    if len(current_logs) > 100:  # Keep last 100 logs
-        current_logs = current_logs[-100:]
+    log_index.add(log_entry)
+    if event_store:
+        event_store.record_log(log_entry)
+    if search_index is not None:
+        search_index.submit(log_entry["message"], log_entry["timestamp"], log_entry["id"], log_entry.get("alert_code"))
     
     # Update stats
-    current_stats["total_logs"] += 1
+    live_stats.record(logs=1)
     
+    # Shed, defer or queue it depending on how far analysis is behind
+    header = log_entry["message"].split("\n", 1)[0].lower()
+    decision = ingest_controller.decide(shard_key(log_entry), log_entry.get("alert_code"), log_entry["level"],
+                                        critical=any(word in header for word in CRITICAL_HEADER_WORDS),
+                                        depth=analysis_depth())
+    if decision == SAMPLED_OUT:
+        shed_log(log_entry, "sampled_out", loop)
+    elif decision == DEFER:
+        dropped = ingest_controller.defer((log_entry, loop))
+        if dropped is not None:
+            shed_log(dropped[0], "deferred_dropped", dropped[1])
+    elif decision not in (CRITICAL, NEW_SIGNATURE) and analysis_depth() >= analysis_capacity():
+        # Only events that must be analysed wait for room in a full queue
+        ingest_controller.record_shed("queue_full")
+        shed_log(log_entry, "queue_full", loop)
+    else:
+        dispatch_analysis(log_entry, loop)
+    release_deferred()
+
+def dispatch_analysis(log_entry, loop):
+    """Queue a log for analysis: a shard process, an analysis thread or (before startup) inline."""
+    submitted = time.monotonic()
+    # Sharded mode: a worker process analyses it and merge_shard_result finishes it here
+    if analysis_shards is not None:
+        analysis_shards.submit(shard_key(log_entry), (log_entry["message"], log_entry.get("fingerprint")),
+                               (log_entry, loop, submitted))
+    elif analysis_workers is not None:
+        analysis_workers.submit((log_entry, loop))
+    else:
+        analyze_and_complete((log_entry, loop))
+
+def analyze_and_complete(item):
+    """Analysis worker handler."""
+    log_entry, loop = item
+    started = time.monotonic()
     # Analyze log with Mistral AI
+    analysis = analyze_log_with_mistral(log_entry["message"], log_entry.get("fingerprint"))
+    ingest_controller.completed(time.monotonic() - started)
+    complete_log(log_entry, analysis, loop)
+
+def analysis_depth():
+    """Logs waiting for or undergoing analysis."""
+    if analysis_shards is not None:
+        return analysis_shards.pending_count()
+    return analysis_workers.depth() if analysis_workers is not None else 0
+
+def analysis_capacity():
+    """Queue depth beyond which ingest waits for analysis."""
+    return ANALYSIS_SHARDS * SHARD_QUEUE_SIZE if analysis_shards is not None else ANALYSIS_QUEUE_MAX
+
+def shed_log(log_entry, reason, loop):
+    """Record and stream a log without analysing it."""
+    log_entry["shed"] = reason
+    live_stats.record(shed=1)
+    complete_log(log_entry, None, loop)
+
+def release_deferred():
+    """Analyse a deferred INFO event once the backlog has cleared."""
+    item = ingest_controller.release(analysis_depth())
+    if item is not None:
+        dispatch_analysis(*item)
+
+def complete_log(log_entry, analysis, loop):
+    """Record an analysed log (stats, tickets, self-heal) and broadcast it."""
     try:
-        analysis = analyze_log_with_mistral(log_entry["message"])
+        # A recurring issue keeps its open tickets alive
+        if log_entry.get("alert_code") or analysis:
+            note_signature(ticket_signature({
+                "alert_code": log_entry.get("alert_code"),
+                "anomaly": (analysis or {}).get("anomaly")
+            }), log_entry["timestamp"])
         
         if analysis:
             # Store analysis
             analysis_entry = {
                 "timestamp": log_entry["timestamp"],
                 "log_message": log_entry["message"],
-                "analysis": analysis,
-                "id": len(current_analyses) + 1
+                "alert_code": log_entry.get("alert_code"),
+                "analysis": analysis
             }
-            current_analyses.append(analysis_entry)
-            if len(current_analyses) > 50:  # Keep last 50 analyses
-                current_analyses = current_analyses[-50:]
+            analysis_index.add(analysis_entry)
+            replicate("analysis", analysis_entry)
+            ingest_controller.learn(log_entry.get("alert_code"), analysis.get("severity"))
             
-            # Update stats based on action
-            if analysis.get('action') == 'self_healed':
-                current_stats['self_healed'] += 1
-                current_stats['support_hours_saved'] += analysis.get('support_hours_saved', 0)
-                print(f"🔧 Self-heal: {analysis.get('self_heal_result', 'Unknown')}")
-            elif analysis.get('action') == 'ticket_raised':
-                current_stats['tickets_raised'] += 1
-                
-                # Add ticket to current_tickets list
-                ticket_entry = {
-                    "ticket_id": analysis.get("ticket_id"),
-                    "timestamp": log_entry["timestamp"],
-                    "severity": analysis.get("severity", "Medium"),
-                    "anomaly": analysis.get("anomaly", "Unknown"),
-                    "description": log_entry["message"],
-                    "status": "Open"
-                }
-                current_tickets.insert(0, ticket_entry)  # Add to beginning
-                if len(current_tickets) > 50:  # Keep last 50 tickets
-                    current_tickets = current_tickets[:50]
-                
-                print(f"🎫 Ticket created: {analysis.get('ticket_id')}")
+            # Update stats based on action; self-heals are counted and stored once the action finishes
+            if analysis.get('action') == 'self_healing':
+                start_self_heal(analysis_entry)
+            else:
+                if event_store:
+                    event_store.record_analysis(analysis_entry)
+                if analysis.get('action') == 'ticket_raised':
+                    live_stats.record(tickets_raised=1)
+                    print(f"🎫 Ticket created: {analysis.get('ticket_id')}")
             
             print(f"✅ Analysis: {analysis.get('anomaly', 'Normal')} | Severity: {analysis.get('severity', 'Low')}")
+        elif log_entry.get("shed"):
+            print(f"⏭️ Shed ({log_entry['shed']}): {log_entry['message'][:100]}...")
         else:
             print(f"⚠️ Skipping log analysis for: {log_entry['message'][:100]}...")
             
@@ -799,49 +1326,93 @@ def log_callback(log_entry, loop):
         print(f"Error analyzing log: {e}")
     
     print(f"📝 New log: {log_entry.get('message', '')[:50]}...")
-    print(f"📊 Stats: {current_stats['total_logs']} logs, {current_stats['self_healed']} self-healed, {current_stats['tickets_raised']} tickets")
+    stats = stats_snapshot()
+    print(f"📊 Stats: {stats['total_logs']} logs, {stats['self_healed']} self-healed, {stats['tickets_raised']} tickets")
     
     # Broadcast updates via WebSocket
+    attributes = event_attributes(log_entry, analysis)
+    if event_bus is not None:
+        # Every instance, this one included, streams them from the bus
+        publish_event({"type": "new_log", "data": log_entry}, attributes)
+        publish_event({"type": "stats_update", "data": stats_snapshot()})
+        if len(ticket_index):
+            publish_event({"type": "tickets_update", "data": recent_tickets(10)})
+        return
     def broadcast():
         asyncio.create_task(broadcast_to_websockets({
             "type": "new_log",
             "data": log_entry
-        }))
+        }, attributes))
         asyncio.create_task(broadcast_to_websockets({
             "type": "stats_update",
-            "data": current_stats
+            "data": stats_snapshot()
         }))
-        if current_tickets:
+        if len(ticket_index):
             asyncio.create_task(broadcast_to_websockets({
                 "type": "tickets_update",
-                "data": current_tickets[:10]
+                "data": recent_tickets(10)
             }))
 
     if loop.is_running():
         loop.call_soon_threadsafe(broadcast)
 
+def shard_key(log_entry):
+    """Partition key: events with one signature always reach the same shard (and its router memory)."""
+    return log_entry.get("fingerprint") or log_entry.get("alert_code") or line_signature(log_entry["message"])
+
+def merge_shard_result(context, findings, error):
+    """Merge a shard worker's findings into the central tickets, stats and broadcasts."""
+    log_entry, loop, submitted = context
+    ingest_controller.completed(time.monotonic() - submitted)
+    analysis = None
+    if error:
+        print(f"❌ Shard analysis failed: {error}")
+    elif findings:
+        try:
+            analysis = act_on_findings(findings, log_entry["message"])
+        except Exception as e:
+            print(f"❌ Failed to act on shard analysis: {e}")
+    complete_log(log_entry, analysis, loop)
+    release_deferred()
+
+def init_analysis_shard():
+    """Shard worker setup: its own Ollama client, router memory and KEDB index (hot-reloaded)."""
+    global MISTRAL_CLIENT
+    MISTRAL_CLIENT = initialize_mistral()
+    kedb_manager.load()
+    kedb_manager.start_watching()
+
+def shard_analyze(log_line, fingerprint):
+    """Shard worker handler."""
+    if MISTRAL_CLIENT is None:
+        return None
+    return analyze_event(log_line, fingerprint)
+
+def shard_report():
+    """Per-worker counters sent back to the parent."""
+    return {
+        "router": model_router.status(),
+        "prompt_compaction": prompt_compactor.status(),
+        "kedb_version": kedb_manager.snapshot.version,
+    }
+
 def monitoring_loop(loop):
     """Background monitoring loop - EXACT same as Streamlit."""
     global is_monitoring
     
     print("🚀 Starting monitoring loop...")
     
-    while is_monitoring:
+    while is_monitoring and is_leader:
         try:
             # Generate new log (same as Streamlit)
-            new_log = generate_demo_log()
-            log_entry = {
-                "timestamp": datetime.now().isoformat(),
-                "message": new_log,
-                "level": "ERROR" if any(word in new_log.lower() for word in ['error', 'failed', 'timeout', 'critical']) else 
-                         "WARN" if any(word in new_log.lower() for word in ['warning', 'degradation', 'exceeded', 'leak']) else "INFO"
-            }
+            alert_code, new_log = generate_demo_event()
+            log_entry = build_log_entry(new_log, alert_code)
             
             # Process log (same as Streamlit)
             log_callback(log_entry, loop)
             
-            # Wait 3 seconds (same as Streamlit)
-            time.sleep(3)
+            # Wait 3 seconds (same as Streamlit), longer while analysis is behind
+            time.sleep(ingest_controller.pace(3))
             
         except Exception as e:
             print(f"Error in monitoring loop: {e}")
@@ -849,85 +1420,775 @@ def monitoring_loop(loop):
     
     print("🛑 Monitoring loop stopped")
 
+def ingest_assembled_event(event, loop):
+    """Feed one assembled file event through the normal log pipeline."""
+    log_callback(build_log_entry(event["text"], fingerprint=event["fingerprint"], source=event["source"]), loop)
+
+def start_log_tailing(loop):
+    """Tail PEGA_TAIL_LOGS through the event assembler, one thread per file."""
+    global event_assembler
+    event_assembler = EventAssembler(lambda event: ingest_assembled_event(event, loop),
+                                     flush_timeout=EVENT_FLUSH_TIMEOUT, max_lines=EVENT_MAX_LINES,
+                                     max_bytes=EVENT_MAX_BYTES)
+    event_assembler.start()
+    log_tail_stop.clear()
+    for path in TAIL_LOG_FILES:
+        threading.Thread(target=follow_file, args=(path, event_assembler, log_tail_stop, TAIL_FROM_START),
+                         daemon=True).start()
+        print(f"✅ Tailing {path}")
+
+def publish_event(message, attributes=None):
+    """Put an event on the bus for every instance to apply and stream."""
+    try:
+        event_bus.publish(message, attributes, origin=INSTANCE_ID)
+    except Exception as e:
+        print(f"❌ Failed to publish {message.get('type')} to the event bus: {e}")
+
+def replicate(record_type, data):
+    """Publish a leader-side state change (analysis, ticket) for follower instances to mirror."""
+    if event_bus is not None and is_leader:
+        publish_event({"type": record_type, "data": data})
+
+def mirror_analysis(analysis_entry):
+    """Add or update a leader's analysis here; ids are local, so the leader's id is mapped."""
+    leader_id = analysis_entry.pop("id", None)
+    local_id = mirrored_analyses.get(leader_id)
+    if local_id is not None and analysis_index.update(local_id, {"analysis": analysis_entry["analysis"]}) is not None:
+        return
+    mirrored_analyses[leader_id] = analysis_index.add(analysis_entry)
+    while len(mirrored_analyses) > ANALYSIS_RETENTION:
+        mirrored_analyses.popitem(last=False)
+
+def mirror_ticket(ticket):
+    """Add a leader's new ticket here, or apply its latest version to ours."""
+    ticket.pop("id", None)
+    with ticket_lock:
+        current = tickets_by_id.get(ticket["ticket_id"])
+        if current is None:
+            TICKETS_DATA.append(ticket)
+            tickets_by_id[ticket["ticket_id"]] = ticket
+            ticket_index.add(ticket)
+            ticket_stats.add(ticket)
+            note_signature(ticket_signature(ticket), ticket.get("timestamp"))
+            return
+        before = {field: current.get(field) for field in ("severity", "status", "category", "timestamp")}
+        if ticket_index.get(current.get("id")) is current:
+            ticket_index.update(current["id"], ticket)
+        else:
+            current.update(ticket)
+        ticket_stats.update(before, current)
+
+def mirror_stats(stats):
+    """Follow the leader's totals (and monitoring switch) so /status and the rates match it."""
+    global is_monitoring, stats_mirrored
+    is_monitoring = stats.get("monitoring_active", is_monitoring)
+    leader_totals = {"logs": stats["total_logs"], "self_healed": stats["self_healed"],
+                     "tickets_raised": stats["tickets_raised"], "hours_saved": stats["support_hours_saved"],
+                     "shed": stats.get("shed_logs", 0)}
+    if not stats_mirrored:
+        live_stats.set_totals(**leader_totals)
+        stats_mirrored = True
+        return
+    totals = live_stats.totals()
+    changes = {metric: value - totals[metric] for metric, value in leader_totals.items() if value != totals[metric]}
+    if changes:
+        live_stats.record(**changes)
+
+def mirror_event(message):
+    """Apply another instance's state change here; returns the message to stream, if any."""
+    event_type = message.get("type")
+    data = message.get("data")
+    if event_type == "new_log":
+        data.pop("id", None)
+        log_index.add(data)
+        if search_index is not None:
+            search_index.submit(data["message"], data["timestamp"], data["id"], data.get("alert_code"))
+        if data.get("alert_code"):
+            # Recurrence keeps tickets open; needed should this instance take over
+            note_signature(data["alert_code"], data["timestamp"])
+        return message
+    if event_type == "analysis":
+        mirror_analysis(data)
+    elif event_type == "ticket":
+        mirror_ticket(data)
+    elif event_type == "stats_update":
+        mirror_stats(data)
+        return {"type": "stats_update", "data": stats_snapshot()}
+    elif event_type == "tickets_update":
+        return {"type": "tickets_update", "data": recent_tickets(10)}
+    return None
+
+async def apply_bus_events(events):
+    """Apply a batch of bus events in order: mirror state, stream, and run or answer forwarded writes."""
+    for event in events:
+        message = event["message"]
+        event_type = message.get("type")
+        if event_type == "leader_call":
+            if is_leader and message["data"]["deadline"] > time.time():
+                asyncio.create_task(answer_leader_call(message["data"]))
+            elif not is_leader:
+                unanswered_leader_calls[message["data"]["call_id"]] = message["data"]
+            continue
+        if event_type == "leader_result":
+            unanswered_leader_calls.pop(message["data"]["call_id"], None)
+            future = pending_leader_calls.get(message["data"]["call_id"])
+            if future is not None and not future.done():
+                future.set_result(message["data"]["reply"])
+            continue
+        if event["origin"] != INSTANCE_ID:
+            try:
+                message = mirror_event(message)
+            except Exception as e:
+                print(f"❌ Failed to mirror {event_type} from the event bus: {e}")
+                continue
+        if message is not None and event_type in STREAMED_TYPES:
+            await broadcast_to_websockets(message, event["attributes"], seq=event["id"])
+
+async def call_leader(request):
+    """Forward a write request to the leader over the bus and wait for its reply (None on timeout)."""
+    call_id = uuid.uuid4().hex
+    future = asyncio.get_running_loop().create_future()
+    pending_leader_calls[call_id] = future
+    try:
+        await asyncio.to_thread(event_bus.publish, {"type": "leader_call", "data": {
+            "call_id": call_id, "deadline": time.time() + LEADER_CALL_TIMEOUT, "request": request
+        }}, None, INSTANCE_ID)
+        return await asyncio.wait_for(future, LEADER_CALL_TIMEOUT)
+    except asyncio.TimeoutError:
+        print(f"❌ No leader answered {request['method']} {request['path']}")
+        return None
+    finally:
+        pending_leader_calls.pop(call_id, None)
+
+def answer_unanswered_calls():
+    """After taking over: answer forwarded writes that reached the bus while there was no leader."""
+    now = time.time()
+    for call in list(unanswered_leader_calls.values()):
+        if call["deadline"] > now:
+            asyncio.create_task(answer_leader_call(call))
+    unanswered_leader_calls.clear()
+
+async def answer_leader_call(call):
+    """Run a forwarded write request here (the leader) and publish the response."""
+    try:
+        reply = await run_request(app, call["request"])
+    except Exception as e:
+        print(f"❌ Forwarded {call['request']['method']} {call['request']['path']} failed: {e}")
+        reply = {"status": 500, "headers": [["content-type", "application/json"]],
+                 "body": base64.b64encode(json.dumps({"detail": str(e)}).encode("utf-8")).decode("ascii")}
+    await asyncio.to_thread(publish_event, {"type": "leader_result", "data": {"call_id": call["call_id"],
+                                                                              "reply": reply}})
+
+def open_leader_writers():
+    """Open what only the leader writes: the event store writer and the ticket WAL."""
+    global ticket_wal
+    if event_store:
+        try:
+            event_store.start_writer()
+            if event_store.count("tickets") < len(TICKETS_DATA):
+                for ticket in TICKETS_DATA:
+                    event_store.record_ticket(ticket)
+        except Exception as e:
+            print(f"❌ Event store is read-only ({EVENT_STORE_PATH}): {e}")
+    if ticket_wal is None:
+        try:
+            ticket_wal = TicketWAL(TICKET_WAL_PATH)
+        except OSError as e:
+            print(f"❌ Ticket WAL unavailable ({TICKET_WAL_PATH}): {e}; rewriting the ticket files instead")
+
+def close_leader_writers():
+    """Hand the event store and ticket WAL over after losing the lease (no final compaction: the new leader owns the files)."""
+    global ticket_wal
+    with ticket_lock:
+        if ticket_wal is not None:
+            ticket_wal.close()
+            ticket_wal = None
+    if event_store:
+        event_store.stop_writer()
+
+def start_leader_duties(loop):
+    """Start what only the leader runs: ingestion, analysis workers, ticket sweeps and exports."""
+    global ticket_exporter, analytics_exporter, analysis_shards, analysis_workers, monitoring_thread
+    open_leader_writers()
+    ticket_sweeper_stop.clear()
+    threading.Thread(target=ticket_sweeper_loop, daemon=True).start()
+    
+    # Push new tickets to the ITSM in the background
+    if ITSM_URL:
+        try:
+            ticket_exporter = TicketExporter(HttpTicketSink(ITSM_URL, token=ITSM_TOKEN),
+                                             TicketOutbox(ITSM_OUTBOX_PATH), on_exported=record_itsm_refs)
+            ticket_exporter.start()
+            print(f"✅ Ticket export to {ITSM_URL} enabled")
+        except Exception as e:
+            print(f"❌ Failed to start ticket export: {e}")
+            ticket_exporter = None
+    
+    # Append new analyses and ticket versions to the analytics export in the background
+    if event_store and ANALYTICS_INTERVAL > 0:
+        try:
+            analytics_exporter = AnalyticsExporter(event_store, ANALYTICS_DIR, interval=ANALYTICS_INTERVAL)
+            analytics_exporter.start()
+            print(f"✅ Analytics export to {ANALYTICS_DIR} every {ANALYTICS_INTERVAL:.0f}s")
+        except Exception as e:
+            print(f"❌ Analytics export disabled: {e}")
+            analytics_exporter = None
+    
+    # Analysis worker processes (each loads its own model client and KEDB index)
+    if ANALYSIS_SHARDS > 0:
+        analysis_shards = ShardPool(ANALYSIS_SHARDS, init_analysis_shard, shard_analyze, merge_shard_result,
+                                    reporter=shard_report, queue_size=SHARD_QUEUE_SIZE)
+        analysis_shards.start()
+    else:
+        analysis_workers = AnalysisWorkers(analyze_and_complete, workers=ANALYSIS_WORKERS, max_size=ANALYSIS_QUEUE_MAX,
+                                           after=release_deferred)
+        analysis_workers.start()
+    
+    # Ingest real log files when configured, and carry on monitoring a previous leader started
+    if TAIL_LOG_FILES:
+        start_log_tailing(loop)
+    if is_monitoring and (monitoring_thread is None or not monitoring_thread.is_alive()):
+        monitoring_thread = threading.Thread(target=monitoring_loop, args=(loop,), daemon=True)
+        monitoring_thread.start()
+
+def stop_leader_duties():
+    """Stop the leader-only work (on shutdown, or when another instance has taken the lease)."""
+    global ticket_exporter, analytics_exporter, analysis_shards, analysis_workers
+    ticket_sweeper_stop.set()
+    log_tail_stop.set()
+    if event_assembler is not None:
+        event_assembler.stop()
+    if analysis_shards is not None:
+        analysis_shards.stop()
+        analysis_shards = None
+    if analysis_workers is not None:
+        analysis_workers.stop()
+        analysis_workers = None
+    if ticket_exporter is not None:
+        ticket_exporter.stop()
+        ticket_exporter = None
+    if analytics_exporter is not None:
+        if event_store:
+            event_store.flush()
+        analytics_exporter.stop()
+        analytics_exporter = None
+
+def leadership_loop(loop):
+    """Renew the leader lease, or take over once the leader has stopped renewing it."""
+    global is_leader
+    while not leader_stop.wait(LEADER_TTL / 3):
+        try:
+            leading = event_bus.try_lead(INSTANCE_ID, LEADER_TTL)
+        except Exception as e:
+            print(f"❌ Leader lease check failed: {e}")
+            continue
+        if leading and not is_leader:
+            is_leader = True
+            print(f"👑 {INSTANCE_ID} took over as leader")
+            # Changes the old leader logged but never published
+            replay_ticket_wal(live=True)
+            start_leader_duties(loop)
+            loop.call_soon_threadsafe(answer_unanswered_calls)
+        elif is_leader and not leading:
+            # Another instance holds the lease now (this one stalled past the TTL)
+            is_leader = False
+            print(f"⚠️ {INSTANCE_ID} lost the leader lease; handing ingestion over")
+            stop_leader_duties()
+            close_leader_writers()
+
+def search_backfill_rows(until_id: int):
+    """Stored log lines from the backfill window, as search index entries.
+
+    Stops at ``until_id`` (the newest row at startup) so lines ingested live
+    meanwhile are not indexed twice.
+    """
+    since = (datetime.now() - timedelta(hours=SEARCH_BACKFILL_HOURS)).isoformat()
+    for row in event_store.iter_rows("logs", since=since, until_id=until_id):
+        yield row["message"], row["timestamp"], None, row.get("alert_code")
+
 @app.on_event("startup")
 async def startup_event():
     """Initialize components."""
-    global MISTRAL_CLIENT, KEDB_DATA, TICKETS_DATA
+    global MISTRAL_CLIENT, TICKETS_DATA, event_store, search_index, ticket_stats, ticket_wal, ticket_exporter
+    global heal_executor, heal_mapping, stream_journal, event_bus, bus_follower, is_leader
     
     print("🚀 Starting Pega Log Analyzer API...")
+    loop = asyncio.get_running_loop()
+    
+    # Join the event bus and find out whether this instance leads
+    if EVENT_BUS_URL:
+        event_bus = open_bus(EVENT_BUS_URL, retain=EVENT_BUS_RETAIN)
+        is_leader = event_bus.try_lead(INSTANCE_ID, LEADER_TTL)
+        print(f"✅ Instance {INSTANCE_ID} joined event bus {EVENT_BUS_URL} as {'leader' if is_leader else 'follower'}")
     
     # Initialize Mistral AI
     MISTRAL_CLIENT = initialize_mistral()
+    if MISTRAL_CLIENT is not None:
+        MISTRAL_CLIENT.start_warming()
     
-    # Load KEDB and tickets
-    KEDB_DATA = load_kedb()
+    # Load KEDB (indexed and embedded per version) and watch it for changes
+    kedb_manager.load()
+    kedb_manager.start_watching()
     TICKETS_DATA = load_tickets()
     
-    # Load existing tickets into current_tickets
+    # Bring tickets up to date with logged lifecycle changes, then index them
+    # (the leader opens the WAL for writing when it starts its duties)
     for ticket in TICKETS_DATA:
-        ticket_entry = {
-            "ticket_id": ticket.get("ticket_id", "Unknown"),
-            "timestamp": ticket.get("timestamp", "Unknown"),
-            "severity": ticket.get("severity", "Medium"),
-            "anomaly": ticket.get("anomaly", "Unknown"),
-            "description": ticket.get("log_line", "No description"),
-            "status": ticket.get("status", "Open")
-        }
-        current_tickets.append(ticket_entry)
+        tickets_by_id[ticket["ticket_id"]] = ticket
+    replay_ticket_wal()
+    for ticket in TICKETS_DATA:
+        ticket_index.add(ticket)
+        if ticket.get("status") in OPEN_TICKET_STATUSES:
+            note_signature(ticket_signature(ticket), ticket.get("timestamp"))
+    ticket_stats = TicketStats(TICKETS_DATA)
+    
+    # Self-heal actions and their worker pool
+    try:
+        actions, heal_mapping = load_actions(SELF_HEAL_CONFIG)
+    except Exception as e:
+        print(f"❌ Invalid self-heal config {SELF_HEAL_CONFIG}: {e}")
+        actions, heal_mapping = load_actions("")
+    heal_executor = SelfHealExecutor(actions, max_workers=SELF_HEAL_WORKERS)
+    
+    # Open the event store and warm the in-memory indexes from recent history
+    # (read-only here; the leader starts the writer with its duties)
+    try:
+        event_store = EventStore(EVENT_STORE_PATH, retention_days=EVENT_RETENTION_DAYS, writable=False)
+        for log_entry in event_store.recent("logs", LOG_RETENTION):
+            log_entry.pop("store_id", None)
+            log_index.add(log_entry)
+        for analysis_entry in event_store.recent("analyses", ANALYSIS_RETENTION):
+            analysis_entry.pop("store_id", None)
+            analysis_index.add(analysis_entry)
+        print(f"✅ Event store ready: {len(log_index)} logs and {len(analysis_index)} analyses restored")
+    except Exception as e:
+        print(f"❌ Failed to open event store ({EVENT_STORE_PATH}): {e}")
+        event_store = None
+    
+    # Start the search indexer; it backfills recent history before any live line
+    backfill = None
+    if event_store:
+        newest = event_store.query("logs", limit=1)
+        backfill = search_backfill_rows(newest[0]["store_id"] if newest else 0)
+    search_index = LogSearchIndex(max_docs=SEARCH_MAX_DOCS, backfill=backfill)
+    
+    # Journal of streamed events for reconnecting clients
+    if event_bus is not None:
+        # Numbered by bus id, which every instance shares; older events stay on the bus, not in a spill
+        position = event_bus.last_id()
+        stream_journal = EventJournal(STREAM_JOURNAL_SIZE, first_seq=position + 1)
+        bus_follower = BusFollower(event_bus,
+                                   lambda events: asyncio.run_coroutine_threadsafe(apply_bus_events(events), loop).result(),
+                                   after_id=position, poll_interval=EVENT_BUS_POLL)
+        bus_follower.start()
+        leader_stop.clear()
+        threading.Thread(target=leadership_loop, args=(loop,), daemon=True).start()
+    else:
+        try:
+            stream_journal = EventJournal(STREAM_JOURNAL_SIZE, spill_dir=STREAM_JOURNAL_SPILL,
+                                          spill_events=STREAM_JOURNAL_SPILL_EVENTS)
+        except OSError as e:
+            print(f"❌ Stream journal spill unavailable ({STREAM_JOURNAL_SPILL}): {e}; keeping events in memory only")
+            stream_journal = EventJournal(STREAM_JOURNAL_SIZE)
+    
+    if is_leader:
+        start_leader_duties(loop)
     
     print("✅ Components initialized successfully")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Flush pending history writes."""
+    kedb_manager.stop()
+    if event_bus is not None:
+        leader_stop.set()
+        if bus_follower is not None:
+            bus_follower.stop()
+    stop_leader_duties()
+    if stream_journal is not None:
+        stream_journal.close()
+    if MISTRAL_CLIENT is not None:
+        MISTRAL_CLIENT.close()
+    if heal_executor is not None:
+        heal_executor.shutdown()
+    if ticket_wal is not None:
+        if is_leader:
+            compact_ticket_wal(force=True)
+        ticket_wal.close()
+    if event_store:
+        event_store.close()
+    if event_bus is not None:
+        if is_leader:
+            event_bus.resign(INSTANCE_ID)  # a follower takes over at its next lease check
+        event_bus.close()
+    if search_index is not None:
+        search_index.close()
+
+def check_not_modified(request: Request, response: Response, state: str, modified_at: float) -> Optional[Response]:
+    """Attach ETag/Last-Modified validators; return a 304 if the client's copy is current."""
+    digest = hashlib.sha1(f"{state}?{request.url.query}".encode("utf-8")).hexdigest()[:16]
+    headers = {
+        "ETag": f'W/"{DATA_EPOCH}-{digest}"',
+        "Last-Modified": formatdate(modified_at, usegmt=True),
+        "Cache-Control": "no-cache",
+    }
+    client_tags = [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]
+    if headers["ETag"] in client_tags or "*" in client_tags:
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
 @app.get("/status")
-async def get_status():
+async def get_status(request: Request, response: Response):
     """Get system status."""
-    return {
+    status = {
         "status": "running",
         "monitoring_active": is_monitoring,
         "components": {
             "mistral_ai": MISTRAL_CLIENT is not None,
-            "kedb": len(KEDB_DATA) > 0,
-            "tickets": len(TICKETS_DATA)
+            "kedb": len(kedb_manager.snapshot) > 0,
+            "kedb_version": kedb_manager.snapshot.version,
+            "kedb_vectors": kedb_manager.snapshot.info()["vectors"],
+            "tickets": ticket_stats.total
         },
-        "stats": current_stats
+        "stats": stats_snapshot()
     }
+    # The status payload is tiny; its own hash is the cheapest validator
+    modified_at = max(log_index.modified_at, analysis_index.modified_at, ticket_index.modified_at)
+    not_modified = check_not_modified(request, response, json.dumps(status, sort_keys=True, default=str), modified_at)
+    return not_modified or status
+
+@app.get("/stats/rates")
+async def get_stat_rates(resolution: str = "second", points: Optional[int] = None, metrics: Optional[str] = None):
+    """Rolling per-bucket counts of logs, self-heals, tickets and hours saved, oldest first.
+    
+    resolution is second, minute or hour; bucket i starts at start + i * bucket_seconds.
+    """
+    if resolution not in live_stats.resolutions():
+        raise HTTPException(status_code=400, detail=f"resolution must be one of {', '.join(live_stats.resolutions())}")
+    return live_stats.series(resolution, points=points, metrics=parse_filter(metrics))
+
+def query_collection(collection, request, response, limit, since_id=None, since_timestamp=None,
+                     since_version=None, filters=None, newest_first=False, transform=None):
+    """Run a cursor or since_version query, answering 304 when the collection is unchanged."""
+    # Read the version before querying: a change racing the query only makes the ETag stale
+    not_modified = check_not_modified(request, response, f"{collection.name}:{collection.version}",
+                                      collection.modified_at)
+    if not_modified:
+        return not_modified
+    response.headers["X-Data-Version"] = str(collection.version)
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    if since_version is not None:
+        page = collection.changes_since(since_version, filters=filters, limit=limit)
+        response.headers["X-Next-Version"] = str(page["next_version"])
+    else:
+        page = collection.query(
+            since_id=since_id,
+            since_timestamp=since_timestamp,
+            filters=filters,
+            limit=limit,
+            newest_first=newest_first
+        )
+        response.headers["X-Next-Cursor"] = str(page["next_cursor"])
+    response.headers["X-Has-More"] = "true" if page["has_more"] else "false"
+    if transform:
+        return [item if item.get("removed") else transform(item) for item in page["items"]]
+    return page["items"]
 
 @app.get("/logs")
-async def get_logs(limit: int = 20):
-    """Get recent logs."""
-    return current_logs[-limit:] if current_logs else []
+async def get_logs(request: Request, response: Response, limit: int = 20, since_id: Optional[int] = None,
+                   since_timestamp: Optional[str] = None, since_version: Optional[int] = None,
+                   level: Optional[str] = None, alert_code: Optional[str] = None):
+    """Get recent logs, or only those after a since_id/since_timestamp/since_version cursor."""
+    return query_collection(log_index, request, response, limit, since_id, since_timestamp, since_version, {
+        "level": parse_filter(level),
+        "alert_code": parse_filter(alert_code)
+    })
 
 @app.post("/generate-log")
 async def generate_log():
-    """Generate a new log entry."""
-    global current_logs
-    new_log = generate_demo_log()
-    current_logs.append(new_log)
+    """Generate a new log entry and ingest it like a monitored one (stored, indexed, analysed, streamed)."""
+    alert_code, new_log = generate_demo_event()
+    # Analysis may run inline or wait for queue room, so keep it off the event loop
+    await asyncio.to_thread(log_callback, build_log_entry(new_log, alert_code), asyncio.get_running_loop())
     return {"message": "Log generated", "log": new_log}
 
 @app.get("/analyses")
-async def get_analyses(limit: int = 15):
-    """Get recent analyses."""
-    return current_analyses[-limit:] if current_analyses else []
+async def get_analyses(request: Request, response: Response, limit: int = 15, since_id: Optional[int] = None,
+                       since_timestamp: Optional[str] = None, since_version: Optional[int] = None,
+                       severity: Optional[str] = None,
+                       category: Optional[str] = None, alert_code: Optional[str] = None,
+                       action: Optional[str] = None):
+    """Get recent analyses, or only those after a cursor, filtered by index fields."""
+    return query_collection(analysis_index, request, response, limit, since_id, since_timestamp, since_version, {
+        "severity": parse_filter(severity),
+        "category": parse_filter(category),
+        "alert_code": parse_filter(alert_code),
+        "action": parse_filter(action)
+    })
 
 @app.get("/tickets")
-async def get_tickets(frontend_version: str = "v1"):
-    """Get current tickets."""
+async def get_tickets(request: Request, response: Response, frontend_version: str = "v1", limit: int = 10,
+                      since_id: Optional[int] = None, since_timestamp: Optional[str] = None,
+                      since_version: Optional[int] = None,
+                      severity: Optional[str] = None, category: Optional[str] = None,
+                      alert_code: Optional[str] = None, status: Optional[str] = None):
+    """Get current tickets, or only those after a cursor, filtered by index fields."""
+    filters = {
+        "severity": parse_filter(severity),
+        "category": parse_filter(category),
+        "alert_code": parse_filter(alert_code),
+        "status": parse_filter(status)
+    }
     if frontend_version == "v2":
-        # Load tickets from v2 file
-        v2_tickets = load_tickets("v2")
-        return v2_tickets[:10] if v2_tickets else []
-    return current_tickets[:10] if current_tickets else []
+        # v2 lists full tickets in file order, served from the index instead of re-reading the file
+        if since_id is None and not since_timestamp:
+            since_id = 0
+        return query_collection(ticket_index, request, response, limit, since_id, since_timestamp, since_version, filters)
+    return query_collection(ticket_index, request, response, limit, since_id, since_timestamp, since_version, filters,
+                            newest_first=True, transform=ticket_summary)
+
+@app.get("/tickets/summary")
+async def get_ticket_summary(request: Request, response: Response, days: Optional[int] = None):
+    """Ticket counts by severity, status, category and day (maintained incrementally)."""
+    not_modified = check_not_modified(request, response, f"summary:{ticket_index.version}", ticket_index.modified_at)
+    return not_modified or ticket_stats.summary(days)
+
+def ticket_or_404(ticket_id):
+    """Look a ticket up by id or answer 404."""
+    ticket = tickets_by_id.get(ticket_id)
+    if ticket is None:
+        raise HTTPException(status_code=404, detail=f"Ticket {ticket_id} not found")
+    return ticket
+
+@app.get("/tickets/{ticket_id}")
+async def get_ticket(ticket_id: str):
+    """Get one ticket by id."""
+    return ticket_or_404(ticket_id)
+
+@app.patch("/tickets/{ticket_id}")
+def update_ticket(ticket_id: str, changes: Dict[str, Any]):
+    """Update a ticket's status, severity, category, assignee or resolution."""
+    ticket = ticket_or_404(ticket_id)
+    unknown = set(changes) - set(UPDATABLE_TICKET_FIELDS)
+    if unknown or not changes:
+        raise HTTPException(status_code=400, detail=f"Updatable fields are {', '.join(UPDATABLE_TICKET_FIELDS)}")
+    if "status" in changes and changes["status"] not in TICKET_STATUSES:
+        raise HTTPException(status_code=400, detail=f"Status must be one of {', '.join(TICKET_STATUSES)}")
+    if changes.get("status") == "Merged":
+        raise HTTPException(status_code=400, detail=f"Use /tickets/{ticket_id}/merge to merge tickets")
+    return apply_ticket_changes([(ticket, changes)])[0]
+
+@app.post("/tickets/bulk-close")
+def bulk_close_tickets(severity: Optional[str] = None, category: Optional[str] = None,
+                       alert_code: Optional[str] = None, status: Optional[str] = None,
+                       before: Optional[str] = None, resolution: str = "Bulk closed"):
+    """Close every open ticket matching the filters (at least one filter is required)."""
+    filters = {
+        "severity": parse_filter(severity),
+        "category": parse_filter(category),
+        "alert_code": parse_filter(alert_code),
+        "status": [value for value in parse_filter(status) if value in OPEN_TICKET_STATUSES]
+    }
+    if not any(filters[field] for field in ("severity", "category", "alert_code")) and not before:
+        raise HTTPException(status_code=400, detail="Give at least one of severity, category, alert_code or before")
+    with ticket_lock:
+        tickets = [ticket for ticket in open_tickets(filters)
+                   if not before or str(ticket.get("timestamp", "")) < before]
+        now = datetime.now().isoformat()
+        apply_ticket_changes([(ticket, {"status": "Closed", "closed_at": now, "resolution": resolution})
+                              for ticket in tickets])
+    return {"closed": len(tickets), "ticket_ids": [ticket["ticket_id"] for ticket in tickets]}
+
+@app.post("/tickets/{ticket_id}/resolve")
+def resolve_ticket(ticket_id: str, resolution: Optional[str] = None):
+    """Mark a ticket resolved."""
+    ticket = ticket_or_404(ticket_id)
+    changes = {"status": "Resolved", "resolved_at": datetime.now().isoformat()}
+    if resolution:
+        changes["resolution"] = resolution
+    return apply_ticket_changes([(ticket, changes)])[0]
+
+@app.post("/tickets/{ticket_id}/merge")
+def merge_ticket(ticket_id: str, into: str):
+    """Merge a duplicate ticket into another; the target keeps the combined history."""
+    if ticket_id == into:
+        raise HTTPException(status_code=400, detail="Cannot merge a ticket into itself")
+    with ticket_lock:
+        source, target = ticket_or_404(ticket_id), ticket_or_404(into)
+        if source.get("status") == "Merged" or target.get("status") == "Merged":
+            raise HTTPException(status_code=409, detail="Merged tickets cannot be merged again")
+        merged_ids = target.get("merged_tickets", []) + [ticket_id] + source.get("merged_tickets", [])
+        apply_ticket_changes([
+            (source, {"status": "Merged", "merged_into": into}),
+            (target, {"merged_tickets": merged_ids,
+                      "occurrences": target.get("occurrences", 1) + source.get("occurrences", 1)}),
+        ])
+    return target
+
+@app.get("/models/status")
+async def get_model_status():
+    """Model routing counters, prompt compaction savings and Ollama pool, residency and timings."""
+    return {
+        **model_router.status(),
+        "prompt_compaction": prompt_compactor.status(),
+        "inference": MISTRAL_CLIENT.status() if MISTRAL_CLIENT is not None else None,
+    }
+
+@app.get("/shards/status")
+async def get_shard_status():
+    """Per-shard queue depth, throughput, latency and worker-side router counters."""
+    if analysis_shards is None:
+        return {"shards": 0, "mode": "in-process"}
+    return {"mode": "sharded", **analysis_shards.status()}
+
+@app.get("/ingest/status")
+async def get_ingest_status():
+    """Tailed files, event assembly counters and load shedding (backlog, level, shed counts)."""
+    return {
+        "files": TAIL_LOG_FILES,
+        "assembler": event_assembler.status() if event_assembler is not None else None,
+        "analysis": {"mode": "sharded" if analysis_shards is not None else "in-process",
+                     "depth": analysis_depth(), "capacity": analysis_capacity()},
+        "control": ingest_controller.status(analysis_depth()),
+    }
+
+@app.get("/self-heal/status")
+async def get_self_heal_status():
+    """Self-heal throughput, per-action latency and open circuit breakers."""
+    if heal_executor is None:
+        return {"enabled": False}
+    return {"enabled": True, **heal_executor.status()}
+
+@app.get("/export/status")
+async def get_export_status():
+    """Ticket export outbox and delivery counters."""
+    if ticket_exporter is None:
+        return {"enabled": False}
+    return {"enabled": True, **ticket_exporter.status()}
+
+@app.post("/export/requeue-dead")
+def requeue_dead_exports():
+    """Retry dead-lettered ticket exports."""
+    if ticket_exporter is None:
+        raise HTTPException(status_code=503, detail="Ticket export not enabled (set PEGA_ITSM_URL)")
+    return {"requeued": ticket_exporter.outbox.requeue_dead()}
+
+@app.get("/analytics/status")
+async def get_analytics_status():
+    """Analytics export checkpoints and counters."""
+    if analytics_exporter is None:
+        return {"enabled": False}
+    return {"enabled": True, **analytics_exporter.status()}
+
+@app.post("/analytics/export")
+def run_analytics_export():
+    """Export rows written since the last run now, instead of waiting for the interval."""
+    if analytics_exporter is None:
+        raise HTTPException(status_code=503, detail="Analytics export not enabled (needs pyarrow and the event store)")
+    if event_store:
+        event_store.flush()
+    return {"exported": analytics_exporter.export_once()}
+
+@app.get("/analytics/{dataset}")
+def download_analytics(dataset: str, since: Optional[str] = None, until: Optional[str] = None,
+                       format: str = "parquet"):
+    """Stream exported analyses or ticket versions with since <= timestamp < until as Parquet or CSV."""
+    if analytics_exporter is None:
+        raise HTTPException(status_code=503, detail="Analytics export not enabled (needs pyarrow and the event store)")
+    if dataset not in ("analyses", "tickets"):
+        raise HTTPException(status_code=404, detail=f"Unknown dataset: {dataset}")
+    if format not in ("parquet", "csv"):
+        raise HTTPException(status_code=400, detail="format must be parquet or csv")
+    chunks = analytics_exporter.stream(dataset, since=since, until=until, fmt=format)
+    try:
+        first = next(chunks)  # validates the range before the response starts
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    def body():
+        yield first
+        yield from chunks
+    
+    filename = f"{dataset}_{(since or 'start')[:10]}_{(until or 'now')[:10]}.{format}"
+    return StreamingResponse(body(), media_type="text/csv" if format == "csv" else "application/octet-stream",
+                             headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+@app.get("/history/{collection}")
+def get_history(collection: str, response: Response, since: Optional[str] = None,
+                until: Optional[str] = None, before_id: Optional[int] = None, limit: int = 100,
+                level: Optional[str] = None, alert_code: Optional[str] = None,
+                severity: Optional[str] = None, category: Optional[str] = None,
+                action: Optional[str] = None, status: Optional[str] = None):
+    """Query stored history (newest first) over an ISO timestamp range.
+    
+    Page backwards with before_id (logs, analyses) or until (tickets) set to X-Next-Cursor.
+    """
+    if collection not in ("logs", "analyses", "tickets"):
+        raise HTTPException(status_code=404, detail=f"Unknown collection: {collection}")
+    if not event_store:
+        raise HTTPException(status_code=503, detail="Event store not available")
+    
+    items = event_store.query(collection, since=since, until=until, before_id=before_id,
+                              limit=max(1, min(limit, MAX_HISTORY_PAGE)), filters={
+        "level": parse_filter(level),
+        "alert_code": parse_filter(alert_code),
+        "severity": parse_filter(severity),
+        "category": parse_filter(category),
+        "action": parse_filter(action),
+        "status": parse_filter(status)
+    })
+    if items:
+        response.headers["X-Next-Cursor"] = str(items[-1]["timestamp"] if collection == "tickets" else items[-1]["store_id"])
+    return items
+
+@app.get("/search")
+def search_logs(q: str = "", since: Optional[str] = None, until: Optional[str] = None,
+                limit: int = 20, offset: int = 0):
+    """Ranked full-text search over ingested log lines.
+    
+    Supports code:, thread:, requestor:, rule: and endpoint: terms, bare alert codes,
+    and ISO or relative (e.g. 24h) time bounds.
+    """
+    if search_index is None:
+        raise HTTPException(status_code=503, detail="Search index not available")
+    try:
+        return search_index.search(q, since=since, until=until,
+                                   limit=max(1, min(limit, MAX_SEARCH_PAGE)), offset=max(0, offset))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid time bound: {e}")
+
+@app.get("/kedb")
+async def get_kedb(include_entries: bool = False):
+    """Live KEDB version, optionally with its entries."""
+    kedb = kedb_manager.snapshot
+    result = kedb.info()
+    if include_entries:
+        result["entries_data"] = kedb.entries
+    return result
+
+@app.put("/kedb")
+def upload_kedb(entries: List[Dict[str, Any]]):
+    """Replace the KEDB with uploaded entries; validated, indexed and swapped in live."""
+    try:
+        return kedb_manager.upload(entries).info()
+    except KedbValidationError as e:
+        raise HTTPException(status_code=400, detail={"message": "Invalid KEDB", "errors": e.errors})
+
+@app.post("/kedb/reload")
+def reload_kedb():
+    """Reload the KEDB from disk now instead of waiting for the file watcher."""
+    return kedb_manager.load().info()
 
 @app.post("/monitoring/start")
 async def start_monitoring():
     """Start monitoring."""
-    global is_monitoring, monitoring_thread, current_stats
+    global is_monitoring, monitoring_thread
     
     if is_monitoring:
         return {"message": "Monitoring already active", "status": "running"}
     
     is_monitoring = True
-    current_stats["monitoring_active"] = True
     loop = asyncio.get_running_loop()
     monitoring_thread = threading.Thread(target=monitoring_loop, args=(loop,), daemon=True)
     monitoring_thread.start()
@@ -937,47 +2198,199 @@ async def start_monitoring():
 @app.post("/monitoring/stop")
 async def stop_monitoring():
     """Stop monitoring."""
-    global is_monitoring, current_stats
+    global is_monitoring
     
     is_monitoring = False
-    current_stats["monitoring_active"] = False
     
     return {"message": "Monitoring stopped successfully", "status": "stopped"}
 
+@app.get("/cluster/status")
+async def get_cluster_status():
+    """This instance's role when scaled out, the current leader and how far behind the bus it is."""
+    if event_bus is None:
+        return {"mode": "single", "instance": INSTANCE_ID, "leader": True}
+    return {
+        "mode": "event_bus",
+        "instance": INSTANCE_ID,
+        "leader": is_leader,
+        "bus": await asyncio.to_thread(event_bus.status),
+        "follower": bus_follower.status() if bus_follower is not None else None,
+        "pending_leader_calls": len(pending_leader_calls),
+    }
+
+@app.get("/stream/status")
+async def get_stream_status():
+    """Connected /stream clients, their subscriptions and filters, and what each has been sent."""
+    return {
+        **stream_index.status(),
+        "bytes_sent": sum(client.sent["bytes"] for client in stream_index),
+        "connections": [{"transport": client.transport, **client.subscription.describe(), **client.sent}
+                        for client in stream_index]
+    }
+
+async def replay_events(client, entries):
+    """Send journaled events to one client, applying its subscription and filters."""
+    for _, message, attributes in entries:
+        if attributes is None or client.subscription.matches(attributes):
+            await client.send(message)
+
+async def join_stream(client, seq):
+    """Send a client every journaled event after seq, then add it to live broadcasts.
+    
+    The last journal check and the index insert run without an await in between, so an
+    event is either replayed or broadcast to the client, never both or neither.
+    """
+    while True:
+        entries = stream_journal.since(seq) if stream_journal is not None else []
+        if not entries:
+            break
+        await replay_events(client, entries)
+        seq = entries[-1][0]
+    stream_index.add(client)
+
+async def start_stream(client, resume_from=None):
+    """Bring a new /stream client up to date, then add it to live broadcasts.
+    
+    A client resuming inside the journal's window gets the events it missed, a "resumed"
+    message and fresh stats and tickets; any other client gets an initial_data snapshot.
+    """
+    # Replay what a reconnecting client missed (possibly read from disk, so off the event loop)
+    missed = None
+    if resume_from is not None and stream_journal is not None:
+        missed = await asyncio.to_thread(stream_journal.since, resume_from)
+    if missed is not None:
+        await replay_events(client, missed)
+        await join_stream(client, missed[-1][0] if missed else resume_from)
+        await client.send({"type": "resumed", "data": {"from": resume_from, "replayed": len(missed)}})
+        await client.send({"type": "stats_update", "data": stats_snapshot()})
+        await client.send({"type": "tickets_update", "data": recent_tickets(10)})
+        return
+    # Send initial data, then whatever was broadcast while it was on its way
+    seq = stream_journal.last_seq if stream_journal is not None else None
+    await client.send({
+        "type": "initial_data",
+        "seq": seq,
+        "data": {
+            "logs": log_index.query(limit=10)["items"],
+            "analyses": analysis_index.query(limit=10)["items"],
+            "tickets": recent_tickets(10),
+            "stats": stats_snapshot(),
+            "monitoring_active": is_monitoring
+        }
+    })
+    await join_stream(client, seq)
+
+@app.get("/stream/journal")
+async def get_stream_journal():
+    """Resume window of the stream journal (sequence numbers and spill)."""
+    if stream_journal is None:
+        return {"enabled": False}
+    return {"enabled": True, **stream_journal.status()}
+
 @app.websocket("/stream")
 async def websocket_endpoint(websocket: WebSocket):
-    """WebSocket endpoint for real-time updates."""
+    """WebSocket endpoint for real-time updates.
+    
+    Query options, or a later {"subscribe": {...}} message, choose the encoding (json, msgpack,
+    deflate), event types, fields per type, stat deltas and filters on category, severity,
+    alert_code, action and app; see stream_protocol.Subscription.
+    
+    Journaled events carry a seq. Reconnecting with ?resume_from=<last seq seen> replays
+    what was missed, followed by a "resumed" message and fresh stats and tickets; when the
+    gap is older than the journal an initial_data snapshot is sent instead.
+    """
+    resume_from = websocket.query_params.get("resume_from")
+    try:
+        subscription = Subscription.from_params(websocket.query_params)
+        if resume_from is not None and not resume_from.isdigit():
+            raise ValueError("resume_from must be a sequence number")
+    except ValueError as e:
+        await websocket.close(code=1008, reason=str(e))
+        return
+    resume_from = int(resume_from) if resume_from is not None else None
     await websocket.accept()
-    active_connections.append(websocket)
+    client = StreamClient(websocket, subscription)
     print("INFO: connection open")
     
     try:
-        # Send initial data
-        await websocket.send_text(json.dumps({
-            "type": "initial_data",
-            "data": {
-                "logs": current_logs[-10:],
-                "analyses": current_analyses[-10:],
-                "tickets": current_tickets[:10],
-                "stats": current_stats,
-                "monitoring_active": is_monitoring
-            }
-        }))
+        if websocket.query_params:
+            await client.send({"type": "subscribed", "data": subscription.describe()})
+        
+        await start_stream(client, resume_from)
         
-        # Keep connection alive
+        # Keep connection alive; clients may change their subscription at any time
         while True:
-            await websocket.receive_text()
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            control = parse_control(message)
+            if not control:
+                continue
+            try:
+                if "error" in control:
+                    raise ValueError(control["error"])
+                if "subscribe" in control:
+                    subscription.update(control["subscribe"] or {})
+                    stream_index.update(client)
+                    client.reset_deltas()
+                    await client.send({"type": "subscribed", "data": subscription.describe()})
+            except (ValueError, AttributeError) as e:
+                await client.send({"type": "error", "data": {"detail": str(e)}})
             
     except WebSocketDisconnect:
         print("INFO: connection closed")
     except Exception as e:
         print(f"WebSocket connection error: {e}")
     finally:
-        if websocket in active_connections:
-            active_connections.remove(websocket)
+        stream_index.remove(client)
+
+@app.get("/stream/sse")
+async def stream_sse(request: Request):
+    """Server-Sent Events version of /stream, for CLI tools and proxies that handle WebSockets badly.
+    
+    Takes the same query options as /stream (JSON only; reconnect to change them) and is fed
+    by the same broadcasts and encoded frames. Journaled events carry their seq as the event
+    id, so an EventSource reconnect (Last-Event-ID header, or ?last_event_id=) resumes where
+    it left off. Events go out in batches every PEGA_SSE_FLUSH_MS, with a comment line after
+    PEGA_SSE_HEARTBEAT idle seconds to keep proxies from closing the connection.
+    """
+    last_event_id = request.headers.get("last-event-id") or request.query_params.get("last_event_id")
+    try:
+        subscription = Subscription.from_params(request.query_params)
+        if subscription.encoding != "json":
+            raise ValueError("Server-Sent Events are JSON only")
+        if last_event_id is not None and not last_event_id.isdigit():
+            raise ValueError("Last-Event-ID must be a sequence number")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    resume_from = int(last_event_id) if last_event_id is not None else None
+    client = SseClient(subscription, max_pending=SSE_MAX_PENDING)
+    
+    async def events():
+        try:
+            yield f"retry: {SSE_RETRY_MS}\n\n"
+            if request.query_params:
+                await client.send({"type": "subscribed", "data": subscription.describe()})
+            await start_stream(client, resume_from)
+            while not client.closed:
+                chunk = await client.drain(SSE_HEARTBEAT)
+                yield chunk if chunk is not None else ": heartbeat\n\n"
+                # Let the next batch gather
+                await asyncio.sleep(SSE_FLUSH_INTERVAL)
+        finally:
+            client.close()
+            stream_index.remove(client)
+    
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 if __name__ == "__main__":
     import uvicorn
     print("🚀 Starting Pega Log Analyzer API with Streamlit Logic...")
-    uvicorn.run(app, host="0.0.0.0", port=8000, reload=True)
+    if API_WORKERS > 1:
+        # Worker processes share state through the event bus and elect one leader among themselves
+        os.environ.setdefault("PEGA_EVENT_BUS", "sqlite:///pega_bus.db")
+        uvicorn.run("api_streamlit_logic:app", host="0.0.0.0", port=8000, workers=API_WORKERS)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=8000, reload=True)
 
@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""
+Batch Analyzer
+Bulk analysis of log archives: parallel parsing and KEDB matching, one LLM call per unmatched signature
+
+    python batch_analyze.py /var/log/pega/2025-09 --out audit.jsonl
+    python batch_analyze.py archive/ --workers 16 --llm-concurrency 4 --format parquet --out audit.parquet
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import Dict, List, Any
+
+from event_assembler import EventAssembler
+from log_replay import open_log, event_time
+
+try:
+    from rich.progress import Progress, BarColumn, TextColumn, TimeRemainingColumn, TransferSpeedColumn
+except ImportError:  # plain stderr progress lines instead
+    Progress = None
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # only needed for --format parquet
+    pyarrow = None
+
+LOG_SUFFIXES = (".log", ".txt", ".gz", ".log.gz", ".txt.gz")
+SAMPLE_BYTES = 16 * 1024  # raw text kept per unmatched signature for the LLM
+PARQUET_ROW_GROUP = 50000
+RESULT_COLUMNS = ("file", "index", "signature", "alert_code", "fingerprint", "event_time", "action",
+                  "heal_action", "kedb_match", "match", "severity", "category", "anomaly", "analyzed_by", "error")
+
+# Per-process state of stage-1 workers
+_worker: Dict[str, Any] = {}
+
+
+def discover(paths: List[str], suffixes=LOG_SUFFIXES) -> List[str]:
+    """Log files under the given files/directories, largest first (better pool balance)."""
+    found = []
+    for path in paths:
+        if os.path.isfile(path):
+            found.append(path)
+            continue
+        for root, _, names in os.walk(path):
+            found.extend(os.path.join(root, name) for name in names if name.lower().endswith(suffixes))
+    return sorted(set(found), key=lambda p: os.path.getsize(p), reverse=True)
+
+
+def _init_worker(kedb_path: str):
+    import api_streamlit_logic as api
+    from kedb_manager import KedbManager
+    from model_router import line_signature
+
+    _worker["api"] = api
+    _worker["line_signature"] = line_signature
+    _worker["kedb"] = KedbManager(kedb_path).load()
+
+
+def scan_file(path: str, partial_path: str) -> Dict[str, Any]:
+    """Stage 1 (worker process): parse one file, match KEDB codes, collect unmatched signatures.
+
+    Per-event rows go to ``partial_path``; the return value only carries
+    counters and one sample per unmatched signature.
+    """
+    api, kedb, line_signature = _worker["api"], _worker["kedb"], _worker["line_signature"]
+    started = time.perf_counter()
+    result = {"path": path, "partial": partial_path, "bytes": 0, "lines": 0, "events": 0, "matched": 0,
+              "unmatched": {}}
+    events: List[Dict[str, Any]] = []
+    assembler = EventAssembler(events.append)
+
+    with open_log(path) as f, open(partial_path, "w", encoding="utf-8") as out:
+        def write_events():
+            for event in events:
+                text = event["text"]
+                alert_code = api.extract_alert_code(text)
+                entry = next((kedb.by_error[code] for code in api.ERROR_CODE_PATTERN.findall(text.upper())
+                              if code in kedb.by_error), None)
+                signature = (event["fingerprint"] or alert_code
+                             or line_signature(text.split("\n", 1)[0]))
+                logged = event_time(text)
+                row = {"file": path, "index": result["events"], "signature": signature,
+                       "alert_code": alert_code, "fingerprint": event["fingerprint"],
+                       "event_time": logged.isoformat() if logged else None,
+                       "kedb_match": entry["error"] if entry else None}
+                out.write(json.dumps(row, ensure_ascii=False) + "\n")
+                result["events"] += 1
+                if entry:
+                    result["matched"] += 1
+                else:
+                    seen = result["unmatched"].setdefault(signature, {"count": 0, "sample": text[:SAMPLE_BYTES]})
+                    seen["count"] += 1
+            events.clear()
+
+        for line in f:
+            result["lines"] += 1
+            result["bytes"] += len(line)
+            assembler.feed(line, source=path)
+            if len(events) >= 256:
+                write_events()
+        assembler.flush()
+        write_events()
+    result["seconds"] = round(time.perf_counter() - started, 3)
+    return result
+
+
+class BatchProgress:
+    """rich progress bars when available, otherwise a status line every few seconds."""
+
+    def __init__(self):
+        self._progress = None
+        self._tasks: Dict[str, Any] = {}
+        self._last_print = 0.0
+        self._totals: Dict[str, List[float]] = {}
+
+    def __enter__(self):
+        if Progress is not None and sys.stderr.isatty():
+            self._progress = Progress(TextColumn("{task.description}"), BarColumn(),
+                                      TextColumn("{task.completed:,.0f}/{task.total:,.0f}"),
+                                      TransferSpeedColumn(), TimeRemainingColumn(), transient=False)
+            self._progress.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        if self._progress is not None:
+            self._progress.__exit__(*exc)
+
+    def add(self, name: str, description: str, total: float):
+        self._totals[name] = [0.0, total]
+        if self._progress is not None:
+            self._tasks[name] = self._progress.add_task(description, total=total)
+
+    def advance(self, name: str, amount: float):
+        self._totals[name][0] += amount
+        if self._progress is not None:
+            self._progress.update(self._tasks[name], advance=amount)
+        elif time.monotonic() - self._last_print >= 2 or self._totals[name][0] >= self._totals[name][1]:
+            self._last_print = time.monotonic()
+            done, total = self._totals[name]
+            print(f"⏩ {name}: {done:,.0f}/{total:,.0f} ({done / total * 100 if total else 100:.0f}%)",
+                  file=sys.stderr)
+
+
+class ResultWriter:
+    """JSONL (optionally .gz) or Parquet rows, written incrementally."""
+
+    def __init__(self, path: str, fmt: str):
+        self.path = path
+        self.fmt = fmt
+        self._rows: List[Dict[str, Any]] = []
+        self._parquet = None
+        if fmt == "parquet":
+            if pyarrow is None:
+                raise ImportError("pyarrow is required for --format parquet. Install with: pip install pyarrow")
+        else:
+            import gzip
+            self._file = (gzip.open(path, "wt", encoding="utf-8") if path.endswith(".gz")
+                          else open(path, "w", encoding="utf-8"))
+
+    def write(self, row: Dict[str, Any]):
+        if self.fmt != "parquet":
+            self._file.write(json.dumps(row, ensure_ascii=False) + "\n")
+            return
+        self._rows.append(row)
+        if len(self._rows) >= PARQUET_ROW_GROUP:
+            self._flush_parquet()
+
+    def _flush_parquet(self):
+        if not self._rows:
+            return
+        if self._parquet is None:
+            # Fixed schema: a column that is all null in the first row group must not be typed null
+            schema = pyarrow.schema([(name, pyarrow.int64() if name == "index" else pyarrow.string())
+                                     for name in RESULT_COLUMNS])
+            self._parquet = pyarrow.parquet.ParquetWriter(self.path, schema, compression="zstd")
+        table = pyarrow.Table.from_pylist(self._rows, schema=self._parquet.schema)
+        self._parquet.write_table(table)
+        self._rows.clear()
+
+    def close(self):
+        if self.fmt == "parquet":
+            self._flush_parquet()
+            if self._parquet is not None:
+                self._parquet.close()
+        else:
+            self._file.close()
+
+
+def load_pipeline(args):
+    """Initialise the API module's analysis stages (models, KEDB, self-heal mapping) in this process."""
+    os.environ["PEGA_OLLAMA_POOL_SIZE"] = str(args.llm_concurrency)
+    os.environ["PEGA_KEDB_PATH"] = args.kedb
+    import api_streamlit_logic as api
+    from self_heal import load_actions
+
+    if not args.no_llm:
+        api.MISTRAL_CLIENT = api.initialize_mistral()
+        if api.MISTRAL_CLIENT is None:
+            print("⚠️ Ollama is not reachable; unmatched signatures will be left unanalysed", file=sys.stderr)
+    api.kedb_manager.load()
+    _, api.heal_mapping = load_actions(api.SELF_HEAL_CONFIG)
+    return api
+
+
+def analyze_signatures(api, unmatched: Dict[str, Dict[str, Any]], concurrency: int,
+                       progress: BatchProgress) -> Dict[str, Dict[str, Any]]:
+    """Stage 2: one bounded-concurrency LLM analysis per unmatched signature."""
+    decisions: Dict[str, Dict[str, Any]] = {}
+    if api.MISTRAL_CLIENT is None or not unmatched:
+        return decisions
+
+    def analyze(signature: str) -> Dict[str, Any]:
+        try:
+            findings = api.analyze_event(unmatched[signature]["sample"], signature)
+        except Exception as e:
+            return {"action": "unanalysed", "error": f"{type(e).__name__}: {e}"}
+        if not findings:
+            return {"action": "unanalysed"}
+        action, heal_action = api.planned_action(findings)
+        ai_analysis = findings["ai_analysis"]
+        return {"action": action, "heal_action": heal_action,
+                "kedb_match": (findings["kedb_match"] or {}).get("error"), "match": "llm",
+                "severity": ai_analysis.get("severity"), "category": ai_analysis.get("category"),
+                "anomaly": ai_analysis.get("anomaly"), "analyzed_by": findings["analyzed_by"]}
+
+    progress.add("llm", "LLM signatures", len(unmatched))
+    # Most frequent signatures first: they decide the most rows
+    ordered = sorted(unmatched, key=lambda sig: unmatched[sig]["count"], reverse=True)
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = {pool.submit(analyze, signature): signature for signature in ordered}
+        for future in as_completed(futures):
+            decisions[futures[future]] = future.result()
+            progress.advance("llm", 1)
+    return decisions
+
+
+def run_batch(args) -> Dict[str, Any]:
+    started = time.perf_counter()
+    files = discover(args.paths)
+    if not files:
+        sys.exit("❌ No log files found")
+    total_bytes = sum(os.path.getsize(path) for path in files)
+    api = load_pipeline(args)
+    partial_dir = tempfile.mkdtemp(prefix="pega_batch_", dir=args.tmp_dir)
+    totals = Counter()
+    unmatched: Dict[str, Dict[str, Any]] = {}
+    scans: List[Dict[str, Any]] = []
+
+    try:
+        with BatchProgress() as progress:
+            # Stage 1: parse + deterministic KEDB code matching, one file per task
+            progress.add("scan", "Scanning", total_bytes)
+            with ProcessPoolExecutor(max_workers=args.workers, mp_context=multiprocessing.get_context("spawn"),
+                                     initializer=_init_worker, initargs=(args.kedb,)) as pool:
+                futures = [pool.submit(scan_file, path, os.path.join(partial_dir, f"{i}.jsonl"))
+                           for i, path in enumerate(files)]
+                for future in as_completed(futures):
+                    scan = future.result()
+                    scans.append(scan)
+                    totals.update({key: scan[key] for key in ("bytes", "lines", "events", "matched")})
+                    for signature, seen in scan.pop("unmatched").items():
+                        merged = unmatched.setdefault(signature, {"count": 0, "sample": seen["sample"]})
+                        merged["count"] += seen["count"]
+                    progress.advance("scan", os.path.getsize(scan["path"]))
+            scan_seconds = time.perf_counter() - started
+
+            # Stage 2: LLM once per unmatched signature
+            llm_started = time.perf_counter()
+            decisions = analyze_signatures(api, unmatched, args.llm_concurrency, progress)
+            llm_seconds = time.perf_counter() - llm_started
+
+            # Stage 3: join decisions back onto every event row, in file order
+            kedb = api.kedb_manager.snapshot
+            code_decisions: Dict[str, Dict[str, Any]] = {}
+            actions = Counter()
+            writer = ResultWriter(args.out, args.format)
+            for scan in sorted(scans, key=lambda s: files.index(s["path"])):
+                with open(scan["partial"], "r", encoding="utf-8") as f:
+                    for line in f:
+                        row = json.loads(line)
+                        code = row.pop("kedb_match")
+                        if code:
+                            if code not in code_decisions:
+                                entry = kedb.by_error[code]
+                                action, heal_action = api.planned_action({"kedb_match": entry})
+                                code_decisions[code] = {
+                                    "action": action, "heal_action": heal_action, "kedb_match": code,
+                                    "match": "kedb_code", "severity": entry.get("severity"),
+                                    "category": entry.get("category"), "anomaly": entry.get("description"),
+                                    "analyzed_by": None}
+                            decision = code_decisions[code]
+                        else:
+                            decision = decisions.get(row["signature"], {"action": "unanalysed"})
+                        actions[decision["action"]] += 1
+                        writer.write({**row, **decision})
+            writer.close()
+    finally:
+        shutil.rmtree(partial_dir, ignore_errors=True)
+        if api.MISTRAL_CLIENT is not None:
+            api.MISTRAL_CLIENT.close()
+
+    elapsed = time.perf_counter() - started
+    return {
+        "output": args.out,
+        "files": len(files),
+        "bytes": totals["bytes"],
+        "lines": totals["lines"],
+        "events": totals["events"],
+        "kedb_code_matches": totals["matched"],
+        "unique_unmatched_signatures": len(unmatched),
+        "llm_calls": len(decisions),
+        "events_per_llm_call": round((totals["events"] - totals["matched"]) / len(decisions), 1) if decisions else 0.0,
+        "actions": dict(actions),
+        "elapsed_s": round(elapsed, 2),
+        "scan_s": round(scan_seconds, 2),
+        "llm_s": round(llm_seconds, 2),
+        "mb_per_s": round(totals["bytes"] / 1e6 / elapsed, 2) if elapsed else 0.0,
+        "events_per_s": round(totals["events"] / elapsed, 1) if elapsed else 0.0,
+        "router": api.model_router.status(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch-analyse directories of Pega logs")
+    parser.add_argument("paths", nargs="+", help="log files or directories (searched recursively)")
+    parser.add_argument("--out", default="batch_results.jsonl", help="results file (.jsonl, .jsonl.gz or .parquet)")
+    parser.add_argument("--format", choices=("jsonl", "parquet"),
+                        help="output format (default: from --out extension)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4, help="parsing processes")
+    parser.add_argument("--llm-concurrency", type=int, default=4, help="concurrent LLM requests")
+    parser.add_argument("--kedb", default=os.getenv("PEGA_KEDB_PATH", "kebd.json"))
+    parser.add_argument("--no-llm", action="store_true", help="KEDB code matching only")
+    parser.add_argument("--tmp-dir", help="where per-file intermediate rows are spooled")
+    args = parser.parse_args()
+    args.format = args.format or ("parquet" if args.out.endswith(".parquet") else "jsonl")
+    if args.format == "parquet" and pyarrow is None:
+        sys.exit("❌ pyarrow is required for --format parquet. Install with: pip install pyarrow")
+
+    summary = run_batch(args)
+    with open(args.out + ".summary.json", "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
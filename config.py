@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+API Configuration
+Settings for the FastAPI backend, read once from PEGA_* environment variables at import
+"""
+
+import os
+import socket
+
+# Retention and paging limits for the in-memory query indexes
+LOG_RETENTION = 1000
+ANALYSIS_RETENTION = 1000
+TICKET_RETENTION = 10000
+MAX_PAGE_SIZE = 500
+
+# Durable SQLite history (logs, analyses, tickets); opened on startup
+EVENT_STORE_PATH = os.getenv("PEGA_EVENT_STORE", "pega_events.db")
+EVENT_RETENTION_DAYS = int(os.getenv("PEGA_EVENT_RETENTION_DAYS", "14"))
+MAX_HISTORY_PAGE = 1000
+
+# Day-partitioned Parquet export of analyses and tickets for analytics tooling (needs pyarrow)
+ANALYTICS_DIR = os.getenv("PEGA_ANALYTICS_DIR", "analytics")
+ANALYTICS_INTERVAL = float(os.getenv("PEGA_ANALYTICS_INTERVAL", "300"))  # seconds between exports; 0 = disabled
+
+# Full-text search over ingested log lines; backfilled from the event store on startup
+SEARCH_MAX_DOCS = int(os.getenv("PEGA_SEARCH_MAX_DOCS", "1000000"))
+SEARCH_BACKFILL_HOURS = int(os.getenv("PEGA_SEARCH_BACKFILL_HOURS", "24"))
+MAX_SEARCH_PAGE = 100
+
+# Ticket lifecycle: changes are logged to a WAL and folded into the ticket files on the next rewrite
+TICKET_STATUSES = ("Open", "In Progress", "Resolved", "Closed", "Merged")
+OPEN_TICKET_STATUSES = ["Open", "In Progress"]
+UPDATABLE_TICKET_FIELDS = ("status", "severity", "category", "assignee", "resolution")
+TICKET_WAL_PATH = os.getenv("PEGA_TICKET_WAL", "tickets.wal")
+TICKET_WAL_COMPACT_RECORDS = int(os.getenv("PEGA_TICKET_WAL_COMPACT", "5000"))
+TICKET_STALE_HOURS = float(os.getenv("PEGA_TICKET_STALE_HOURS", "24"))
+TICKET_SWEEP_INTERVAL = 300
+
+# Outbound ITSM export (disabled unless PEGA_ITSM_URL is set); tickets wait in a durable outbox
+ITSM_URL = os.getenv("PEGA_ITSM_URL")
+ITSM_TOKEN = os.getenv("PEGA_ITSM_TOKEN")
+ITSM_OUTBOX_PATH = os.getenv("PEGA_ITSM_OUTBOX", "ticket_outbox.db")
+
+# Self-heal execution: KEDB matches run a registered action; failures escalate to tickets
+SELF_HEAL_CONFIG = os.getenv("PEGA_SELF_HEAL_CONFIG", "self_heal_actions.json")  # actions + KEDB error mapping
+SELF_HEAL_DEFAULT_ACTION = os.getenv("PEGA_SELF_HEAL_DEFAULT_ACTION", "")  # "" = ticket unmapped fixes; "simulate" for demos
+SELF_HEAL_WORKERS = int(os.getenv("PEGA_SELF_HEAL_WORKERS", "8"))
+
+# Model routing: signature classifier and small model first, large model for the rest
+LARGE_MODEL = os.getenv("PEGA_LARGE_MODEL", "mistral:7b")
+SMALL_MODEL = os.getenv("PEGA_SMALL_MODEL") or None  # e.g. qwen2.5:1.5b; unset skips the small-model tier
+
+# Ollama connection pool and model residency (OLLAMA_HOST selects the server)
+OLLAMA_POOL_SIZE = int(os.getenv("PEGA_OLLAMA_POOL_SIZE", "8"))
+OLLAMA_KEEP_ALIVE = os.getenv("PEGA_OLLAMA_KEEP_ALIVE", "30m")  # for models that are not pinned
+OLLAMA_PINNED_MODELS = [model.strip() for model in os.getenv(
+    "PEGA_OLLAMA_PIN_MODELS", ",".join(filter(None, [LARGE_MODEL, SMALL_MODEL]))).split(",") if model.strip()]
+OLLAMA_WARM_INTERVAL = float(os.getenv("PEGA_OLLAMA_WARM_INTERVAL", "240"))  # seconds between warm pings; 0 = once
+OLLAMA_TIMEOUT = float(os.getenv("PEGA_OLLAMA_TIMEOUT", "120"))
+
+# File ingestion: tailed Pega logs are grouped into multi-line events (header + stack trace)
+TAIL_LOG_FILES = [path.strip() for path in os.getenv("PEGA_TAIL_LOGS", "").split(",") if path.strip()]
+TAIL_FROM_START = os.getenv("PEGA_TAIL_FROM_START", "false").lower() == "true"
+EVENT_FLUSH_TIMEOUT = float(os.getenv("PEGA_EVENT_FLUSH_TIMEOUT", "2"))  # seconds before a quiet event is closed
+EVENT_MAX_LINES = int(os.getenv("PEGA_EVENT_MAX_LINES", "400"))
+EVENT_MAX_BYTES = int(os.getenv("PEGA_EVENT_MAX_BYTES", str(64 * 1024)))
+
+# Sharded analysis: events are partitioned by signature across worker processes (0 = in-process)
+ANALYSIS_SHARDS = int(os.getenv("PEGA_ANALYSIS_SHARDS", "0"))
+SHARD_QUEUE_SIZE = int(os.getenv("PEGA_SHARD_QUEUE_SIZE", "1000"))
+
+# Adaptive ingest control: once analysis falls behind, critical codes and new signatures are still
+# analysed while repeats are sampled and INFO events deferred; shed counts are in /ingest/status
+ANALYSIS_WORKERS = int(os.getenv("PEGA_ANALYSIS_WORKERS", "1"))  # in-process analysis threads
+ANALYSIS_QUEUE_MAX = int(os.getenv("PEGA_ANALYSIS_QUEUE_MAX", "1000"))  # ingest blocks for must-analyse events beyond this
+INGEST_SHEDDING = os.getenv("PEGA_INGEST_SHEDDING", "true").lower() == "true"
+INGEST_TARGET_DELAY = float(os.getenv("PEGA_INGEST_TARGET_DELAY", "30"))  # seconds of backlog before shedding starts
+INGEST_OVERLOAD_DELAY = float(os.getenv("PEGA_INGEST_OVERLOAD_DELAY", "120"))  # seconds of backlog for maximum shedding
+INGEST_MAX_SAMPLE_EVERY = int(os.getenv("PEGA_INGEST_MAX_SAMPLE_EVERY", "20"))  # analyse at least 1 in N repeats
+INGEST_DEFERRED_MAX = int(os.getenv("PEGA_INGEST_DEFERRED_MAX", "1000"))  # INFO events parked before the oldest is dropped
+CRITICAL_ALERT_CODES = [code.strip() for code in os.getenv(
+    "PEGA_CRITICAL_ALERT_CODES", "SECU0003,SECU0007,SECU0015,SECU0025,DB-DEADLOCK").split(",") if code.strip()]
+CRITICAL_HEADER_WORDS = ("critical", "fatal", "severe")
+
+# Sequence-numbered journal of streamed events for /stream?resume_from=<seq> (opened on startup)
+STREAM_JOURNAL_SIZE = int(os.getenv("PEGA_STREAM_JOURNAL_SIZE", "5000"))  # events kept in memory
+STREAM_JOURNAL_SPILL = os.getenv("PEGA_STREAM_JOURNAL_SPILL")  # directory for older events; unset = memory only
+STREAM_JOURNAL_SPILL_EVENTS = int(os.getenv("PEGA_STREAM_JOURNAL_SPILL_EVENTS", "100000"))
+JOURNALED_TYPES = ("new_log",)  # state snapshots (stats, ticket lists) are resent fresh instead
+
+# Server-Sent Events (/stream/sse): events are written in batches, with a comment line when idle
+SSE_FLUSH_INTERVAL = float(os.getenv("PEGA_SSE_FLUSH_MS", "100")) / 1000
+SSE_HEARTBEAT = float(os.getenv("PEGA_SSE_HEARTBEAT", "15"))  # seconds
+SSE_MAX_PENDING = int(os.getenv("PEGA_SSE_MAX_PENDING", "1000"))  # frames buffered before a slow client is dropped
+SSE_RETRY_MS = 2000  # reconnect delay suggested to EventSource clients
+
+# Scale-out: instances sharing an event bus elect one leader to ingest and analyse; every instance
+# mirrors its state changes and serves REST reads and streams, and writes are forwarded to the leader
+EVENT_BUS_URL = os.getenv("PEGA_EVENT_BUS")  # sqlite:///pega_bus.db, memory:// or a registered broker; unset = one instance
+EVENT_BUS_RETAIN = int(os.getenv("PEGA_EVENT_BUS_RETAIN", "100000"))  # events the bus keeps
+EVENT_BUS_POLL = float(os.getenv("PEGA_EVENT_BUS_POLL_MS", "50")) / 1000
+INSTANCE_ID = os.getenv("PEGA_INSTANCE_ID") or f"{socket.gethostname()}-{os.getpid()}"
+LEADER_TTL = float(os.getenv("PEGA_LEADER_TTL", "10"))  # seconds a silent leader keeps the lease
+LEADER_CALL_TIMEOUT = float(os.getenv("PEGA_LEADER_CALL_TIMEOUT", "15"))
+API_WORKERS = int(os.getenv("PEGA_WORKERS", "1"))
+STREAMED_TYPES = ("new_log", "stats_update", "tickets_update")  # bus events every instance streams to its clients
+
+# Prompt compaction: ids masked, key metrics and top/bottom stack frames kept within a token budget
+PROMPT_TOKEN_BUDGET = int(os.getenv("PEGA_PROMPT_TOKEN_BUDGET", "384"))  # 0 sends log lines unchanged
+PROMPT_TOP_FRAMES = int(os.getenv("PEGA_PROMPT_TOP_FRAMES", "5"))
+PROMPT_BOTTOM_FRAMES = int(os.getenv("PEGA_PROMPT_BOTTOM_FRAMES", "3"))
+
+# KEDB retrieval: "vector" (embedding similarity) or "text" (legacy word overlap)
+KEDB_MATCH_MODE = os.getenv("PEGA_KEDB_MATCH_MODE", "vector")
+KEDB_EMBED_MODEL = os.getenv("PEGA_KEDB_EMBED_MODEL", "nomic-embed-text")
+KEDB_EMBED_CACHE = os.getenv("PEGA_KEDB_EMBED_CACHE", "kedb_embeddings.npz")
+KEDB_MATCH_THRESHOLD = os.getenv("PEGA_KEDB_MATCH_THRESHOLD")
+KEDB_MATCH_THRESHOLD = float(KEDB_MATCH_THRESHOLD) if KEDB_MATCH_THRESHOLD else None  # None: embedder default
+
+# Hot-reloaded KEDB; kebd.json is polled for changes and uploads go through /kedb
+KEDB_PATH = os.getenv("PEGA_KEDB_PATH", "kebd.json")
+KEDB_POLL_INTERVAL = float(os.getenv("PEGA_KEDB_POLL_INTERVAL", "2"))
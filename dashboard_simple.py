@@ -13,6 +13,7 @@ import plotly.express as px
 from collections import deque
 import random
 import os
+from ticket_stats import TicketStats
 
 # Page configuration
 st.set_page_config(
@@ -439,20 +440,51 @@ def load_tickets():
         print(f"❌ Failed to load tickets: {e}")
         return []
 
+def ticket_file_mtime():
+    """Modification time of tickets.json (None if missing)."""
+    try:
+        return os.path.getmtime('tickets.json')
+    except OSError:
+        return None
+
+@st.cache_resource
+def ticket_cache():
+    """Loaded tickets and their counters, kept across Streamlit reruns."""
+    return {"tickets": None, "stats": None, "mtime": None}
+
+def cached_tickets():
+    """Tickets from tickets.json; re-read and recounted only when another process changed the file."""
+    cache = ticket_cache()
+    mtime = ticket_file_mtime()
+    if cache["tickets"] is None or cache["mtime"] != mtime:
+        cache["tickets"] = load_tickets()
+        cache["stats"] = TicketStats(cache["tickets"])
+        cache["mtime"] = mtime
+    return cache["tickets"]
+
 def save_ticket(ticket):
     """Save a new ticket to tickets.json."""
     try:
-        tickets = load_tickets()
+        tickets = cached_tickets()
         tickets.append(ticket)
         with open('tickets.json', 'w', encoding='utf-8') as f:
             json.dump(tickets, f, indent=2, ensure_ascii=False)
+        # Count our own write incrementally instead of recounting the file
+        cache = ticket_cache()
+        cache["stats"].add(ticket)
+        cache["mtime"] = ticket_file_mtime()
         print(f"✅ Ticket saved: {ticket['ticket_id']}")
     except Exception as e:
         print(f"❌ Failed to save ticket: {e}")
 
-# Load KEDB and tickets at startup
+# Load KEDB and tickets at startup (tickets come from the cache on reruns)
 KEDB_DATA = load_kedb()
-TICKETS_DATA = load_tickets()
+TICKETS_DATA = cached_tickets()
+
+def get_ticket_stats():
+    """Ticket summary counters, consistent with TICKETS_DATA."""
+    cached_tickets()
+    return ticket_cache()["stats"]
 
 # Data persistence functions
 def save_dashboard_data():
@@ -965,13 +997,14 @@ def main():
             st.markdown('<div class="error-card">❌ KEDB: No patterns loaded</div>', unsafe_allow_html=True)
         
         # Tickets status
-        if TICKETS_DATA:
-            st.markdown(f'<div class="success-card">📋 Tickets: {len(TICKETS_DATA)} total</div>', unsafe_allow_html=True)
+        ticket_stats = get_ticket_stats()
+        if ticket_stats.total:
+            st.markdown(f'<div class="success-card">📋 Tickets: {ticket_stats.total} total</div>', unsafe_allow_html=True)
             # Show ticket summary
             st.markdown("**📊 Ticket Summary:**")
-            critical_tickets = len([t for t in TICKETS_DATA if t.get('severity') == 'Critical'])
-            high_tickets = len([t for t in TICKETS_DATA if t.get('severity') == 'High'])
-            medium_tickets = len([t for t in TICKETS_DATA if t.get('severity') == 'Medium'])
+            critical_tickets = ticket_stats.count('severity', 'Critical')
+            high_tickets = ticket_stats.count('severity', 'High')
+            medium_tickets = ticket_stats.count('severity', 'Medium')
             st.markdown(f"🔴 Critical: {critical_tickets}")
             st.markdown(f"🟡 High: {high_tickets}")
             st.markdown(f"🟢 Medium: {medium_tickets}")
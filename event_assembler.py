@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Event Assembler
+Groups multi-line log records (headers plus stack-trace continuation lines) into single events
+"""
+
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Callable, Pattern
+
+# Every Pega log record (pegarules.log, ALERT, ALERTSECURITY) starts with its timestamp
+DEFAULT_HEADER_PATTERNS = [
+    re.compile(r"^\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}:\d{2}[,.]\d{3}"),
+]
+
+EXCEPTION_LINE = re.compile(r"^(?:Caused by:\s*)?([\w$]+(?:\.[\w$]+)+(?:Exception|Error|Throwable))\b")
+FRAME_LINE = re.compile(r"^\s*at\s+([\w$.<>]+)\(")
+GENERATED_HASH = re.compile(r"_[0-9a-f]{16,}")
+
+
+def stack_fingerprint(text: str, top_frames: int = 5) -> Optional[str]:
+    """Stable id for a stack trace: exception class, root cause and top frames (no line numbers).
+
+    Returns None for events without a Java exception.
+    """
+    exceptions: List[str] = []
+    frames: List[str] = []
+    for line in text.splitlines()[1:]:
+        exception = EXCEPTION_LINE.match(line.strip())
+        if exception:
+            exceptions.append(exception.group(1))
+            continue
+        frame = FRAME_LINE.match(line)
+        if frame and len(frames) < top_frames and len(exceptions) == 1:
+            frames.append(GENERATED_HASH.sub("", frame.group(1)))
+    if not exceptions:
+        return None
+    key = "|".join([exceptions[0], exceptions[-1]] + frames)
+    return f"{exceptions[0].rsplit('.', 1)[-1]}:{hashlib.sha1(key.encode('utf-8')).hexdigest()[:12]}"
+
+
+class EventAssembler:
+    """Streaming grouper for one or more interleaved sources.
+
+    A line matching a header pattern closes the source's open event and
+    starts a new one; other lines are continuations. An open event is also
+    closed when no line arrives for ``flush_timeout`` seconds (the last
+    record of a quiet file) or at ``flush()``. Each open event holds at most
+    ``max_lines`` lines and ``max_bytes`` of text; the rest is counted and
+    noted at the end of the event instead of kept.
+
+    ``on_event`` receives ``{"source", "text", "lines", "dropped_lines",
+    "fingerprint", "occurrences"}`` where ``occurrences`` counts events seen
+    with the same stack fingerprint, so repeats can be handled cheaply.
+    """
+
+    def __init__(self, on_event: Callable[[Dict[str, Any]], None],
+                 header_patterns: Optional[List[Pattern]] = None, flush_timeout: float = 2.0,
+                 max_lines: int = 400, max_bytes: int = 64 * 1024, max_fingerprints: int = 10000):
+        """Create an assembler; start() runs the idle-flush timer."""
+        self.on_event = on_event
+        self.header_patterns = header_patterns or DEFAULT_HEADER_PATTERNS
+        self.flush_timeout = flush_timeout
+        self.max_lines = max_lines
+        self.max_bytes = max_bytes
+        self.max_fingerprints = max_fingerprints
+        self._open: Dict[str, Dict[str, Any]] = {}
+        self._fingerprints: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._timer: Optional[threading.Thread] = None
+        self.stats = {"lines": 0, "events": 0, "multiline_events": 0, "dropped_lines": 0,
+                      "timeout_flushes": 0, "orphan_lines": 0, "repeated_stacks": 0}
+
+    def is_header(self, line: str) -> bool:
+        return any(pattern.match(line) for pattern in self.header_patterns)
+
+    def feed(self, line: str, source: str = "default"):
+        """Add one raw line (trailing newline optional)."""
+        line = line.rstrip("\r\n")
+        ready = None
+        with self._lock:
+            self.stats["lines"] += 1
+            current = self._open.get(source)
+            if self.is_header(line) or current is None:
+                if current is None and not self.is_header(line):
+                    if not line.strip():
+                        return
+                    self.stats["orphan_lines"] += 1
+                ready = self._open.pop(source, None)
+                self._open[source] = {"lines": [line], "bytes": len(line), "dropped": 0,
+                                      "updated": time.monotonic()}
+            else:
+                current["updated"] = time.monotonic()
+                if len(current["lines"]) >= self.max_lines or current["bytes"] + len(line) > self.max_bytes:
+                    current["dropped"] += 1
+                    self.stats["dropped_lines"] += 1
+                else:
+                    current["lines"].append(line)
+                    current["bytes"] += len(line) + 1
+        if ready is not None:
+            self._emit(source, ready)
+
+    def flush_expired(self) -> int:
+        """Close events idle for longer than ``flush_timeout``; returns how many."""
+        cutoff = time.monotonic() - self.flush_timeout
+        with self._lock:
+            expired = [(source, self._open.pop(source)) for source, event in list(self._open.items())
+                       if event["updated"] <= cutoff]
+            self.stats["timeout_flushes"] += len(expired)
+        for source, event in expired:
+            self._emit(source, event)
+        return len(expired)
+
+    def flush(self, source: Optional[str] = None):
+        """Close the open event of one source, or of all sources."""
+        with self._lock:
+            sources = [source] if source is not None else list(self._open)
+            pending = [(name, self._open.pop(name)) for name in sources if name in self._open]
+        for name, event in pending:
+            self._emit(name, event)
+
+    def _emit(self, source: str, event: Dict[str, Any]):
+        lines = event["lines"]
+        while len(lines) > 1 and not lines[-1].strip():
+            lines.pop()
+        if event["dropped"]:
+            lines = lines + [f"... {event['dropped']} more lines dropped"]
+        text = "\n".join(lines)
+        fingerprint = stack_fingerprint(text) if len(lines) > 1 else None
+        occurrences = 1
+        with self._lock:
+            self.stats["events"] += 1
+            self.stats["multiline_events"] += 1 if len(lines) > 1 else 0
+            if fingerprint:
+                occurrences = self._fingerprints.pop(fingerprint, 0) + 1
+                self._fingerprints[fingerprint] = occurrences
+                if len(self._fingerprints) > self.max_fingerprints:
+                    self._fingerprints.popitem(last=False)
+                self.stats["repeated_stacks"] += 1 if occurrences > 1 else 0
+        try:
+            self.on_event({"source": source, "text": text, "lines": len(event["lines"]),
+                           "dropped_lines": event["dropped"], "fingerprint": fingerprint,
+                           "occurrences": occurrences})
+        except Exception as e:
+            print(f"❌ Failed to process assembled event from {source}: {e}")
+
+    def start(self):
+        """Flush idle events in the background."""
+        if self._timer is not None:
+            return
+        self._stop.clear()
+        self._timer = threading.Thread(target=self._timer_loop, daemon=True)
+        self._timer.start()
+
+    def _timer_loop(self):
+        while not self._stop.wait(max(self.flush_timeout / 2, 0.1)):
+            self.flush_expired()
+
+    def stop(self):
+        """Stop the timer and emit whatever is still open."""
+        self._stop.set()
+        if self._timer is not None:
+            self._timer.join(timeout=5)
+            self._timer = None
+        self.flush()
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            top = sorted(self._fingerprints.items(), key=lambda item: item[1], reverse=True)[:10]
+            return {**self.stats, "open_events": len(self._open),
+                    "fingerprints": len(self._fingerprints),
+                    "top_stacks": [{"fingerprint": fp, "occurrences": count} for fp, count in top]}
+
+
+def follow_file(path: str, assembler: EventAssembler, stop: threading.Event, from_start: bool = False,
+                poll_interval: float = 0.5):
+    """Tail a log file into the assembler, reopening it after rotation or truncation."""
+    handle = None
+    inode = None
+    while not stop.is_set():
+        if handle is None:
+            try:
+                handle = open(path, "rb")
+                inode = os.fstat(handle.fileno()).st_ino
+                if not from_start:
+                    handle.seek(0, os.SEEK_END)
+                from_start = True  # files created or rotated later are read from the top
+            except OSError:
+                stop.wait(poll_interval)
+                continue
+        line = handle.readline()
+        if line.endswith(b"\n"):
+            assembler.feed(line.decode("utf-8", errors="replace"), source=path)
+            continue
+        if line:
+            # Partial line: rewind and wait for the writer to finish it
+            handle.seek(-len(line), os.SEEK_CUR)
+        try:
+            stat = os.stat(path)
+            rotated = stat.st_ino != inode or stat.st_size < handle.tell()
+        except OSError:
+            rotated = True
+        if rotated:
+            handle.close()
+            handle = None
+            assembler.flush(path)
+            continue
+        stop.wait(poll_interval)
+    if handle is not None:
+        handle.close()
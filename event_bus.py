@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""
+Event Bus
+Ordered event log shared by API instances, the leader lease that picks the instance running analysis,
+and forwarding of write requests from follower instances to the leader
+"""
+
+import asyncio
+import base64
+import json
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Dict, List, Any, Optional, Callable
+
+
+class EventBus(ABC):
+    """What API instances need from a broker.
+
+    ``publish`` appends an event and returns its id. Ids increase in publish
+    order and are never reused, so every instance reads the same sequence and
+    an id doubles as a resume position. ``read`` returns the events after an
+    id, oldest first, as ``{"id", "origin", "message", "attributes"}`` dicts;
+    the bus keeps the newest ``retain`` events.
+
+    The leader lease is a lock with an expiry: ``try_lead`` takes it when it
+    is free or lapsed and renews it for its holder. Other brokers (Redis
+    streams, NATS JetStream, Kafka) plug in by implementing these methods and
+    registering a URL scheme with ``register_backend``.
+    """
+
+    @abstractmethod
+    def publish(self, message: Dict[str, Any], attributes: Optional[Dict[str, Any]] = None,
+                origin: Optional[str] = None) -> int:
+        """Append an event; returns its id."""
+
+    @abstractmethod
+    def read(self, after_id: int, limit: int = 500) -> List[Dict[str, Any]]:
+        """Up to ``limit`` events after ``after_id``, oldest first."""
+
+    @abstractmethod
+    def last_id(self) -> int:
+        """Id of the newest event (0 before the first)."""
+
+    @abstractmethod
+    def oldest_id(self) -> int:
+        """Id of the oldest event still held (``last_id() + 1`` when empty)."""
+
+    @abstractmethod
+    def try_lead(self, candidate: str, ttl: float) -> bool:
+        """Take or renew the leader lease for ``ttl`` seconds; False while another holder's lease runs."""
+
+    @abstractmethod
+    def leader(self) -> Optional[Dict[str, Any]]:
+        """Current lease holder with its expiry, or None."""
+
+    @abstractmethod
+    def resign(self, candidate: str):
+        """Give the lease up early (clean shutdown) so another instance takes over at once."""
+
+    def close(self):
+        pass
+
+    def status(self) -> Dict[str, Any]:
+        return {"backend": type(self).__name__, "last_id": self.last_id(), "oldest_id": self.oldest_id(),
+                "leader": self.leader()}
+
+
+class MemoryEventBus(EventBus):
+    """In-process stand-in for a broker: one process, several components, no files.
+
+    Events are stored serialised, so subscribers get copies exactly as they
+    would from a real broker.
+    """
+
+    def __init__(self, retain: int = 100000):
+        self.retain = retain
+        self._lock = threading.Lock()
+        self._events: deque = deque()  # (id, origin, message JSON, attributes JSON)
+        self._last_id = 0
+        self._lease: Optional[Dict[str, Any]] = None
+
+    def publish(self, message: Dict[str, Any], attributes: Optional[Dict[str, Any]] = None,
+                origin: Optional[str] = None) -> int:
+        encoded = (json.dumps(message, ensure_ascii=False, default=str),
+                   json.dumps(attributes, ensure_ascii=False, default=str) if attributes is not None else None)
+        with self._lock:
+            self._last_id += 1
+            self._events.append((self._last_id, origin) + encoded)
+            while len(self._events) > self.retain:
+                self._events.popleft()
+            return self._last_id
+
+    def read(self, after_id: int, limit: int = 500) -> List[Dict[str, Any]]:
+        with self._lock:
+            if not self._events or after_id >= self._last_id:
+                return []
+            start = max(0, after_id + 1 - self._events[0][0])  # ids are contiguous
+            rows = [self._events[index] for index in range(start, min(start + limit, len(self._events)))]
+        return [_event(*row) for row in rows]
+
+    def last_id(self) -> int:
+        return self._last_id
+
+    def oldest_id(self) -> int:
+        with self._lock:
+            return self._events[0][0] if self._events else self._last_id + 1
+
+    def try_lead(self, candidate: str, ttl: float) -> bool:
+        now = time.time()
+        with self._lock:
+            lease = self._lease
+            if lease and lease["holder"] != candidate and lease["expires"] > now:
+                return False
+            acquired = lease["acquired"] if lease and lease["holder"] == candidate else now
+            self._lease = {"holder": candidate, "expires": now + ttl, "acquired": acquired}
+            return True
+
+    def leader(self) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            lease = self._lease
+            return dict(lease) if lease and lease["expires"] > time.time() else None
+
+    def resign(self, candidate: str):
+        with self._lock:
+            if self._lease and self._lease["holder"] == candidate:
+                self._lease = None
+
+
+class SqliteEventBus(EventBus):
+    """Event bus in a local SQLite file, shared by the workers and instances on one host.
+
+    WAL mode lets every instance read while the leader appends. Each instance
+    polls ``read`` from its own position; rows beyond ``retain`` are trimmed
+    as new ones arrive. The lease row is checked and written in one
+    immediate transaction, so two instances can never both take it.
+    """
+
+    def __init__(self, db_path: str = "pega_bus.db", retain: int = 100000):
+        self.db_path = db_path
+        self.retain = retain
+        self._lock = threading.Lock()
+        self._published = 0
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=10, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS bus_events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                published REAL NOT NULL,
+                origin TEXT,
+                message TEXT NOT NULL,
+                attributes TEXT
+            )""")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS bus_lease (
+                name TEXT PRIMARY KEY,
+                holder TEXT NOT NULL,
+                expires REAL NOT NULL,
+                acquired REAL NOT NULL
+            )""")
+
+    def publish(self, message: Dict[str, Any], attributes: Optional[Dict[str, Any]] = None,
+                origin: Optional[str] = None) -> int:
+        encoded = (json.dumps(message, ensure_ascii=False, default=str),
+                   json.dumps(attributes, ensure_ascii=False, default=str) if attributes is not None else None)
+        with self._lock:
+            event_id = self._conn.execute(
+                "INSERT INTO bus_events (published, origin, message, attributes) VALUES (?, ?, ?, ?)",
+                (time.time(), origin) + encoded).lastrowid
+            self._published += 1
+            if self._published % 1000 == 0:
+                self._conn.execute("DELETE FROM bus_events WHERE id <= ?", (event_id - self.retain,))
+            return event_id
+
+    def read(self, after_id: int, limit: int = 500) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, origin, message, attributes FROM bus_events WHERE id > ? ORDER BY id LIMIT ?",
+                (after_id, limit)).fetchall()
+        return [_event(*row) for row in rows]
+
+    def last_id(self) -> int:
+        with self._lock:
+            # sqlite_sequence remembers the last id even after every row was trimmed
+            row = self._conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'bus_events'").fetchone()
+        return row[0] if row else 0
+
+    def oldest_id(self) -> int:
+        with self._lock:
+            row = self._conn.execute("SELECT MIN(id) FROM bus_events").fetchone()
+        return row[0] if row and row[0] is not None else self.last_id() + 1
+
+    def try_lead(self, candidate: str, ttl: float) -> bool:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute("SELECT holder, expires, acquired FROM bus_lease WHERE name = 'leader'").fetchone()
+                if row and row[0] != candidate and row[1] > now:
+                    self._conn.execute("ROLLBACK")
+                    return False
+                acquired = row[2] if row and row[0] == candidate else now
+                self._conn.execute("INSERT OR REPLACE INTO bus_lease (name, holder, expires, acquired) "
+                                   "VALUES ('leader', ?, ?, ?)", (candidate, now + ttl, acquired))
+                self._conn.execute("COMMIT")
+                return True
+            except sqlite3.Error:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def leader(self) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT holder, expires, acquired FROM bus_lease WHERE name = 'leader'").fetchone()
+        if not row or row[1] <= time.time():
+            return None
+        return {"holder": row[0], "expires": row[1], "acquired": row[2]}
+
+    def resign(self, candidate: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM bus_lease WHERE name = 'leader' AND holder = ?", (candidate,))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _event(event_id: int, origin: Optional[str], message: str, attributes: Optional[str]) -> Dict[str, Any]:
+    return {"id": event_id, "origin": origin, "message": json.loads(message),
+            "attributes": json.loads(attributes) if attributes is not None else None}
+
+
+# URL scheme -> factory(location, **options)
+BACKENDS: Dict[str, Callable[..., EventBus]] = {
+    "memory": lambda location, **options: MemoryEventBus(**options),
+    # sqlite:///pega_bus.db is relative, sqlite:////var/lib/pega/bus.db absolute
+    "sqlite": lambda location, **options: SqliteEventBus(location[1:] if location.startswith("/") else location,
+                                                         **options),
+}
+
+
+def register_backend(scheme: str, factory: Callable[..., EventBus]):
+    """Make ``open_bus("<scheme>://...")`` build a bus with ``factory(location, **options)``."""
+    BACKENDS[scheme] = factory
+
+
+def open_bus(url: str, **options) -> EventBus:
+    """Bus for a URL: ``memory://``, ``sqlite:///path`` (a bare path means SQLite) or a registered scheme."""
+    scheme, separator, location = url.partition("://")
+    if not separator:
+        scheme, location = "sqlite", "/" + url
+    if scheme not in BACKENDS:
+        raise ValueError(f"Unknown event bus '{scheme}'; use one of {', '.join(sorted(BACKENDS))}")
+    return BACKENDS[scheme](location, **options)
+
+
+class BusFollower:
+    """Reads the bus from a position onwards and hands each batch of events to ``handler`` in order.
+
+    The position only advances once ``handler`` returns, so a batch is never
+    skipped; a follower that falls further behind than the bus retains
+    reports how many events it lost and carries on from the oldest one held.
+    """
+
+    def __init__(self, bus: EventBus, handler: Callable[[List[Dict[str, Any]]], None], after_id: int = 0,
+                 poll_interval: float = 0.05, batch_size: int = 500):
+        self.bus = bus
+        self.handler = handler
+        self.position = after_id
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.stats = {"events": 0, "batches": 0, "lost": 0, "errors": 0, "last_error": None}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                events = self.bus.read(self.position, self.batch_size)
+                if events and events[0]["id"] > self.position + 1 and self.position < self.bus.oldest_id() - 1:
+                    lost = events[0]["id"] - self.position - 1
+                    self.stats["lost"] += lost
+                    print(f"❌ Event bus follower fell behind retention: {lost} events lost")
+                if not events:
+                    self._stop.wait(self.poll_interval)
+                    continue
+                self.handler(events)
+                self.position = events[-1]["id"]
+                self.stats["events"] += len(events)
+                self.stats["batches"] += 1
+            except Exception as e:
+                self.stats["errors"] += 1
+                self.stats["last_error"] = f"{type(e).__name__}: {e}"
+                print(f"❌ Event bus follower error: {e}")
+                self._stop.wait(1.0)
+
+    def status(self) -> Dict[str, Any]:
+        return {"position": self.position, "lag": max(0, self.bus.last_id() - self.position), **self.stats}
+
+
+class ForwardToLeader:
+    """ASGI middleware for follower instances: write requests are run by the leader instead.
+
+    ``should_forward(scope)`` decides per HTTP request; a forwarded request is
+    captured whole and handed to ``forward(request)``, a coroutine returning
+    the leader's ``{"status", "headers", "body"}`` (None when nobody answered).
+    """
+
+    def __init__(self, app, should_forward: Callable[[Dict[str, Any]], bool], forward: Callable):
+        self.app = app
+        self.should_forward = should_forward
+        self.forward = forward
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.should_forward(scope):
+            await self.app(scope, receive, send)
+            return
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+        reply = await self.forward({
+            "method": scope["method"],
+            "path": scope["path"],
+            "query": scope.get("query_string", b"").decode("latin-1"),
+            "headers": [[name.decode("latin-1"), value.decode("latin-1")] for name, value in scope["headers"]],
+            "body": base64.b64encode(body).decode("ascii"),
+        })
+        if reply is None:
+            reply = {"status": 503, "headers": [["content-type", "application/json"]],
+                     "body": base64.b64encode(b'{"detail":"No leader instance answered"}').decode("ascii")}
+        await send({"type": "http.response.start", "status": reply["status"],
+                    "headers": [(name.encode("latin-1"), value.encode("latin-1")) for name, value in reply["headers"]]})
+        await send({"type": "http.response.body", "body": base64.b64decode(reply["body"])})
+
+
+async def run_request(app, request: Dict[str, Any]) -> Dict[str, Any]:
+    """Run a request captured by ForwardToLeader through an ASGI app; returns what it answered."""
+    body = base64.b64decode(request["body"])
+    done = asyncio.Event()
+    received = False
+    reply: Dict[str, Any] = {"status": 500, "headers": [], "body": b""}
+
+    async def receive():
+        nonlocal received
+        if not received:
+            received = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            reply["status"] = message["status"]
+            reply["headers"] = [[name.decode("latin-1"), value.decode("latin-1")]
+                                for name, value in message.get("headers", [])]
+        elif message["type"] == "http.response.body":
+            reply["body"] += message.get("body", b"")
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "scheme": "http",
+        "method": request["method"], "path": request["path"], "raw_path": request["path"].encode("utf-8"),
+        "root_path": "", "query_string": request["query"].encode("latin-1"),
+        "headers": [(name.encode("latin-1"), value.encode("latin-1")) for name, value in request["headers"]],
+        "client": ("event-bus", 0), "server": ("leader", 0),
+    }
+    try:
+        await app(scope, receive, send)
+    finally:
+        done.set()
+    reply["body"] = base64.b64encode(reply["body"]).decode("ascii")
+    return reply
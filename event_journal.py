@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Event Journal
+Bounded, sequence-numbered record of broadcast events so /stream clients can resume after reconnecting
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from itertools import islice
+from typing import Dict, List, Any, Optional
+
+CLEAN_MARKER = "clean"
+
+
+class EventJournal:
+    """Recent broadcast events, numbered so a reconnecting client can ask for what it missed.
+
+    Sequence numbers start at the process start time in microseconds and
+    count up by one per event, so they keep increasing across restarts and a
+    number from an earlier run is never mistaken for one of this run. The
+    newest ``capacity`` events stay in memory. With ``spill_dir`` set, events
+    leaving memory are appended to JSONL segment files (``segment_events``
+    each, at most ``spill_events`` in total) and a clean ``close`` spills the
+    rest, so resumes also survive a restart; after a crash the segments are
+    discarded because the events that were only in memory are gone.
+
+    ``since(seq)`` returns the events after ``seq``, or None when some of
+    them are no longer held or ``seq`` is ahead of the journal (the caller
+    sends a snapshot instead).
+
+    A caller that already numbers its events (the scale-out event bus) passes
+    ``first_seq`` and each event's ``seq`` to ``append``; those numbers only
+    have to increase, not to be consecutive.
+    """
+
+    def __init__(self, capacity: int = 5000, spill_dir: Optional[str] = None, spill_events: int = 100000,
+                 segment_events: int = 5000, first_seq: Optional[int] = None):
+        """Create the journal, reloading segments a previous run closed cleanly."""
+        self.capacity = capacity
+        self.spill_dir = spill_dir
+        self.spill_events = spill_events
+        self.segment_events = segment_events
+        self._lock = threading.Lock()
+        self._memory: deque = deque()  # (seq, message, attributes), ascending seqs
+        self._segments: List[Dict[str, Any]] = []  # {"first", "last", "path", "count"}
+        self._segment_file = None
+        self.next_seq = first_seq if first_seq is not None else time.time_ns() // 1000
+        self.stats = {"appended": 0, "spilled": 0, "replays": 0, "replayed": 0, "gaps": 0}
+        if spill_dir:
+            self._open_spill()
+        # Every seq up to _dropped is gone; every seq up to _left_memory is on disk (or gone)
+        self._dropped = self._segments[0]["first"] - 1 if self._segments else self.next_seq - 1
+        self._left_memory = self._segments[-1]["last"] if self._segments else self.next_seq - 1
+
+    # ------------------------------------------------------------------- spill
+
+    def _open_spill(self):
+        os.makedirs(self.spill_dir, exist_ok=True)
+        marker = os.path.join(self.spill_dir, CLEAN_MARKER)
+        clean = os.path.exists(marker)
+        for name in sorted(os.listdir(self.spill_dir)):
+            path = os.path.join(self.spill_dir, name)
+            if not (name.startswith("seg-") and name.endswith(".jsonl")):
+                continue
+            last, count = self._scan_segment(path) if clean else (None, 0)
+            if last is None:
+                os.remove(path)
+                continue
+            self._segments.append({"first": int(name[4:-6]), "last": last, "path": path, "count": count})
+        if os.path.exists(marker):
+            os.remove(marker)  # only a clean close puts it back
+        if self._segments:
+            self.next_seq = max(self.next_seq, self._segments[-1]["last"] + 1)
+            print(f"✅ Stream journal reloaded {sum(s['count'] for s in self._segments)} spilled events")
+
+    @staticmethod
+    def _scan_segment(path: str) -> tuple:
+        last, count = None, 0
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    last = json.loads(line)["seq"]
+                    count += 1
+                except (ValueError, KeyError):
+                    break  # torn final line
+        return last, count
+
+    def _spill(self, entry: tuple):
+        seq, message, attributes = entry
+        segment = self._segments[-1] if self._segments else None
+        if segment is None or segment["count"] >= self.segment_events or self._segment_file is None:
+            if self._segment_file is not None:
+                self._segment_file.close()
+            path = os.path.join(self.spill_dir, f"seg-{seq:016d}.jsonl")
+            segment = {"first": seq, "last": seq, "path": path, "count": 0}
+            self._segments.append(segment)
+            self._segment_file = open(path, "a", encoding="utf-8")
+        self._segment_file.write(json.dumps({"seq": seq, "message": message, "attributes": attributes},
+                                            ensure_ascii=False, default=str) + "\n")
+        segment["last"] = seq
+        segment["count"] += 1
+        self.stats["spilled"] += 1
+        while sum(s["count"] for s in self._segments) > self.spill_events and len(self._segments) > 1:
+            oldest = self._segments.pop(0)
+            os.remove(oldest["path"])
+            self._dropped = oldest["last"]
+
+    @staticmethod
+    def _read_segments(paths: List[str], after: int) -> List[tuple]:
+        entries = []
+        for path in paths:
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break  # the segment being written: the rest is read on the next pass
+                    if record["seq"] > after:
+                        entries.append((record["seq"], record["message"], record["attributes"]))
+        return entries
+
+    # ------------------------------------------------------------------ access
+
+    def append(self, message: Dict[str, Any], attributes: Optional[Dict[str, Any]] = None,
+               seq: Optional[int] = None) -> int:
+        """Number and store an event; sets ``message["seq"]`` and returns it.
+
+        ``seq`` keeps a number assigned upstream; it must be above every earlier one.
+        """
+        with self._lock:
+            if seq is None:
+                seq = self.next_seq
+            elif seq < self.next_seq:
+                raise ValueError(f"Journal seq {seq} is not after {self.next_seq - 1}")
+            self.next_seq = seq + 1
+            message["seq"] = seq
+            self._memory.append((seq, message, attributes))
+            self.stats["appended"] += 1
+            while len(self._memory) > self.capacity:
+                evicted = self._memory.popleft()
+                self._left_memory = evicted[0]
+                if self.spill_dir:
+                    self._spill(evicted)
+                else:
+                    self._dropped = evicted[0]
+        return seq
+
+    @property
+    def last_seq(self) -> int:
+        """Sequence number of the newest event (one below the first number when empty)."""
+        return self.next_seq - 1
+
+    def oldest_seq(self) -> int:
+        """Lowest ``resume_from`` that ``since`` can still serve."""
+        with self._lock:
+            return self._dropped
+
+    def _memory_after(self, after: int) -> List[tuple]:
+        memory = self._memory
+        first = memory[0][0] if memory else self.next_seq
+        if not memory or memory[-1][0] - first == len(memory) - 1:
+            # Consecutive numbers: the start is an offset, not a search
+            return list(islice(memory, max(0, after + 1 - first), None))
+        low, high = 0, len(memory)
+        while low < high:
+            middle = (low + high) // 2
+            if memory[middle][0] <= after:
+                low = middle + 1
+            else:
+                high = middle
+        return list(islice(memory, low, None))
+
+    def since(self, seq: int) -> Optional[List[tuple]]:
+        """(seq, message, attributes) of every event after ``seq``; None when some were dropped.
+
+        A ``seq`` beyond the newest event was not issued by this journal (another
+        numbering, or a stale client of a lost spill), so it also gets None.
+        Spilled segments are read without holding the lock, so appends never
+        wait on a replay from disk.
+        """
+        with self._lock:
+            if seq > self.next_seq - 1:
+                self.stats["gaps"] += 1
+                return None
+        entries: List[tuple] = []
+        after = seq
+        while True:
+            with self._lock:
+                if after >= self.next_seq - 1:
+                    break
+                if after < self._dropped:
+                    self.stats["gaps"] += 1
+                    return None
+                if after >= self._left_memory:
+                    entries.extend(self._memory_after(after))
+                    break
+                if self._segment_file is not None:
+                    self._segment_file.flush()
+                paths = [segment["path"] for segment in self._segments if segment["last"] > after]
+            try:
+                spilled = self._read_segments(paths, after)
+            except FileNotFoundError:
+                spilled = []  # rotated away meanwhile; the next pass reports the gap
+            if not spilled:
+                with self._lock:
+                    self.stats["gaps"] += 1
+                return None
+            entries.extend(spilled)
+            after = spilled[-1][0]
+        with self._lock:
+            self.stats["replays"] += 1
+            self.stats["replayed"] += len(entries)
+        return entries
+
+    def close(self):
+        """Spill what is in memory and mark the spill as cleanly closed."""
+        if not self.spill_dir:
+            return
+        with self._lock:
+            while self._memory:
+                self._left_memory = self._memory[0][0]
+                self._spill(self._memory.popleft())
+            if self._segment_file is not None:
+                self._segment_file.close()
+                self._segment_file = None
+            with open(os.path.join(self.spill_dir, CLEAN_MARKER), "w", encoding="utf-8") as f:
+                f.write(str(self.last_seq))
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "capacity": self.capacity,
+                "in_memory": len(self._memory),
+                "spilled_segments": len(self._segments),
+                "spilled_events": sum(segment["count"] for segment in self._segments),
+                "last_seq": self.next_seq - 1,
+                "oldest_seq": self._dropped,
+                **self.stats,
+            }
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+Embedded SQLite Event Store
+Durable history of logs, analyses and tickets with batched writes and daily retention
+"""
+
+import json
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Optional, Iterator
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS logs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    day TEXT NOT NULL,
+    level TEXT,
+    alert_code TEXT,
+    message TEXT NOT NULL,
+    payload TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_logs_timestamp ON logs (timestamp);
+CREATE INDEX IF NOT EXISTS idx_logs_day ON logs (day);
+CREATE INDEX IF NOT EXISTS idx_logs_alert_code ON logs (alert_code, timestamp);
+
+CREATE TABLE IF NOT EXISTS analyses (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    day TEXT NOT NULL,
+    alert_code TEXT,
+    severity TEXT,
+    category TEXT,
+    action TEXT,
+    kedb_match TEXT,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_analyses_timestamp ON analyses (timestamp);
+CREATE INDEX IF NOT EXISTS idx_analyses_day ON analyses (day);
+CREATE INDEX IF NOT EXISTS idx_analyses_alert_code ON analyses (alert_code, timestamp);
+CREATE INDEX IF NOT EXISTS idx_analyses_severity ON analyses (severity, timestamp);
+CREATE INDEX IF NOT EXISTS idx_analyses_action ON analyses (action, timestamp);
+
+CREATE TABLE IF NOT EXISTS tickets (
+    ticket_id TEXT PRIMARY KEY,
+    timestamp TEXT NOT NULL,
+    day TEXT NOT NULL,
+    alert_code TEXT,
+    severity TEXT,
+    category TEXT,
+    status TEXT,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_tickets_timestamp ON tickets (timestamp);
+CREATE INDEX IF NOT EXISTS idx_tickets_day ON tickets (day);
+CREATE INDEX IF NOT EXISTS idx_tickets_status ON tickets (status, timestamp);
+CREATE INDEX IF NOT EXISTS idx_tickets_severity ON tickets (severity, timestamp);
+CREATE INDEX IF NOT EXISTS idx_tickets_alert_code ON tickets (alert_code, timestamp);
+"""
+
+# Filterable columns per table; anything else in a filter dict is ignored
+FILTER_COLUMNS = {
+    "logs": ("level", "alert_code"),
+    "analyses": ("alert_code", "severity", "category", "action", "kedb_match"),
+    "tickets": ("alert_code", "severity", "category", "status"),
+}
+
+
+class EventStore:
+    """SQLite-backed store for logs, analyses and tickets.
+
+    Writes are queued and flushed by a single writer thread in batches (one
+    transaction per batch), so the monitoring thread never waits on disk.
+    The database runs in WAL mode so history queries read concurrently with
+    the writer. Rows carry a ``day`` column and retention drops whole days.
+
+    With ``writable=False`` (an instance that is not the leader) only the
+    reader connection is opened and records are dropped; ``start_writer``
+    and ``stop_writer`` switch writing on and off as the lease moves.
+    """
+
+    def __init__(self, db_path: str = "pega_events.db", batch_size: int = 200,
+                 flush_interval: float = 1.0, retention_days: int = 14, writable: bool = True):
+        """Open (or create) the database, and start the writer thread when writable."""
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retention_days = retention_days
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._read_lock = threading.Lock()
+        self._last_prune = 0.0
+        self._writer_conn: Optional[sqlite3.Connection] = None
+        self._writer: Optional[threading.Thread] = None
+
+        self._reader_conn = self._connect()
+        if writable:
+            self.start_writer()
+        elif self._reader_conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'logs'").fetchone() is None:
+            # A new database: create the tables so reads work before the leader writes
+            self._reader_conn.executescript(SCHEMA)
+
+    @property
+    def writable(self) -> bool:
+        return self._writer is not None
+
+    def start_writer(self):
+        """Bring the schema up to date and start the writer thread."""
+        if self._writer is not None:
+            return
+        writer = self._connect()
+        writer.executescript(SCHEMA)
+        # Databases from before full log entries were kept lack the payload column
+        if "payload" not in {row["name"] for row in writer.execute("PRAGMA table_info(logs)")}:
+            writer.execute("ALTER TABLE logs ADD COLUMN payload TEXT")
+        writer.commit()
+        self._writer_conn = writer
+        self._queue = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+
+    def stop_writer(self):
+        """Write what is queued, then stop the writer thread (reads keep working)."""
+        if self._writer is None:
+            return
+        writer, self._writer = self._writer, None
+        self._queue.put(None)
+        writer.join(timeout=5)
+        self._writer_conn.close()
+        self._writer_conn = None
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    # ------------------------------------------------------------------ writes
+
+    def _put(self, item: tuple):
+        if self._writer is not None:
+            self._queue.put(item)
+
+    def record_log(self, log_entry: Dict[str, Any]):
+        """Queue a log entry for insertion (the whole entry, minus its in-memory id)."""
+        timestamp = str(log_entry.get("timestamp", ""))
+        payload = {key: value for key, value in log_entry.items() if key != "id"}
+        self._put(("logs", (
+            timestamp, timestamp[:10], log_entry.get("level"),
+            log_entry.get("alert_code"), log_entry.get("message", ""),
+            json.dumps(payload, ensure_ascii=False, default=str)
+        )))
+
+    def record_analysis(self, analysis_entry: Dict[str, Any]):
+        """Queue an analysis entry for insertion."""
+        timestamp = str(analysis_entry.get("timestamp", ""))
+        analysis = analysis_entry.get("analysis") or {}
+        self._put(("analyses", (
+            timestamp, timestamp[:10], analysis_entry.get("alert_code"),
+            analysis.get("severity"), analysis.get("category"), analysis.get("action"),
+            analysis.get("kedb_match"), json.dumps(analysis_entry, ensure_ascii=False, default=str)
+        )))
+
+    def record_ticket(self, ticket: Dict[str, Any]):
+        """Queue a ticket insert-or-replace (keyed by ticket_id)."""
+        timestamp = str(ticket.get("timestamp", ""))
+        self._put(("tickets", (
+            ticket.get("ticket_id"), timestamp, timestamp[:10], ticket.get("alert_code"),
+            ticket.get("severity"), ticket.get("category"), ticket.get("status"),
+            json.dumps(ticket, ensure_ascii=False, default=str)
+        )))
+
+    def flush(self, timeout: float = 5.0):
+        """Block until everything queued so far has been written."""
+        if self._writer is None:
+            return
+        done = threading.Event()
+        self._queue.put(("flush", done))
+        done.wait(timeout)
+
+    def close(self):
+        """Flush pending writes, stop the writer thread and close the database."""
+        self.stop_writer()
+        self._reader_conn.close()
+
+    def _write_loop(self):
+        batch: List[tuple] = []
+        items = self._queue
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            timeout = max(0.0, deadline - time.monotonic())
+            try:
+                item = items.get(timeout=timeout)
+            except queue.Empty:
+                item = ()
+
+            if item is None:
+                self._write_batch(batch)
+                return
+            if item and item[0] == "flush":
+                self._write_batch(batch)
+                batch = []
+                item[1].set()
+                continue
+            if item:
+                batch.append(item)
+
+            if len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                self._write_batch(batch)
+                batch = []
+                deadline = time.monotonic() + self.flush_interval
+                self._maybe_prune()
+
+    def _write_batch(self, batch: List[tuple]):
+        if not batch:
+            return
+        rows: Dict[str, List[tuple]] = {"logs": [], "analyses": [], "tickets": []}
+        for table, row in batch:
+            rows[table].append(row)
+        try:
+            with self._writer_conn:
+                if rows["logs"]:
+                    self._writer_conn.executemany(
+                        "INSERT INTO logs (timestamp, day, level, alert_code, message, payload) VALUES (?, ?, ?, ?, ?, ?)",
+                        rows["logs"])
+                if rows["analyses"]:
+                    self._writer_conn.executemany(
+                        "INSERT INTO analyses (timestamp, day, alert_code, severity, category, action, kedb_match, payload) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        rows["analyses"])
+                if rows["tickets"]:
+                    self._writer_conn.executemany(
+                        "INSERT OR REPLACE INTO tickets (ticket_id, timestamp, day, alert_code, severity, category, status, payload) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        rows["tickets"])
+        except sqlite3.Error as e:
+            print(f"❌ Failed to write {len(batch)} events to store: {e}")
+
+    # --------------------------------------------------------------- retention
+
+    def _maybe_prune(self):
+        if time.monotonic() - self._last_prune < 3600:
+            return
+        self._last_prune = time.monotonic()
+        self.prune()
+
+    def prune(self, retention_days: Optional[int] = None) -> Dict[str, int]:
+        """Drop every day older than the retention window (only while writable)."""
+        if self._writer is None:
+            return {}
+        days = self.retention_days if retention_days is None else retention_days
+        cutoff = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
+        removed = {}
+        with self._read_lock:
+            conn = self._reader_conn
+            try:
+                with conn:
+                    for table in ("logs", "analyses", "tickets"):
+                        removed[table] = conn.execute(f"DELETE FROM {table} WHERE day < ?", (cutoff,)).rowcount
+            except sqlite3.Error as e:
+                print(f"❌ Failed to prune event store: {e}")
+                return {}
+        if any(removed.values()):
+            print(f"🧹 Pruned events older than {cutoff}: {removed}")
+        return removed
+
+    # ------------------------------------------------------------------- reads
+
+    def query(self, table: str, since: Optional[str] = None, until: Optional[str] = None,
+              filters: Optional[Dict[str, List[Any]]] = None, before_id: Optional[int] = None,
+              limit: int = 100) -> List[Dict[str, Any]]:
+        """Newest-first rows in a time range, narrowed by indexed columns."""
+        clauses, params = [], []
+        if since:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        if until:
+            clauses.append("timestamp < ?")
+            params.append(until)
+        if before_id is not None and table != "tickets":
+            clauses.append("id < ?")
+            params.append(before_id)
+        for column, values in (filters or {}).items():
+            if column in FILTER_COLUMNS[table] and values:
+                clauses.append(f"{column} IN ({', '.join('?' for _ in values)})")
+                params.extend(values)
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        order = "timestamp DESC" if table == "tickets" else "id DESC"
+        sql = f"SELECT * FROM {table} {where} ORDER BY {order} LIMIT ?"
+        params.append(limit)
+
+        with self._read_lock:
+            rows = self._reader_conn.execute(sql, params).fetchall()
+        return [self._row_to_dict(table, row) for row in rows]
+
+    def recent(self, table: str, limit: int) -> List[Dict[str, Any]]:
+        """The newest rows of a table in chronological order (for warm restarts)."""
+        return list(reversed(self.query(table, limit=limit)))
+
+    def iter_rows(self, table: str, since: Optional[str] = None, until_id: Optional[int] = None,
+                  batch_size: int = 5000) -> Iterator[Dict[str, Any]]:
+        """Stream rows oldest-first in id-ordered batches (logs and analyses), up to ``until_id``."""
+        last_id = 0
+        while True:
+            params: List[Any] = [last_id]
+            sql = f"SELECT * FROM {table} WHERE id > ?"
+            if since:
+                sql += " AND timestamp >= ?"
+                params.append(since)
+            if until_id is not None:
+                sql += " AND id <= ?"
+                params.append(until_id)
+            sql += " ORDER BY id LIMIT ?"
+            params.append(batch_size)
+            with self._read_lock:
+                rows = self._reader_conn.execute(sql, params).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield self._row_to_dict(table, row)
+            last_id = rows[-1]["id"]
+
+    def iter_changes(self, table: str, after_id: int = 0,
+                     batch_size: int = 5000) -> Iterator[Dict[str, Any]]:
+        """Stream rows written after ``after_id`` oldest-first, each with its ``row_id``.
+
+        Tickets are replaced on every change and take a new rowid, so a ticket
+        reappears here once per version.
+        """
+        key = "rowid" if table == "tickets" else "id"
+        while True:
+            with self._read_lock:
+                rows = self._reader_conn.execute(
+                    f"SELECT {key} AS row_id, * FROM {table} WHERE {key} > ? ORDER BY {key} LIMIT ?",
+                    (after_id, batch_size)).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield {**self._row_to_dict(table, row), "row_id": row["row_id"]}
+            after_id = rows[-1]["row_id"]
+
+    def count(self, table: str) -> int:
+        """Number of rows currently stored in a table."""
+        with self._read_lock:
+            return self._reader_conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+    @staticmethod
+    def _row_to_dict(table: str, row: sqlite3.Row) -> Dict[str, Any]:
+        if table == "logs":
+            if "payload" in row.keys() and row["payload"]:
+                return {**json.loads(row["payload"]), "store_id": row["id"]}
+            return {
+                "store_id": row["id"],
+                "timestamp": row["timestamp"],
+                "level": row["level"],
+                "alert_code": row["alert_code"],
+                "message": row["message"],
+            }
+        payload = json.loads(row["payload"])
+        if table == "analyses":
+            payload["store_id"] = row["id"]
+        return payload
@@ -593,7 +593,8 @@ function App() {
                       color: analysis.analysis?.action === 'self_healed' ? '#3fb950' : '#d29922',
                       border: `1px solid ${analysis.analysis?.action === 'self_healed' ? 'rgba(63, 185, 80, 0.3)' : 'rgba(210, 153, 34, 0.3)'}`
                     }}>
-                      {analysis.analysis?.action === 'self_healed' ? '🔧 Self-Healed' : '🎫 Ticket Created'}
+                      {analysis.analysis?.action === 'self_healed' ? '🔧 Self-Healed'
+                        : analysis.analysis?.action === 'self_healing' ? '⏳ Self-Healing' : '🎫 Ticket Created'}
                     </span>
                     
                     {analysis.analysis?.ticket_id && (
@@ -7,6 +7,7 @@ class ApiService {
   private ws: WebSocket | null = null;
   private reconnectAttempts = 0;
   private maxReconnectAttempts = 5;
+  private lastSeq: number | null = null;
 
   // REST API calls
   async getStatus() {
@@ -49,7 +50,8 @@ class ApiService {
       return;
     }
 
-    this.ws = new WebSocket(WS_URL);
+    // Resume from the last event seen so a reconnect replays what was missed
+    this.ws = new WebSocket(this.lastSeq !== null ? `${WS_URL}?resume_from=${this.lastSeq}` : WS_URL);
 
     this.ws.onopen = () => {
       console.log('✅ WebSocket connected');
@@ -59,6 +61,9 @@ class ApiService {
     this.ws.onmessage = (event) => {
       try {
         const data = JSON.parse(event.data);
+        if (typeof data.seq === 'number') {
+          this.lastSeq = data.seq;
+        }
         onMessage(data);
       } catch (error) {
         console.error('❌ Failed to parse WebSocket message:', error);
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Inference Client
+Managed Ollama client: pooled HTTP connections, resident models and per-request timing
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Any, Optional, Union
+
+try:
+    import httpx
+    import ollama
+except ImportError:  # checked when the client is created
+    httpx = None
+    ollama = None
+
+NS_PER_MS = 1_000_000
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class ManagedOllamaClient:
+    """Drop-in for ``ollama.Client`` shared by every analysis caller.
+
+    * connection pool: one httpx pool of ``pool_size`` keep-alive connections
+      instead of the library's unbounded defaults
+    * residency: every request carries an explicit ``keep_alive``; pinned
+      models get ``-1`` (never unload) and a background thread pings them
+      every ``warm_interval`` so a server restart or eviction is repaired
+      before a real request pays the cold load
+    * timing: chat responses are streamed so time-to-first-token is measured
+      separately from total time, and Ollama's own load/prompt/eval durations
+      tell cold-load cost apart from inference
+
+    ``chat`` returns a plain dict shaped like the library's response, with a
+    ``timings`` entry added. Other methods (embed, list, pull...) pass
+    through to the underlying client.
+    """
+
+    def __init__(self, host: Optional[str] = None, pool_size: int = 8, keep_alive: Union[str, float] = "30m",
+                 pinned_models: Optional[List[str]] = None, warm_interval: float = 240.0,
+                 timeout: float = 120.0, cold_load_ms: float = 500.0, samples: int = 500):
+        """Create the pooled client; call start_warming() to keep pinned models resident."""
+        if ollama is None:
+            raise ImportError("ollama is required for model inference. Install with: pip install ollama")
+        self.host = host
+        self.pool_size = pool_size
+        self.keep_alive = keep_alive
+        self.pinned_models = [model for model in (pinned_models or []) if model]
+        self.warm_interval = warm_interval
+        self.cold_load_ms = cold_load_ms
+        self.client = ollama.Client(
+            host=host,
+            timeout=httpx.Timeout(timeout, connect=5.0),
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size,
+                                keepalive_expiry=max(warm_interval * 2, 60.0)),
+        )
+        self._lock = threading.Lock()
+        self._samples = samples
+        self._models: Dict[str, Dict[str, Any]] = {}
+        self._resident: Dict[str, Any] = {}
+        self._stop = threading.Event()
+        self._warmer: Optional[threading.Thread] = None
+        self.warm_pings = {"sent": 0, "cold": 0, "failed": 0, "last_ping": None}
+
+    def __getattr__(self, name):
+        if name == "client":
+            raise AttributeError(name)
+        # embed, embeddings, list, pull, ps... go straight to the pooled client
+        return getattr(self.client, name)
+
+    def keep_alive_for(self, model: str) -> Union[str, float]:
+        return -1 if model in self.pinned_models else self.keep_alive
+
+    def chat(self, model: str, messages: List[Dict[str, Any]], **kwargs) -> Dict[str, Any]:
+        """Streamed chat returning ``{"model", "message", "timings"}``."""
+        kwargs.setdefault("keep_alive", self.keep_alive_for(model))
+        started = time.perf_counter()
+        first_token = None
+        parts: List[str] = []
+        final: Any = {}
+        try:
+            for chunk in self.client.chat(model=model, messages=messages, stream=True, **kwargs):
+                content = chunk["message"]["content"] or ""
+                if content and first_token is None:
+                    first_token = time.perf_counter()
+                parts.append(content)
+                if chunk.get("done"):
+                    final = chunk
+        except Exception:
+            self._record(model, None)
+            raise
+        finished = time.perf_counter()
+
+        timings = {
+            "ttft_ms": round(((first_token or finished) - started) * 1000, 1),
+            "total_ms": round((finished - started) * 1000, 1),
+            "load_ms": round((final.get("load_duration") or 0) / NS_PER_MS, 1),
+            "prompt_eval_ms": round((final.get("prompt_eval_duration") or 0) / NS_PER_MS, 1),
+            "eval_ms": round((final.get("eval_duration") or 0) / NS_PER_MS, 1),
+            "eval_tokens": final.get("eval_count") or 0,
+        }
+        timings["cold_start"] = timings["load_ms"] >= self.cold_load_ms
+        self._record(model, timings)
+        return {"model": model, "message": {"role": "assistant", "content": "".join(parts)}, "timings": timings}
+
+    def _record(self, model: str, timings: Optional[Dict[str, Any]]):
+        with self._lock:
+            counters = self._models.setdefault(model, {
+                "requests": 0, "errors": 0, "cold_starts": 0, "eval_tokens": 0, "eval_ms": 0.0,
+                "ttft_ms": deque(maxlen=self._samples), "total_ms": deque(maxlen=self._samples),
+                "load_ms": deque(maxlen=self._samples),
+            })
+            counters["requests"] += 1
+            if timings is None:
+                counters["errors"] += 1
+                return
+            counters["cold_starts"] += 1 if timings["cold_start"] else 0
+            counters["eval_tokens"] += timings["eval_tokens"]
+            counters["eval_ms"] += timings["eval_ms"]
+            for key in ("ttft_ms", "total_ms", "load_ms"):
+                counters[key].append(timings[key])
+
+    def warm(self, model: str) -> Optional[float]:
+        """Load (or keep) a model resident; returns the load time in ms, None on failure."""
+        try:
+            # An empty prompt only loads the model and refreshes its keep_alive
+            response = self.client.generate(model=model, prompt="", keep_alive=self.keep_alive_for(model))
+            load_ms = round((response.get("load_duration") or 0) / NS_PER_MS, 1)
+        except Exception as e:
+            with self._lock:
+                self.warm_pings["failed"] += 1
+            print(f"⚠️ Warm ping for {model} failed: {e}")
+            return None
+        with self._lock:
+            self.warm_pings["sent"] += 1
+            self.warm_pings["last_ping"] = time.time()
+            if load_ms >= self.cold_load_ms:
+                self.warm_pings["cold"] += 1
+        if load_ms >= self.cold_load_ms:
+            print(f"🔥 Loaded {model} into memory ({load_ms:.0f}ms)")
+        return load_ms
+
+    def start_warming(self):
+        """Warm pinned models now and then every ``warm_interval`` on a daemon thread."""
+        if not self.pinned_models or self._warmer is not None:
+            return
+        self._stop.clear()
+        self._warmer = threading.Thread(target=self._warm_loop, daemon=True)
+        self._warmer.start()
+
+    def _warm_loop(self):
+        while not self._stop.is_set():
+            for model in self.pinned_models:
+                self.warm(model)
+            self._refresh_residency()
+            if self.warm_interval <= 0:
+                return
+            self._stop.wait(self.warm_interval)
+
+    def _refresh_residency(self):
+        try:
+            running = self.client.ps().get("models") or []
+        except Exception:
+            return
+        resident = {}
+        for process in running:
+            expires = process.get("expires_at")
+            resident[process.get("model") or process.get("name")] = {
+                "size_vram": process.get("size_vram"),
+                "expires_at": expires.isoformat() if hasattr(expires, "isoformat") else expires,
+            }
+        with self._lock:
+            self._resident = resident
+
+    def status(self) -> Dict[str, Any]:
+        """Pool settings, residency and per-model TTFT/total/load timings."""
+        with self._lock:
+            models = {}
+            for model, c in self._models.items():
+                ttft, total, load = list(c["ttft_ms"]), list(c["total_ms"]), list(c["load_ms"])
+                models[model] = {
+                    "requests": c["requests"],
+                    "errors": c["errors"],
+                    "cold_starts": c["cold_starts"],
+                    "ttft_ms": {"avg": round(sum(ttft) / len(ttft), 1) if ttft else 0.0,
+                                "p50": percentile(ttft, 0.5), "p95": percentile(ttft, 0.95)},
+                    "total_ms": {"avg": round(sum(total) / len(total), 1) if total else 0.0,
+                                 "p50": percentile(total, 0.5), "p95": percentile(total, 0.95)},
+                    "load_ms": {"avg": round(sum(load) / len(load), 1) if load else 0.0,
+                                "max": max(load) if load else 0.0},
+                    "tokens_per_second": round(c["eval_tokens"] / (c["eval_ms"] / 1000), 1) if c["eval_ms"] else 0.0,
+                }
+            return {
+                "host": self.host or "default",
+                "pool_size": self.pool_size,
+                "keep_alive": self.keep_alive,
+                "pinned_models": self.pinned_models,
+                "warm_interval": self.warm_interval,
+                "warm_pings": dict(self.warm_pings),
+                "resident_models": dict(self._resident),
+                "models": models,
+            }
+
+    def close(self):
+        """Stop warm pings and close pooled connections (pinned models stay loaded in Ollama)."""
+        self._stop.set()
+        if self._warmer is not None:
+            self._warmer.join(timeout=5)
+            self._warmer = None
+        try:
+            self.client._client.close()
+        except Exception:
+            pass
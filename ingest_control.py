@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Ingest Control
+Adaptive load shedding for log analysis: estimates how far analysis has fallen behind from
+queue depth and model latency, and decides per event whether to analyse, sample or defer it
+"""
+
+import math
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Dict, Any, Optional, Callable, Iterable
+
+LEVELS = ("normal", "pressured", "overloaded")
+
+# decide() outcomes
+CRITICAL = "critical"          # always analysed
+NEW_SIGNATURE = "new"          # always analysed
+ANALYZE = "analyze"            # analysed (no pressure, or a repeat that was sampled in)
+SAMPLED_OUT = "sampled_out"    # a repeat skipped under pressure
+DEFER = "defer"                # INFO event parked until the backlog clears
+
+
+class IngestController:
+    """Shedding policy driven by the estimated analysis backlog in seconds.
+
+    The backlog is queue depth divided by analysis capacity, where capacity is
+    the larger of the measured completion rate and ``workers`` over the model
+    latency EWMA. The level rises when the backlog passes ``target_delay``
+    (pressured) or ``overload_delay`` (overloaded) and only falls once it is
+    under half of that threshold again, so the policy does not flap.
+
+    While pressured or overloaded, critical events (configured or learned
+    alert codes) and signatures not seen recently are always analysed;
+    repeats of a known signature are analysed 1 in k, k growing with the
+    backlog up to ``max_sample_every``; INFO events wait in a bounded deferred
+    queue (oldest dropped when full) and are released once the level is
+    normal again. Every outcome is counted for status().
+    """
+
+    def __init__(self, workers: int = 1, target_delay: float = 30.0, overload_delay: float = 120.0,
+                 critical_codes: Iterable[str] = (), max_sample_every: int = 20, deferred_size: int = 1000,
+                 signature_memory: int = 10000, initial_latency: float = 2.0, rate_window: float = 30.0,
+                 enabled: bool = True):
+        self.workers = max(1, workers)
+        self.target_delay = target_delay
+        self.overload_delay = max(overload_delay, target_delay)
+        self.critical_codes = set(critical_codes)
+        self.max_sample_every = max(2, max_sample_every)
+        self.deferred_size = deferred_size
+        self.signature_memory = signature_memory
+        self.rate_window = rate_window
+        self.enabled = enabled
+        self.level = LEVELS[0]
+        self._latency = initial_latency  # EWMA seconds per analysis
+        self._backlog = 0.0
+        self._depth = 0
+        self._completions: deque = deque()
+        self._seen: "OrderedDict[str, int]" = OrderedDict()  # signature -> occurrences, least recent first
+        self._learned: Dict[str, str] = {}  # alert code -> severity of its latest analysis
+        self._deferred: deque = deque()
+        self._lock = threading.Lock()
+        self.stats = {"events": 0, "analyzed": 0, "critical": 0, "new_signatures": 0, "sampled_in": 0,
+                      "deferred": 0, "deferred_released": 0, "level_changes": 0}
+        self.shed: Dict[str, int] = {}  # reason -> events not analysed
+
+    def _update(self, depth: int):
+        """Recompute the backlog estimate and level (caller holds the lock)."""
+        now = time.monotonic()
+        while self._completions and self._completions[0] < now - self.rate_window:
+            self._completions.popleft()
+        measured = len(self._completions) / self.rate_window
+        capacity = max(measured, self.workers / max(self._latency, 1e-3))
+        self._depth = depth
+        self._backlog = depth / capacity
+        index = LEVELS.index(self.level)
+        thresholds = (self.target_delay, self.overload_delay)
+        while index < len(thresholds) and self._backlog >= thresholds[index]:
+            index += 1
+        while index > 0 and self._backlog < thresholds[index - 1] / 2:
+            index -= 1
+        if LEVELS[index] != self.level:
+            print(f"⚖️ Ingest control: {self.level} -> {LEVELS[index]} (backlog {self._backlog:.1f}s, depth {depth})")
+            self.level = LEVELS[index]
+            self.stats["level_changes"] += 1
+
+    def _sample_every(self) -> int:
+        if self.level == "overloaded":
+            return self.max_sample_every
+        return min(self.max_sample_every, max(2, math.ceil(self._backlog / max(self.target_delay, 1e-3))))
+
+    def decide(self, signature: Optional[str], alert_code: Optional[str] = None, level: Optional[str] = None,
+               critical: bool = False, depth: int = 0) -> str:
+        """Outcome for one event given the analysis queue ``depth`` it would join."""
+        with self._lock:
+            self._update(depth)
+            self.stats["events"] += 1
+            seen = self._seen.pop(signature, 0) if signature else 0
+            if signature:
+                self._seen[signature] = seen + 1
+                if len(self._seen) > self.signature_memory:
+                    self._seen.popitem(last=False)
+            if critical or alert_code in self.critical_codes or self._learned.get(alert_code) == "Critical":
+                self.stats["critical"] += 1
+                return CRITICAL
+            if not seen:
+                self.stats["new_signatures"] += 1
+                return NEW_SIGNATURE
+            if not self.enabled or self.level == "normal":
+                self.stats["analyzed"] += 1
+                return ANALYZE
+            if level == "INFO":
+                return DEFER
+            if seen % self._sample_every() == 0:
+                self.stats["sampled_in"] += 1
+                return ANALYZE
+            self.shed[SAMPLED_OUT] = self.shed.get(SAMPLED_OUT, 0) + 1
+            return SAMPLED_OUT
+
+    def defer(self, item: Any) -> Optional[Any]:
+        """Park a deferred event; returns the oldest one if it had to make room."""
+        with self._lock:
+            self.stats["deferred"] += 1
+            self._deferred.append(item)
+            if len(self._deferred) > self.deferred_size:
+                self.shed["deferred_dropped"] = self.shed.get("deferred_dropped", 0) + 1
+                return self._deferred.popleft()
+        return None
+
+    def release(self, depth: int) -> Optional[Any]:
+        """A deferred event to analyse now, once the level is normal and a worker is free."""
+        with self._lock:
+            if not self._deferred or depth >= self.workers:
+                return None
+            self._update(depth)
+            if self.level != "normal":
+                return None
+            self.stats["deferred_released"] += 1
+            return self._deferred.popleft()
+
+    def record_shed(self, reason: str):
+        """Count an event dropped for a reason decided elsewhere (e.g. the queue was full)."""
+        with self._lock:
+            self.shed[reason] = self.shed.get(reason, 0) + 1
+
+    def completed(self, seconds: float):
+        """One analysis finished after ``seconds`` (model latency, or queue round trip for shards)."""
+        with self._lock:
+            self._latency += 0.2 * (seconds - self._latency)
+            self._completions.append(time.monotonic())
+
+    def learn(self, alert_code: Optional[str], severity: Optional[str]):
+        """Remember the latest analysed severity per alert code (Critical codes are never shed)."""
+        if alert_code and severity:
+            with self._lock:
+                self._learned[alert_code] = severity
+
+    def pace(self, interval: float, limit: float = 10.0) -> float:
+        """Stretch a producer's interval with the backlog (at most ``limit`` times)."""
+        with self._lock:
+            return interval * min(limit, 1.0 + self._backlog / max(self.target_delay, 1e-3))
+
+    def status(self, depth: Optional[int] = None) -> Dict[str, Any]:
+        """Counters and the current estimate; pass the queue ``depth`` to refresh it first."""
+        with self._lock:
+            if depth is not None:
+                self._update(depth)
+            return {
+                "enabled": self.enabled,
+                "level": self.level,
+                "backlog_seconds": round(self._backlog, 2),
+                "depth": self._depth,
+                "workers": self.workers,
+                "latency_ms": round(self._latency * 1000, 1),
+                "completed_per_second": round(len(self._completions) / self.rate_window, 3),
+                "sample_every": self._sample_every() if self.level != "normal" else 1,
+                "target_delay": self.target_delay,
+                "overload_delay": self.overload_delay,
+                "deferred_pending": len(self._deferred),
+                "deferred_capacity": self.deferred_size,
+                "signatures_tracked": len(self._seen),
+                "critical_codes": sorted(self.critical_codes | {code for code, severity in self._learned.items()
+                                                                if severity == "Critical"}),
+                **self.stats,
+                "shed": dict(self.shed),
+                "shed_total": sum(self.shed.values()),
+            }
+
+
+class AnalysisWorkers:
+    """In-process analysis threads fed from a bounded queue; ``submit`` blocks while it is full.
+
+    ``after()`` runs once a worker is free again, e.g. to release deferred work.
+    """
+
+    def __init__(self, handler: Callable[[Any], None], workers: int = 1, max_size: int = 1000,
+                 after: Optional[Callable[[], None]] = None):
+        self.handler = handler
+        self.after = after
+        self.workers = max(1, workers)
+        self.max_size = max_size
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_size)
+        self._threads = []
+        self._busy = 0
+        self._lock = threading.Lock()
+
+    def start(self):
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"analysis-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        print(f"✅ Started {self.workers} analysis worker thread(s)")
+
+    def submit(self, item: Any):
+        self._queue.put(item)
+
+    def depth(self) -> int:
+        """Events queued or being analysed."""
+        return self._queue.qsize() + self._busy
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            with self._lock:
+                self._busy += 1
+            try:
+                self.handler(item)
+            except Exception as e:
+                print(f"❌ Analysis worker failed: {e}")
+            finally:
+                with self._lock:
+                    self._busy -= 1
+            if self.after is not None:
+                try:
+                    self.after()
+                except Exception as e:
+                    print(f"❌ Analysis worker failed: {e}")
+
+    def stop(self, timeout: float = 10.0):
+        """Finish the queued events, then stop the threads."""
+        for _ in self._threads:
+            self._queue.put(None)
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        self._threads = []
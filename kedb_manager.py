@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+KEDB Manager
+Hot-reloads the known error database and swaps versioned matching indexes atomically
+"""
+
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Callable
+
+REQUIRED_FIELDS = ("error", "description", "fix")
+
+
+class KedbValidationError(ValueError):
+    """Raised when a KEDB payload is rejected; ``errors`` lists every problem."""
+
+    def __init__(self, errors: List[str]):
+        super().__init__(f"{len(errors)} KEDB validation error(s): {'; '.join(errors[:5])}")
+        self.errors = errors
+
+
+def validate_entries(data: Any) -> List[Dict[str, Any]]:
+    """Check a KEDB payload and return its entries, or raise KedbValidationError."""
+    if not isinstance(data, list):
+        raise KedbValidationError(["KEDB must be a JSON list of entries"])
+
+    errors = []
+    for position, entry in enumerate(data):
+        if not isinstance(entry, dict):
+            errors.append(f"entry {position}: not an object")
+            continue
+        for field in REQUIRED_FIELDS:
+            value = entry.get(field)
+            if not isinstance(value, str) or not value.strip():
+                errors.append(f"entry {position}: '{field}' must be a non-empty string")
+        if "self_healable" in entry and not isinstance(entry["self_healable"], bool):
+            errors.append(f"entry {position}: 'self_healable' must be true or false")
+        hours = entry.get("support_hours_saved", 0)
+        if isinstance(hours, bool) or not isinstance(hours, (int, float)) or hours < 0:
+            errors.append(f"entry {position}: 'support_hours_saved' must be a non-negative number")
+
+    if errors:
+        raise KedbValidationError(errors)
+    return data
+
+
+class KedbSnapshot:
+    """An immutable, fully indexed KEDB version.
+
+    Readers grab ``manager.snapshot`` once and use it for the whole match,
+    so a reload mid-analysis never mixes entries from two versions.
+    """
+
+    def __init__(self, version: int, entries: List[Dict[str, Any]], checksum: str,
+                 source: str, vectors: Any = None):
+        self.version = version
+        self.entries = entries
+        self.checksum = checksum
+        self.source = source
+        self.vectors = vectors
+        self.loaded_at = datetime.now().isoformat()
+        # Exact error-code lookup over self-healable entries; the first entry
+        # for a duplicated code wins, as in a top-to-bottom scan
+        self.by_error: Dict[str, Dict[str, Any]] = {}
+        for entry in entries:
+            if entry.get("self_healable", False):
+                self.by_error.setdefault(entry["error"].upper(), entry)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def info(self) -> Dict[str, Any]:
+        """Version metadata for the API."""
+        return {
+            "version": self.version,
+            "entries": len(self.entries),
+            "self_healable": len(self.by_error),
+            "checksum": self.checksum,
+            "source": self.source,
+            "loaded_at": self.loaded_at,
+            "vectors": self.vectors.embedder.name if self.vectors is not None else None,
+        }
+
+
+class KedbManager:
+    """Owns the live KEDB snapshot and replaces it on file change or upload.
+
+    New versions are validated and indexed (including embeddings, which may
+    call Ollama) on the reloading thread; the hot path only ever reads the
+    ``snapshot`` attribute, and the swap is a single reference assignment.
+    """
+
+    def __init__(self, path: str = "kebd.json",
+                 build_vectors: Optional[Callable[[List[Dict[str, Any]]], Any]] = None,
+                 poll_interval: float = 2.0):
+        """Create a manager with an empty version-0 snapshot."""
+        self.path = path
+        self.build_vectors = build_vectors
+        self.poll_interval = poll_interval
+        self.snapshot = KedbSnapshot(0, [], "", "empty")
+        self._reload_lock = threading.Lock()
+        self._file_signature = None
+        self._stop = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+
+    def load(self) -> KedbSnapshot:
+        """Load the KEDB file; keeps the current snapshot if the file is invalid."""
+        self._file_signature = self._signature()
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return self.replace(data, source=f"file:{self.path}")
+        except FileNotFoundError:
+            print(f"❌ KEDB file ({self.path}) not found")
+        except (json.JSONDecodeError, KedbValidationError) as e:
+            print(f"❌ Rejected KEDB file {self.path}: {e}")
+        return self.snapshot
+
+    def replace(self, data: Any, source: str = "api") -> KedbSnapshot:
+        """Validate, index and swap in a new KEDB version."""
+        entries = validate_entries(data)
+        checksum = hashlib.sha1(json.dumps(entries, sort_keys=True).encode("utf-8")).hexdigest()
+        with self._reload_lock:
+            current = self.snapshot
+            if checksum == current.checksum:
+                return current
+            vectors = self.build_vectors(entries) if self.build_vectors else None
+            snapshot = KedbSnapshot(current.version + 1, entries, checksum, source, vectors)
+            self.snapshot = snapshot
+        print(f"✅ KEDB v{snapshot.version} live with {len(entries)} error patterns ({source})")
+        return snapshot
+
+    def upload(self, data: Any) -> KedbSnapshot:
+        """Swap in uploaded entries and persist them to the KEDB file."""
+        snapshot = self.replace(data, source="upload")
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(snapshot.entries, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+        # Our own write must not trigger a second reload
+        self._file_signature = self._signature()
+        return snapshot
+
+    def start_watching(self):
+        """Poll the KEDB file and reload it whenever it changes."""
+        if self._watcher and self._watcher.is_alive():
+            return
+        self._stop.clear()
+        self._watcher = threading.Thread(target=self._watch_loop, daemon=True)
+        self._watcher.start()
+
+    def stop(self):
+        """Stop the file watcher."""
+        self._stop.set()
+        if self._watcher:
+            self._watcher.join(timeout=self.poll_interval + 1)
+
+    def _signature(self):
+        try:
+            stat = os.stat(self.path)
+            return (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return None
+
+    def _watch_loop(self):
+        while not self._stop.wait(self.poll_interval):
+            signature = self._signature()
+            if signature is None or signature == self._file_signature:
+                continue
+            print(f"🔄 KEDB file {self.path} changed, reloading...")
+            try:
+                self.load()
+            except Exception as e:
+                print(f"❌ KEDB reload failed: {e}")
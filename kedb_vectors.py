@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+KEDB Vector Retrieval
+Embeds KEDB entries once and matches anomalies with a single cosine-similarity query
+"""
+
+import hashlib
+import os
+import re
+import zlib
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+class HashingEmbedder:
+    """Offline embedder: hashed word and character-trigram features.
+
+    Needs nothing beyond NumPy, so KEDB retrieval keeps working when no
+    Ollama embedding model is available. Similarities are lower than with
+    a neural model, hence the lower default threshold.
+    """
+
+    name = "hashing-512"
+    default_threshold = 0.35
+
+    def __init__(self, dim: int = 512):
+        self.dim = dim
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in WORD_PATTERN.findall(text.lower()):
+                features = [word] + [word[i:i + 3] for i in range(max(len(word) - 2, 0))]
+                for feature in features:
+                    # crc32 is stable across processes, unlike hash()
+                    matrix[row, zlib.crc32(feature.encode("utf-8")) % self.dim] += 1.0
+        return matrix
+
+
+class OllamaEmbedder:
+    """Embeddings from a local Ollama embedding model (e.g. nomic-embed-text)."""
+
+    default_threshold = 0.6
+
+    def __init__(self, client, model: str = "nomic-embed-text"):
+        self.client = client
+        self.model = model
+        self.name = f"ollama-{model}"
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        if hasattr(self.client, "embed"):
+            response = self.client.embed(model=self.model, input=texts)
+            vectors = response["embeddings"]
+        else:
+            vectors = [self.client.embeddings(model=self.model, prompt=text)["embedding"] for text in texts]
+        return np.asarray(vectors, dtype=np.float32)
+
+
+def entry_text(entry: Dict[str, Any]) -> str:
+    """The text that represents a KEDB entry in embedding space."""
+    return f"{entry.get('error', '')}. {entry.get('description', '')}. {entry.get('category', '')}"
+
+
+def content_hash(entry: Dict[str, Any], embedder_name: str) -> str:
+    return hashlib.sha1(f"{embedder_name}\n{entry_text(entry)}".encode("utf-8")).hexdigest()
+
+
+class KedbVectorIndex:
+    """Row-normalised embedding matrix over the KEDB.
+
+    Embeddings are cached on disk keyed by a content hash of each entry, so
+    a KEDB edit only re-embeds the entries that changed.
+    """
+
+    def __init__(self, entries: List[Dict[str, Any]], embedder,
+                 cache_path: Optional[str] = "kedb_embeddings.npz",
+                 threshold: Optional[float] = None):
+        """Embed (or load cached vectors for) every entry."""
+        self.entries = entries
+        self.embedder = embedder
+        self.threshold = embedder.default_threshold if threshold is None else threshold
+        self.cache_path = cache_path
+        self.self_healable = np.array([bool(entry.get("self_healable", False)) for entry in entries])
+        self.matrix = self._build_matrix()
+
+    def _build_matrix(self) -> np.ndarray:
+        if not self.entries:
+            return np.zeros((0, 1), dtype=np.float32)
+
+        hashes = [content_hash(entry, self.embedder.name) for entry in self.entries]
+        cached = self._load_cache()
+        missing = [i for i, digest in enumerate(hashes) if digest not in cached]
+        if missing:
+            fresh = self.embedder.embed([entry_text(self.entries[i]) for i in missing])
+            for i, vector in zip(missing, fresh):
+                cached[hashes[i]] = vector
+            self._save_cache({digest: cached[digest] for digest in hashes})
+            print(f"✅ Embedded {len(missing)} KEDB entries with {self.embedder.name} "
+                  f"({len(hashes) - len(missing)} from cache)")
+
+        matrix = np.vstack([cached[digest] for digest in hashes]).astype(np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.maximum(norms, 1e-12)
+
+    def _load_cache(self) -> Dict[str, np.ndarray]:
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return {}
+        try:
+            with np.load(self.cache_path, allow_pickle=False) as data:
+                return dict(zip(data["hashes"].tolist(), data["vectors"]))
+        except Exception as e:
+            print(f"⚠️ Ignoring unreadable KEDB embedding cache {self.cache_path}: {e}")
+            return {}
+
+    def _save_cache(self, vectors: Dict[str, np.ndarray]):
+        if not self.cache_path:
+            return
+        try:
+            tmp_path = f"{self.cache_path}.tmp.npz"
+            np.savez(tmp_path, hashes=np.array(list(vectors.keys())),
+                     vectors=np.vstack(list(vectors.values())))
+            os.replace(tmp_path, self.cache_path)
+        except Exception as e:
+            print(f"⚠️ Failed to write KEDB embedding cache: {e}")
+
+    def match_many(self, texts: List[str]) -> List[Optional[Tuple[Dict[str, Any], float]]]:
+        """Best self-healable entry and cosine score per text (None below threshold)."""
+        if not texts or not len(self.entries):
+            return [None] * len(texts)
+        queries = self.embedder.embed(texts)
+        queries = queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+        scores = queries @ self.matrix.T
+        scores[:, ~self.self_healable] = -1.0
+        best = scores.argmax(axis=1)
+        results = []
+        for row, column in enumerate(best):
+            score = float(scores[row, column])
+            results.append((self.entries[column], score) if score >= self.threshold else None)
+        return results
+
+    def match(self, text: str) -> Optional[Tuple[Dict[str, Any], float]]:
+        """Best self-healable entry and its score for one anomaly/log text."""
+        return self.match_many([text])[0]
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Live Statistics
+Lifetime totals plus per-second, per-minute and per-hour rate buckets held in fixed-size arrays
+"""
+
+import threading
+import time
+from array import array
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Iterable
+
+# name -> (bucket width in seconds, buckets kept)
+DEFAULT_RESOLUTIONS = {
+    "second": (1, 300),   # 5 minutes
+    "minute": (60, 180),  # 3 hours
+    "hour": (3600, 168),  # 7 days
+}
+
+
+class _Ring:
+    """One resolution: ``size`` buckets per metric, reused round-robin by bucket number."""
+
+    def __init__(self, width: int, size: int, metrics: Iterable[str]):
+        self.width = width
+        self.size = size
+        self.buckets = array("q", [-1] * size)  # bucket number each slot currently holds
+        self.values = {metric: array("d", [0.0] * size) for metric in metrics}
+
+    def add(self, now: float, amounts: Dict[str, float]):
+        bucket = int(now // self.width)
+        slot = bucket % self.size
+        if self.buckets[slot] != bucket:
+            # The slot still holds a bucket from a previous lap: recycle it
+            self.buckets[slot] = bucket
+            for values in self.values.values():
+                values[slot] = 0.0
+        for metric, amount in amounts.items():
+            self.values[metric][slot] += amount
+
+    def read(self, now: float, points: int, metrics: List[str]) -> Dict[str, Any]:
+        last = int(now // self.width)
+        first = last - points + 1
+        series: Dict[str, List[float]] = {metric: [] for metric in metrics}
+        for bucket in range(first, last + 1):
+            slot = bucket % self.size
+            current = self.buckets[slot] == bucket
+            for metric in metrics:
+                series[metric].append(self.values[metric][slot] if current else 0.0)
+        return {"start": first * self.width, "series": series}
+
+
+class StatsAccumulator:
+    """Counters shared by the ingest, analysis and self-heal threads.
+
+    ``record`` adds to the lifetime totals and to the current bucket of every
+    resolution in one short critical section, so readers never see a heal
+    counted in the totals but not yet in the rates. Reads copy under the same
+    lock and do their formatting afterwards; each costs O(buckets returned)
+    no matter how many events were recorded.
+    """
+
+    def __init__(self, metrics: Iterable[str], resolutions: Optional[Dict[str, tuple]] = None):
+        """``metrics`` are the counter names; ``resolutions`` maps name -> (seconds per bucket, buckets)."""
+        self.metrics = list(metrics)
+        self.started = datetime.now().isoformat()
+        self._lock = threading.Lock()
+        self._totals: Dict[str, float] = {metric: 0 for metric in self.metrics}
+        self._rings = {name: _Ring(width, size, self.metrics)
+                       for name, (width, size) in (resolutions or DEFAULT_RESOLUTIONS).items()}
+
+    def record(self, **amounts: float):
+        """Count e.g. ``record(self_healed=1, hours_saved=2.5)`` in the current buckets."""
+        now = time.time()
+        with self._lock:
+            for metric, amount in amounts.items():
+                self._totals[metric] += amount
+            for ring in self._rings.values():
+                ring.add(now, amounts)
+
+    def set_totals(self, **totals: float):
+        """Take over totals counted elsewhere (an instance joining a running cluster); rates are untouched."""
+        with self._lock:
+            self._totals.update(totals)
+
+    def totals(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(self._totals)
+
+    def series(self, resolution: str = "second", points: Optional[int] = None,
+               metrics: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Oldest-first bucket values for the last ``points`` buckets, the current (partial) one last.
+
+        ``start`` is the epoch second the first bucket begins at; ``rates`` are
+        per-second averages over the returned window, excluding the partial bucket.
+        """
+        ring = self._rings[resolution]
+        points = max(1, min(points or ring.size, ring.size))
+        metrics = [metric for metric in (metrics or self.metrics) if metric in self._totals]
+        now = time.time()
+        with self._lock:
+            window = ring.read(now, points, metrics)
+            totals = {metric: self._totals[metric] for metric in metrics}
+        complete = (points - 1) * ring.width
+        return {
+            "resolution": resolution,
+            "bucket_seconds": ring.width,
+            "points": points,
+            "start": window["start"],
+            "now": round(now, 3),
+            "totals": totals,
+            "rates": {metric: round(sum(values[:-1]) / complete, 4) if complete else 0.0
+                      for metric, values in window["series"].items()},
+            "series": window["series"],
+        }
+
+    def resolutions(self) -> Dict[str, Dict[str, int]]:
+        return {name: {"bucket_seconds": ring.width, "buckets": ring.size} for name, ring in self._rings.items()}
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Log Replay
+Re-analyzes archived Pega log files through the analysis pipeline and compares decision runs
+
+    python log_replay.py run "pega rules.txt" archive/*.log.gz --out run_a.jsonl
+    python log_replay.py run archive/*.gz --kedb kedb_candidate.json --out run_b.jsonl --speed 60
+    python log_replay.py diff run_a.jsonl run_b.jsonl
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Any, Iterator, Optional
+
+from event_assembler import EventAssembler
+
+HEADER_TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S,%f"
+DECISION_FIELDS = ("action", "heal_action", "kedb_match", "severity", "category")
+
+
+def open_log(path: str):
+    """Open a plain or gzip-compressed log file as text (detected by magic bytes)."""
+    with open(path, "rb") as f:
+        compressed = f.read(2) == b"\x1f\x8b"
+    if compressed:
+        return gzip.open(path, "rt", encoding="utf-8", errors="replace")
+    return open(path, "r", encoding="utf-8", errors="replace")
+
+
+def event_time(text: str) -> Optional[datetime]:
+    """Timestamp from an event's header line, if it has one."""
+    try:
+        return datetime.strptime(text[:23].replace("T", " "), HEADER_TIMESTAMP_FORMAT)
+    except ValueError:
+        return None
+
+
+def read_events(paths: List[str], stats: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Assembled events from each file in turn, numbered per source."""
+    for path in paths:
+        buffered: deque = deque()
+        assembler = EventAssembler(buffered.append)
+        index = 0
+        with open_log(path) as f:
+            for line in f:
+                stats["lines"] += 1
+                stats["bytes"] += len(line)
+                assembler.feed(line, source=path)
+                while buffered:
+                    yield {**buffered.popleft(), "index": index}
+                    index += 1
+        assembler.flush()
+        while buffered:
+            yield {**buffered.popleft(), "index": index}
+            index += 1
+        stats["files"] += 1
+
+
+class ReplayRun:
+    """Streams events through ``analyze_event`` and records what the pipeline would decide.
+
+    Nothing is ticketed or healed: each decision (action, KEDB match, severity,
+    category, model) is written as a JSONL record, in input order. ``speed``
+    of None replays as fast as analysis allows with ``workers`` events in
+    flight; otherwise events are paced at ``speed``x their logged spacing.
+    """
+
+    def __init__(self, api, out_path: str, workers: int = 4, speed: Optional[float] = None):
+        """``api`` is the initialised api_streamlit_logic module."""
+        self.api = api
+        self.out_path = out_path
+        self.workers = workers
+        self.speed = speed
+        self.stats = {"files": 0, "lines": 0, "bytes": 0, "events": 0, "analysed": 0, "failed": 0,
+                      "analysis_ms": 0.0}
+        self.actions: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def analyze(self, event: Dict[str, Any]) -> Dict[str, Any]:
+        api = self.api
+        started = time.perf_counter()
+        record = {"source": event["source"], "index": event["index"], "fingerprint": event["fingerprint"],
+                  "alert_code": api.extract_alert_code(event["text"]),
+                  "event_time": None}
+        logged = event_time(event["text"])
+        if logged is not None:
+            record["event_time"] = logged.isoformat()
+        try:
+            findings = api.analyze_event(event["text"], event["fingerprint"])
+        except Exception as e:
+            findings = None
+            record["error"] = f"{type(e).__name__}: {e}"
+        if findings:
+            action, heal_action = api.planned_action(findings)
+            ai_analysis = findings["ai_analysis"]
+            record.update(action=action, heal_action=heal_action,
+                          kedb_match=(findings["kedb_match"] or {}).get("error"),
+                          severity=ai_analysis.get("severity"), category=ai_analysis.get("category"),
+                          anomaly=ai_analysis.get("anomaly"), analyzed_by=findings["analyzed_by"],
+                          kedb_version=findings["kedb_version"], prompt_tokens=findings["prompt_tokens"])
+        else:
+            record["action"] = "unanalysed"
+        record["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        with self._lock:
+            self.stats["analysed" if findings else "failed"] += 1
+            self.stats["analysis_ms"] += record["latency_ms"]
+            self.actions[record["action"]] += 1
+        return record
+
+    def run(self, paths: List[str]) -> Dict[str, Any]:
+        started = time.perf_counter()
+        first_logged: Optional[datetime] = None
+        in_flight: deque = deque()
+        with ThreadPoolExecutor(max_workers=self.workers) as pool, \
+                open(self.out_path, "w", encoding="utf-8") as out:
+            def drain(limit: int):
+                # Results are written in input order; at most ``limit`` stay in flight
+                while len(in_flight) > limit:
+                    out.write(json.dumps(in_flight.popleft().result(), ensure_ascii=False) + "\n")
+
+            for event in read_events(paths, self.stats):
+                self.stats["events"] += 1
+                if self.speed:
+                    logged = event_time(event["text"])
+                    if logged is not None:
+                        first_logged = first_logged or logged
+                        due = (logged - first_logged).total_seconds() / self.speed
+                        delay = due - (time.perf_counter() - started)
+                        if delay > 0:
+                            time.sleep(delay)
+                in_flight.append(pool.submit(self.analyze, event))
+                drain(self.workers * 2)
+                if self.stats["events"] % 500 == 0:
+                    self._progress(started)
+            drain(0)
+        return self.summary(time.perf_counter() - started)
+
+    def _progress(self, started: float):
+        elapsed = time.perf_counter() - started
+        print(f"⏩ {self.stats['events']} events, {self.stats['events'] / elapsed:.1f}/s", file=sys.stderr)
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        events = self.stats["events"]
+        return {
+            "results": self.out_path,
+            **{key: value for key, value in self.stats.items() if key != "analysis_ms"},
+            "elapsed_s": round(elapsed, 2),
+            "events_per_s": round(events / elapsed, 2) if elapsed else 0.0,
+            "lines_per_s": round(self.stats["lines"] / elapsed, 1) if elapsed else 0.0,
+            "avg_analysis_ms": round(self.stats["analysis_ms"] / events, 1) if events else 0.0,
+            "actions": dict(self.actions),
+            "router": self.api.model_router.status(),
+            "kedb_version": self.api.kedb_manager.snapshot.version,
+        }
+
+
+def load_results(path: str) -> Dict[tuple, Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as f:
+        records = (json.loads(line) for line in f if line.strip())
+        return {(record["source"], record["index"]): record for record in records}
+
+
+def diff_runs(path_a: str, path_b: str, samples: int = 20) -> Dict[str, Any]:
+    """Compare two result files event by event on the decision fields."""
+    run_a, run_b = load_results(path_a), load_results(path_b)
+    shared = sorted(set(run_a) & set(run_b), key=lambda key: (key[0], key[1]))
+    changed_fields: Counter = Counter()
+    transitions: Counter = Counter()
+    changed = []
+    for key in shared:
+        a, b = run_a[key], run_b[key]
+        fields = [field for field in DECISION_FIELDS if a.get(field) != b.get(field)]
+        if not fields:
+            continue
+        changed_fields.update(fields)
+        if "action" in fields:
+            transitions[f"{a.get('action')} -> {b.get('action')}"] += 1
+        changed.append({"source": key[0], "index": key[1], "alert_code": a.get("alert_code"),
+                        **{field: [a.get(field), b.get(field)] for field in fields}})
+
+    def mean_latency(run):
+        values = [record.get("latency_ms", 0.0) for record in run.values()]
+        return round(sum(values) / len(values), 1) if values else 0.0
+
+    return {
+        "a": path_a,
+        "b": path_b,
+        "events_compared": len(shared),
+        "only_in_a": len(set(run_a) - set(run_b)),
+        "only_in_b": len(set(run_b) - set(run_a)),
+        "changed": len(changed),
+        "agreement": round(1 - len(changed) / len(shared), 4) if shared else 0.0,
+        "changed_fields": dict(changed_fields),
+        "action_transitions": dict(transitions),
+        "actions": {"a": dict(Counter(r.get("action") for r in run_a.values())),
+                    "b": dict(Counter(r.get("action") for r in run_b.values()))},
+        "avg_latency_ms": {"a": mean_latency(run_a), "b": mean_latency(run_b)},
+        "samples": changed[:samples],
+    }
+
+
+def load_pipeline(args):
+    """Import the API module with the requested models/KEDB and initialise analysis only."""
+    if args.large_model:
+        os.environ["PEGA_LARGE_MODEL"] = args.large_model
+    if args.small_model:
+        os.environ["PEGA_SMALL_MODEL"] = args.small_model
+    if args.kedb:
+        os.environ["PEGA_KEDB_PATH"] = args.kedb
+    if args.self_heal_config:
+        os.environ["PEGA_SELF_HEAL_CONFIG"] = args.self_heal_config
+    import api_streamlit_logic as api
+    from self_heal import load_actions
+
+    api.MISTRAL_CLIENT = api.initialize_mistral()
+    if api.MISTRAL_CLIENT is None:
+        sys.exit("❌ Ollama is not reachable; replay needs the analysis models")
+    api.kedb_manager.load()
+    _, api.heal_mapping = load_actions(api.SELF_HEAL_CONFIG)
+    return api
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay archived Pega logs through the analysis pipeline")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="analyse log files and write a decisions file")
+    run.add_argument("files", nargs="+", help="Pega log files (.gz accepted)")
+    run.add_argument("--out", default="replay_results.jsonl", help="decisions file (JSONL)")
+    run.add_argument("--speed", type=float, help="pace events at N x their logged speed (default: max)")
+    run.add_argument("--workers", type=int, default=4, help="events analysed concurrently")
+    run.add_argument("--kedb", help="KEDB file to evaluate (default: PEGA_KEDB_PATH)")
+    run.add_argument("--large-model", help="override PEGA_LARGE_MODEL")
+    run.add_argument("--small-model", help="override PEGA_SMALL_MODEL")
+    run.add_argument("--self-heal-config", help="override PEGA_SELF_HEAL_CONFIG")
+
+    diff = commands.add_parser("diff", help="compare two decisions files")
+    diff.add_argument("a")
+    diff.add_argument("b")
+    diff.add_argument("--samples", type=int, default=20)
+
+    args = parser.parse_args()
+    if args.command == "diff":
+        print(json.dumps(diff_runs(args.a, args.b, args.samples), indent=2))
+        return
+
+    api = load_pipeline(args)
+    replay = ReplayRun(api, args.out, workers=args.workers, speed=args.speed)
+    print(f"🚀 Replaying {len(args.files)} files -> {args.out}", file=sys.stderr)
+    summary = replay.run(args.files)
+    with open(args.out + ".summary.json", "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
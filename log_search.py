@@ -0,0 +1,459 @@
+#!/usr/bin/env python3
+"""
+Log Search Index
+Incremental inverted index over ingested Pega log lines with compressed posting lists
+"""
+
+import bisect
+import math
+import queue
+import re
+import threading
+import time
+import zlib
+from array import array
+from datetime import datetime, timedelta
+from itertools import accumulate
+from typing import Dict, List, Any, Optional, Iterable, Tuple
+
+# Free-text tokens; pure numbers and very long random IDs are not indexed as text
+TOKEN_PATTERN = re.compile(r"[a-z][a-z0-9_]*(?:[-.][a-z0-9_]+)*")
+MAX_TEXT_TOKEN_LENGTH = 24
+
+BLOCK_SIZE = 128  # postings per skip block
+PACKED_TYPES = {1: "B", 2: "H", 4: "I"}  # array typecode per packed delta width
+
+# Ranking: BM25 over the query words plus a recency boost, applied to the newest matches
+BM25_K1 = 1.2
+BM25_B = 0.75
+RECENCY_WEIGHT = 1.0  # score added for a line as new as the newest indexed line
+RECENCY_HALF_LIFE = 6 * 3600.0  # seconds for the recency boost to halve
+RANK_WINDOW = 5000  # newest matches that are scored; later pages continue newest first
+
+# Structured fields indexed as "<field>:<value>" terms
+THREAD_PATTERN = re.compile(r"\b(PegaRULES-[A-Za-z]+(?:-\d+)?|http-nio-\d+-exec-\d+)\b")
+REQUESTOR_PATTERN = re.compile(r"\b([A-Z0-9]{32})\b")
+RULE_PATTERN = re.compile(r"(?:Rule-[A-Za-z]+-[A-Za-z]+:|restricted rule:\s*|Rule not found:\s*|RULE-OBJ-ACTIVITY\s+)([A-Za-z][\w-]*)")
+ENDPOINT_PATTERN = re.compile(r"(?:https?://[\w.:-]+)?(/(?:api|pega)/[\w/.-]*\w)")
+
+FIELD_QUERY_PATTERN = re.compile(r"^(code|thread|requestor|rule|endpoint):(.+)$", re.IGNORECASE)
+BARE_CODE_PATTERN = re.compile(r"^[A-Z][A-Z0-9]*(?:-[A-Z0-9]+)+$|^(?:PEGA|SECU)\d{4}$")
+RELATIVE_TIME_PATTERN = re.compile(r"^(\d+)\s*([smhd])$")
+
+
+def parse_time(value: Optional[str], now: Optional[datetime] = None) -> Optional[float]:
+    """Parse an ISO timestamp or a relative window like '24h' into epoch seconds."""
+    if not value:
+        return None
+    match = RELATIVE_TIME_PATTERN.match(value.strip())
+    if match:
+        amount, unit = int(match.group(1)), match.group(2)
+        delta = {"s": timedelta(seconds=amount), "m": timedelta(minutes=amount),
+                 "h": timedelta(hours=amount), "d": timedelta(days=amount)}[unit]
+        return ((now or datetime.now()) - delta).timestamp()
+    return datetime.fromisoformat(value.strip().replace("Z", "+00:00")).timestamp()
+
+
+def extract_terms(line: str, alert_code: Optional[str] = None) -> set:
+    """All index terms for a log line: free-text tokens plus field terms."""
+    terms = set()
+    for token in TOKEN_PATTERN.findall(line.lower()):
+        if len(token) > 1 and len(token) <= MAX_TEXT_TOKEN_LENGTH:
+            terms.add(token)
+    if alert_code:
+        terms.add(f"code:{alert_code.lower()}")
+    for thread in THREAD_PATTERN.findall(line):
+        terms.add(f"thread:{thread.lower()}")
+    for requestor in REQUESTOR_PATTERN.findall(line):
+        terms.add(f"requestor:{requestor.lower()}")
+    for rule in RULE_PATTERN.findall(line):
+        terms.add(f"rule:{rule.lower()}")
+    for endpoint in ENDPOINT_PATTERN.findall(line):
+        terms.add(f"endpoint:{endpoint.lower()}")
+    return terms
+
+
+class _Postings:
+    """One term's posting list in a segment, in blocks of ``BLOCK_SIZE`` ids.
+
+    Full blocks are sealed into ``data`` as deltas packed at the narrowest
+    width that fits them (1, 2 or 4 bytes), with their byte offset, width
+    and last id kept alongside as skip data: seeking to an id is a bisect
+    over ``block_last`` plus one block decode (``array.frombytes``), not a
+    walk of the whole list. The block being filled stays a plain id array.
+
+    Only the indexer appends. ``tail`` pairs the number of sealed blocks with
+    the open block and is replaced in one assignment after a seal, so readers
+    bounded to the ids indexed when they took their snapshot need no lock.
+    Short lists never allocate the sealed-block arrays.
+    """
+
+    __slots__ = ("data", "block_start", "block_width", "block_last", "tail", "count")
+
+    def __init__(self):
+        self.data: Optional[bytearray] = None
+        self.block_start: Optional[array] = None
+        self.block_width: Optional[array] = None
+        self.block_last: Optional[array] = None
+        self.tail: Tuple[int, array] = (0, array("I"))
+        self.count = 0
+
+    def append(self, doc_id: int):
+        sealed, ids = self.tail
+        ids.append(doc_id)
+        self.count += 1
+        if len(ids) == BLOCK_SIZE:
+            self._seal(sealed, ids)
+
+    def _seal(self, sealed: int, ids: array):
+        previous = self.block_last[sealed - 1] if sealed else 0
+        deltas = [doc_id - before for before, doc_id in zip((previous, *ids), ids)]
+        largest = max(deltas)
+        width = 1 if largest < 0x100 else 2 if largest < 0x10000 else 4
+        if self.data is None:
+            self.data, self.block_start = bytearray(), array("I")
+            self.block_width, self.block_last = array("B"), array("I")
+        offset = len(self.data)
+        self.data.extend(array(PACKED_TYPES[width], deltas).tobytes())
+        self.block_start.append(offset)
+        self.block_width.append(width)
+        self.block_last.append(ids[-1])
+        self.tail = (sealed + 1, array("I"))
+
+    def _block(self, index: int, sealed: int, ids: array) -> List[int]:
+        if index >= sealed:
+            return list(ids)
+        width = self.block_width[index]
+        start = self.block_start[index]
+        deltas = array(PACKED_TYPES[width])
+        deltas.frombytes(self.data[start:start + BLOCK_SIZE * width])
+        decoded = list(accumulate(deltas, initial=self.block_last[index - 1] if index else 0))
+        del decoded[0]
+        return decoded
+
+    def _seek(self, doc_id: int, sealed: int, low: int = 0) -> int:
+        """Index of the first block that can hold ``doc_id`` (``sealed`` for the open one)."""
+        return bisect.bisect_left(self.block_last, doc_id, low, sealed) if sealed else 0
+
+    def rank(self, doc_id: int) -> int:
+        """Number of ids below ``doc_id``."""
+        sealed, ids = self.tail
+        index = self._seek(doc_id, sealed)
+        return index * BLOCK_SIZE + bisect.bisect_left(self._block(index, sealed, ids), doc_id)
+
+    def between(self, low: int, high: int) -> List[int]:
+        """Ascending ids in [low, high), decoding only the blocks that overlap."""
+        sealed, ids = self.tail
+        found: List[int] = []
+        for index in range(self._seek(low, sealed), sealed + 1):
+            block = self._block(index, sealed, ids)
+            found.extend(block[bisect.bisect_left(block, low):bisect.bisect_left(block, high)])
+            if not block or block[-1] >= high - 1:
+                break
+        return found
+
+    def newest(self, low: int, high: int, limit: int) -> List[int]:
+        """Up to ``limit`` ids in [low, high), highest first."""
+        sealed, ids = self.tail
+        found: List[int] = []
+        for index in range(self._seek(high, sealed), -1, -1):
+            for doc_id in reversed(self._block(index, sealed, ids)):
+                if doc_id < low or len(found) == limit:
+                    return found
+                if doc_id < high:
+                    found.append(doc_id)
+        return found
+
+    def retain(self, candidates: List[int]) -> List[int]:
+        """The ascending ``candidates`` that are also in this list, a block at a time."""
+        sealed, ids = self.tail
+        kept: List[int] = []
+        position, index = 0, 0
+        while position < len(candidates):
+            index = self._seek(candidates[position], sealed, index)
+            if index < sealed:
+                end = bisect.bisect_right(candidates, self.block_last[index], position)
+            else:
+                end = len(candidates)
+            members = set(self._block(index, sealed, ids))
+            kept.extend(filter(members.__contains__, candidates[position:end]))
+            position = end
+            index += 1
+        return kept
+
+
+class _Segment:
+    """A fixed-capacity slice of the index; the unit of retention.
+
+    ``ordered`` stays true while lines arrive in timestamp order, which lets
+    a time window map to a contiguous range of local ids.
+    """
+
+    def __init__(self, base_id: int):
+        self.base_id = base_id
+        self.postings: Dict[str, _Postings] = {}
+        self.timestamps = array("d")
+        self.lengths = array("H")  # free-text words per line, for BM25 length normalisation
+        self.lines: List[bytes] = []
+        self.refs: List[Any] = []
+        self.codes: List[Optional[str]] = []
+        self.min_time = 0.0
+        self.max_time = 0.0
+        self.ordered = True
+
+    def __len__(self) -> int:
+        return len(self.lines)
+
+    def add(self, terms: set, length: int, line: str, timestamp: float, ref: Any, alert_code: Optional[str]):
+        # Local ids start at 1 so the first delta is never zero
+        local_id = len(self.lines) + 1
+        for term in terms:
+            postings = self.postings.get(term)
+            if postings is None:
+                postings = self.postings[term] = _Postings()
+            postings.append(local_id)
+        if not self.timestamps:
+            self.min_time = self.max_time = timestamp
+        elif timestamp < self.max_time:
+            self.ordered = False
+            self.min_time = min(self.min_time, timestamp)
+        else:
+            self.max_time = timestamp
+        self.timestamps.append(timestamp)
+        self.lengths.append(min(length, 0xFFFF))
+        self.refs.append(ref)
+        self.codes.append(alert_code)
+        self.lines.append(zlib.compress(line.encode("utf-8"), 1))
+
+
+class LogSearchIndex:
+    """Segmented inverted index with a background incremental indexer.
+
+    Lines are submitted from the ingest path and indexed on a worker thread.
+    Each term maps to a block-skipped, delta-packed posting list
+    per segment; segments also record their time span so a "last 24h" search
+    skips older segments entirely. Once ``max_docs`` is exceeded the oldest
+    segment is dropped.
+
+    ``backfill`` (an iterable of ``add`` argument tuples, oldest first) is
+    indexed by the worker before anything submitted, so history lands ahead
+    of live lines and segments stay in timestamp order.
+    """
+
+    def __init__(self, segment_size: int = 50000, max_docs: int = 2000000,
+                 backfill: Optional[Iterable[tuple]] = None):
+        """Create an empty index and start the indexer thread."""
+        self.segment_size = segment_size
+        self.max_docs = max_docs
+        self._segments: List[_Segment] = [_Segment(1)]
+        self._doc_freq: Dict[str, int] = {}
+        self._total_docs = 0
+        self._total_length = 0
+        self._lock = threading.RLock()
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._indexer = threading.Thread(target=self._index_loop, args=(backfill,), daemon=True)
+        self._indexer.start()
+
+    def __len__(self) -> int:
+        return self._total_docs
+
+    def submit(self, line: str, timestamp: Optional[str] = None, ref: Any = None,
+               alert_code: Optional[str] = None):
+        """Queue a log line for indexing without blocking the caller."""
+        self._queue.put((line, timestamp, ref, alert_code))
+
+    def flush(self, timeout: float = 5.0):
+        """Block until every submitted line is searchable."""
+        done = threading.Event()
+        self._queue.put(("__flush__", done))
+        done.wait(timeout)
+
+    def close(self):
+        """Stop the indexer thread after draining the queue."""
+        self._queue.put(None)
+        self._indexer.join(timeout=5)
+
+    def _index_loop(self, backfill: Optional[Iterable[tuple]]):
+        if backfill is not None:
+            indexed = 0
+            try:
+                for item in backfill:
+                    self.add(*item)
+                    indexed += 1
+                print(f"✅ Search index backfilled with {indexed} stored log lines")
+            except Exception as e:
+                print(f"❌ Search index backfill failed after {indexed} lines: {e}")
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            if item[0] == "__flush__":
+                item[1].set()
+                continue
+            try:
+                self.add(*item)
+            except Exception as e:
+                print(f"❌ Failed to index log line: {e}")
+
+    def add(self, line: str, timestamp: Optional[str] = None, ref: Any = None,
+            alert_code: Optional[str] = None) -> int:
+        """Index one line synchronously and return its doc id."""
+        epoch = parse_time(timestamp) if timestamp else time.time()
+        terms = extract_terms(line, alert_code)
+        length = sum(1 for term in terms if ":" not in term)
+        with self._lock:
+            segment = self._segments[-1]
+            if len(segment) >= self.segment_size:
+                segment = _Segment(segment.base_id + len(segment))
+                self._segments.append(segment)
+            doc_id = segment.base_id + len(segment)
+            segment.add(terms, length, line, epoch, ref, alert_code)
+            for term in terms:
+                self._doc_freq[term] = self._doc_freq.get(term, 0) + 1
+            self._total_docs += 1
+            self._total_length += length
+            while self._total_docs > self.max_docs and len(self._segments) > 1:
+                self._drop_segment(self._segments.pop(0))
+            return doc_id
+
+    def _drop_segment(self, segment: _Segment):
+        for term, postings in segment.postings.items():
+            remaining = self._doc_freq.get(term, 0) - postings.count
+            if remaining > 0:
+                self._doc_freq[term] = remaining
+            else:
+                self._doc_freq.pop(term, None)
+        self._total_docs -= len(segment)
+        self._total_length -= sum(segment.lengths)
+
+    def search(self, query: str, since: Optional[str] = None, until: Optional[str] = None,
+               limit: int = 20, offset: int = 0) -> Dict[str, Any]:
+        """Ranked, paged search.
+
+        Every term must match: field terms (``code:CONN-1001``, ``thread:``,
+        ``requestor:``, ``rule:``, ``endpoint:``), bare alert codes and words.
+        A query with no such terms (only stopwords or 1-char words) matches
+        nothing. The newest ``RANK_WINDOW`` matches are ordered by score: BM25
+        over the query words (lines are sets of words, so shorter matching
+        lines rank higher) plus a boost that halves every
+        ``RECENCY_HALF_LIFE``; any further pages continue newest first.
+        Only the list of segments is read under the lock; the search itself
+        runs on that snapshot, bounded to the lines each segment held at the
+        time, while the indexer keeps appending.
+        """
+        started = time.perf_counter()
+        since_epoch = parse_time(since)
+        until_epoch = parse_time(until)
+        with self._lock:
+            terms, words = self._parse_query(query)
+            total_docs = max(self._total_docs, 1)
+            average_length = self._total_length / total_docs or 1.0
+            idf = sum(math.log(1 + (total_docs - df + 0.5) / (df + 0.5))
+                      for df in (self._doc_freq.get(word, 0) for word in words))
+            snapshot = [(segment, len(segment), segment.ordered) for segment in self._segments]
+            latest = max((segment.max_time for segment, size, _ in snapshot if size), default=0.0)
+
+        needed = max(RANK_WINDOW, offset + limit)
+        total = 0
+        hits: List[Tuple[_Segment, int]] = []
+        for segment, size, ordered in reversed(snapshot if terms else []):
+            if not size:
+                continue
+            if since_epoch is not None and segment.max_time < since_epoch:
+                continue
+            if until_epoch is not None and segment.min_time >= until_epoch:
+                continue
+            count, newest = self._search_segment(segment, size, ordered, terms, since_epoch, until_epoch,
+                                                 max(needed - len(hits), 0))
+            total += count
+            hits.extend((segment, local) for local in newest)
+
+        def score(hit: Tuple[_Segment, int]) -> float:
+            segment, local = hit
+            norm = 1 + BM25_K1 * (1 - BM25_B + BM25_B * segment.lengths[local - 1] / average_length)
+            age = max(latest - segment.timestamps[local - 1], 0.0)
+            return idf * (BM25_K1 + 1) / norm + RECENCY_WEIGHT * 0.5 ** (age / RECENCY_HALF_LIFE)
+
+        # Stable sort: equal scores stay newest first
+        ranked = sorted(((score(hit), hit) for hit in hits[:RANK_WINDOW]), key=lambda item: item[0], reverse=True)
+        page = ranked[offset:offset + limit]
+        page += [(score(hit), hit) for hit in hits[max(offset, RANK_WINDOW):offset + limit]]
+
+        results = [{
+            "doc_id": segment.base_id + local - 1,
+            "score": round(hit_score, 4),
+            "timestamp": datetime.fromtimestamp(segment.timestamps[local - 1]).isoformat(),
+            "alert_code": segment.codes[local - 1],
+            "ref": segment.refs[local - 1],
+            "log_line": zlib.decompress(segment.lines[local - 1]).decode("utf-8"),
+        } for hit_score, (segment, local) in page]
+
+        return {
+            "query": query,
+            "total": total,
+            "took_ms": round((time.perf_counter() - started) * 1000, 2),
+            "hits": results,
+        }
+
+    @staticmethod
+    def _search_segment(segment: _Segment, size: int, ordered: bool, terms: List[str],
+                        since_epoch: Optional[float], until_epoch: Optional[float],
+                        still_needed: int) -> Tuple[int, List[int]]:
+        """Match count and the newest ``still_needed`` matching local ids, highest first."""
+        timestamps = segment.timestamps
+        low, high = 1, size + 1
+        if ordered:
+            # Timestamps are in arrival order, so the window is a range of local ids
+            if since_epoch is not None:
+                low = bisect.bisect_left(timestamps, since_epoch, 0, size) + 1
+            if until_epoch is not None:
+                high = bisect.bisect_left(timestamps, until_epoch, 0, size) + 1
+            in_window = None
+        elif since_epoch is None and until_epoch is None:
+            in_window = None
+        else:
+            def in_window(local: int) -> bool:
+                stamp = timestamps[local - 1]
+                return ((since_epoch is None or stamp >= since_epoch)
+                        and (until_epoch is None or stamp < until_epoch))
+        if low >= high:
+            return 0, []
+
+        postings = []
+        for term in terms:
+            term_postings = segment.postings.get(term)
+            if term_postings is None:
+                return 0, []
+            postings.append(term_postings)
+
+        if in_window is None and len(postings) == 1:
+            # One list: the count comes from the skip blocks and only the
+            # newest ids still needed are decoded.
+            only = postings[0]
+            return only.rank(high) - only.rank(low), only.newest(low, high, still_needed)
+
+        # Intersect from the rarest list, seeking into the longer ones
+        postings.sort(key=lambda term_postings: term_postings.count)
+        candidates = postings[0].between(low, high)
+        for term_postings in postings[1:]:
+            if not candidates:
+                break
+            candidates = term_postings.retain(candidates)
+        if in_window is not None:
+            candidates = [local for local in candidates if in_window(local)]
+        return len(candidates), candidates[:-still_needed - 1:-1] if still_needed else []
+
+    def _parse_query(self, query: str) -> Tuple[List[str], List[str]]:
+        """All terms to match, and the subset that are words (which score)."""
+        terms, words = [], []
+        for raw in query.split():
+            field = FIELD_QUERY_PATTERN.match(raw)
+            if field:
+                terms.append(f"{field.group(1).lower()}:{field.group(2).lower()}")
+            elif BARE_CODE_PATTERN.match(raw) and f"code:{raw.lower()}" in self._doc_freq:
+                terms.append(f"code:{raw.lower()}")
+            else:
+                words.extend(token for token in TOKEN_PATTERN.findall(raw.lower())
+                             if len(token) > 1 and len(token) <= MAX_TEXT_TOKEN_LENGTH)
+        words = list(dict.fromkeys(words))
+        return list(dict.fromkeys(terms + words)), words
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Mock ITSM Server
+Local stand-in for ServiceNow/Jira that accepts ticket batches from the exporter
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Any
+
+
+class MockITSMServer(ThreadingHTTPServer):
+    """Threaded HTTP server that stores received tickets in memory.
+
+    ``fail_rate`` answers that fraction of batches with a 503 and ``latency``
+    delays every response, to exercise the exporter's retry path.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8090, fail_rate: float = 0.0,
+                 latency: float = 0.0):
+        super().__init__((host, port), MockITSMHandler)
+        self.fail_rate = fail_rate
+        self.latency = latency
+        self.tickets: Dict[str, Dict[str, Any]] = {}
+        self.batches = 0
+        self.failures = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start_background(self) -> threading.Thread:
+        """Serve on a daemon thread (for tests and local runs)."""
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+
+class MockITSMHandler(BaseHTTPRequestHandler):
+    server: MockITSMServer
+
+    def do_POST(self):
+        if self.path != "/api/tickets/batch":
+            return self._reply(404, {"error": "not found"})
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        if random.random() < self.server.fail_rate:
+            with self.server.lock:
+                self.server.failures += 1
+            return self._reply(503, {"error": "service unavailable"})
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            tickets: List[Dict[str, Any]] = json.loads(self.rfile.read(length))["tickets"]
+        except (ValueError, KeyError, TypeError):
+            return self._reply(400, {"error": "expected {\"tickets\": [...]}"})
+
+        created = []
+        with self.server.lock:
+            self.server.batches += 1
+            for ticket in tickets:
+                # Re-delivered tickets keep their first external id (idempotent on ticket_id)
+                existing = self.server.tickets.get(ticket.get("ticket_id"))
+                if existing is None:
+                    existing = {**ticket, "external_id": f"INC{len(self.server.tickets) + 1:07d}"}
+                    self.server.tickets[ticket.get("ticket_id")] = existing
+                created.append({"ticket_id": ticket.get("ticket_id"), "external_id": existing["external_id"]})
+        self._reply(201, {"created": created})
+
+    def do_GET(self):
+        if self.path != "/api/tickets":
+            return self._reply(404, {"error": "not found"})
+        with self.server.lock:
+            self._reply(200, {
+                "count": len(self.server.tickets),
+                "batches": self.server.batches,
+                "failures": self.server.failures,
+                "tickets": list(self.server.tickets.values()),
+            })
+
+    def _reply(self, status: int, body: Dict[str, Any]):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock ITSM server for ticket export testing")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fraction of batches answered with 503")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds to delay each response")
+    args = parser.parse_args()
+
+    server = MockITSMServer(args.host, args.port, args.fail_rate, args.latency)
+    print(f"🚀 Mock ITSM listening on {server.url} (fail rate {args.fail_rate}, latency {args.latency}s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("🛑 Mock ITSM stopped")
+
+
+if __name__ == "__main__":
+    main()
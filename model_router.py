@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Model Router
+Answers common log lines cheaply and escalates only uncertain or unseen ones to the large model
+"""
+
+import json
+import re
+import threading
+import time
+from collections import Counter
+from typing import Dict, Any, Optional, Tuple
+
+ANALYSIS_PROMPT = """
+        Analyze this Pega application log line and provide a JSON response:
+
+        Log: {log_line}
+
+        Provide analysis in this exact JSON format:
+        {{
+            "anomaly": "Brief description of the issue",
+            "severity": "Critical/High/Medium/Low",
+            "category": "performance/network/security/database/application",
+            "description": "Detailed explanation of the issue"{confidence_field}
+        }}
+
+        Only return valid JSON, no other text.
+        """
+
+CONFIDENCE_FIELD = """,
+            "confidence": "Number from 0 to 1: how sure you are of severity and category\""""
+
+DEFAULT_ROUTE = {
+    "small_model": None,         # e.g. "qwen2.5:1.5b"; None skips the small-model tier
+    "large_model": "mistral:7b",
+    "min_confidence": 0.75,      # small-model answers below this escalate
+    "classifier_samples": 5,     # large-model answers needed before a signature is classified from memory
+    "classifier_agreement": 0.8, # share of those answers that must agree on severity and category
+}
+
+JSON_OBJECT = re.compile(r"\{.*\}", re.DOTALL)
+# Any token containing a digit: numbers, timestamps, session and request ids
+VOLATILE_TOKENS = re.compile(r"\b\w*\d\w*\b")
+
+
+def line_signature(log_line: str, alert_code: Optional[str] = None) -> str:
+    """Recurrence key for a log line: its alert code, else its text with ids and numbers masked."""
+    if alert_code:
+        return alert_code
+    return VOLATILE_TOKENS.sub("#", log_line[:160]).strip()
+
+
+def parse_analysis(content: str) -> Optional[Dict[str, Any]]:
+    """JSON analysis from a model reply, tolerating code fences or surrounding prose."""
+    try:
+        return json.loads(content)
+    except json.JSONDecodeError:
+        match = JSON_OBJECT.search(content)
+        if match:
+            try:
+                return json.loads(match.group(0))
+            except json.JSONDecodeError:
+                return None
+    return None
+
+
+class SignatureMemory:
+    """What the large model answered for each signature (the cheap classifier tier)."""
+
+    def __init__(self, max_signatures: int = 5000):
+        self.max_signatures = max_signatures
+        self._labels: Dict[str, Counter] = {}
+        self._latest: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._labels)
+
+    def __contains__(self, signature: str) -> bool:
+        return signature in self._labels
+
+    def learn(self, signature: str, analysis: Dict[str, Any]):
+        with self._lock:
+            if signature not in self._labels and len(self._labels) >= self.max_signatures:
+                oldest = next(iter(self._labels))
+                del self._labels[oldest]
+                del self._latest[oldest]
+            self._labels.setdefault(signature, Counter())[(analysis.get("severity"), analysis.get("category"))] += 1
+            self._latest[signature] = analysis
+
+    def classify(self, signature: str, min_samples: int, min_agreement: float) -> Optional[Dict[str, Any]]:
+        """The majority (severity, category) if the history is large and consistent enough."""
+        with self._lock:
+            labels = self._labels.get(signature)
+            if not labels:
+                return None
+            samples = sum(labels.values())
+            (severity, category), votes = labels.most_common(1)[0]
+            if samples < min_samples or votes / samples < min_agreement:
+                return None
+            return {**self._latest[signature], "severity": severity, "category": category,
+                    "confidence": round(votes / samples, 2)}
+
+    def majority(self, signature: str) -> Optional[Tuple[str, str]]:
+        with self._lock:
+            labels = self._labels.get(signature)
+            return labels.most_common(1)[0][0] if labels else None
+
+
+class ModelRouter:
+    """Three tiers, cheapest first:
+
+    1. classifier - a signature the large model has labelled consistently is
+       answered from memory with no model call
+    2. small model - seen signatures go to a small local model that must
+       report a confidence above the route's threshold and agree with the
+       signature's history
+    3. large model - unseen signatures and everything the tiers above are
+       unsure about; its answers (and agreeing small-model answers) train
+       the classifier
+
+    Routes (model names and thresholds) are chosen per issue category.
+    """
+
+    def __init__(self, routes: Optional[Dict[str, Dict[str, Any]]] = None, unavailable_cooldown: float = 300.0):
+        """``routes`` maps an issue category to overrides of DEFAULT_ROUTE ("default" applies to all)."""
+        routes = routes or {}
+        self.default_route = {**DEFAULT_ROUTE, **routes.get("default", {})}
+        self.routes = {category: {**self.default_route, **route} for category, route in routes.items()}
+        self.unavailable_cooldown = unavailable_cooldown
+        self.memory = SignatureMemory()
+        self._unavailable_until: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "escalations": 0, "tiers": Counter(), "models": {}}
+
+    def route_for(self, category: Optional[str]) -> Dict[str, Any]:
+        return self.routes.get(category, self.default_route)
+
+    def analyze(self, client, log_line: str, alert_code: Optional[str] = None, category: Optional[str] = None,
+                signature: Optional[str] = None) -> Tuple[Optional[Dict[str, Any]], Dict[str, Any]]:
+        """Analyse a log line; returns (analysis or None, routing info).
+
+        ``signature`` overrides the recurrence key (e.g. a stack fingerprint).
+        """
+        route = self.route_for(category)
+        signature = signature or line_signature(log_line, alert_code)
+        self._count("requests")
+
+        known = self.memory.classify(signature, route["classifier_samples"], route["classifier_agreement"])
+        if known is not None:
+            return known, self._routed("classifier", "classifier", signature, 0.0)
+
+        if route["small_model"] and signature in self.memory:
+            analysis, latency = self._chat(client, route["small_model"], log_line, small=True)
+            if analysis is not None and self._confident(analysis, signature, route):
+                # A confident answer that agrees with the history reinforces it
+                self.memory.learn(signature, analysis)
+                return analysis, self._routed("small_model", route["small_model"], signature, latency)
+            self._count("escalations")
+
+        analysis, latency = self._chat(client, route["large_model"], log_line)
+        if analysis is not None:
+            self.memory.learn(signature, analysis)
+        return analysis, self._routed("large_model", route["large_model"], signature, latency)
+
+    def _confident(self, analysis: Dict[str, Any], signature: str, route: Dict[str, Any]) -> bool:
+        try:
+            confidence = float(analysis.get("confidence", 0))
+        except (TypeError, ValueError):
+            confidence = 0.0
+        majority = self.memory.majority(signature)
+        agrees = majority is None or majority == (analysis.get("severity"), analysis.get("category"))
+        return confidence >= route["min_confidence"] and agrees
+
+    def _chat(self, client, model: str, log_line: str, small: bool = False):
+        """Ask a model; small models also report confidence and are skipped for a while after errors."""
+        if self._unavailable_until.get(model, 0) > time.monotonic():
+            return None, 0.0
+        prompt = ANALYSIS_PROMPT.format(log_line=log_line, confidence_field=CONFIDENCE_FIELD if small else "")
+        started = time.perf_counter()
+        try:
+            response = client.chat(model=model, messages=[{'role': 'user', 'content': prompt}])
+        except Exception as e:
+            self._record_model(model, time.perf_counter() - started, error=True)
+            if not small:
+                raise
+            self._unavailable_until[model] = time.monotonic() + self.unavailable_cooldown
+            print(f"❌ Model {model} failed ({e}); skipping it for {self.unavailable_cooldown:.0f}s")
+            return None, 0.0
+        latency = time.perf_counter() - started
+        content = response['message']['content']
+        analysis = parse_analysis(content)
+        self._record_model(model, latency, error=analysis is None)
+        if analysis is None:
+            print(f"❌ Failed to parse {model} response: {content}")
+        return analysis, round(latency * 1000, 1)
+
+    def _record_model(self, model: str, latency: float, error: bool = False):
+        with self._lock:
+            counters = self.stats["models"].setdefault(model, {"calls": 0, "errors": 0, "total_latency_ms": 0.0})
+            counters["calls"] += 1
+            counters["errors"] += 1 if error else 0
+            counters["total_latency_ms"] += latency * 1000
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _routed(self, tier: str, model: str, signature: str, latency_ms: float) -> Dict[str, Any]:
+        with self._lock:
+            self.stats["tiers"][tier] += 1
+        return {"tier": tier, "model": model, "signature": signature, "latency_ms": latency_ms}
+
+    def status(self) -> Dict[str, Any]:
+        """Per-tier counts, per-model latency and the escalation rate."""
+        with self._lock:
+            requests = self.stats["requests"]
+            models = {model: {"calls": c["calls"], "errors": c["errors"],
+                              "avg_latency_ms": round(c["total_latency_ms"] / c["calls"], 1) if c["calls"] else 0.0}
+                      for model, c in self.stats["models"].items()}
+            tiers = dict(self.stats["tiers"])
+            large = tiers.get("large_model", 0)
+            return {
+                "requests": requests,
+                "tiers": tiers,
+                "escalations": self.stats["escalations"],
+                "escalation_rate": round(large / requests, 3) if requests else 0.0,
+                "models": models,
+                "signatures_learned": len(self.memory),
+            }
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Prompt Compactor
+Shrinks long Pega log lines and stack traces to a token budget before they reach the model
+"""
+
+import re
+import threading
+from typing import Dict, List, Any, Tuple
+
+CHARS_PER_TOKEN = 4  # close enough for English/Java text with Llama/Mistral tokenizers
+
+# Alert metrics worth keeping; the remaining px* counters rarely change a diagnosis
+KEY_METRICS = (
+    "pxTotalReqTime", "pxTotalReqCPU", "pxRDBIOElapsed", "pxRDBIOCount", "pxDBInputBytes",
+    "pxRulesExecuted", "pxActivityCount", "pxAlertCount", "pxOtherIOElapsed",
+)
+
+ALERT_CODE = re.compile(r"\b(?:PEGA\d{4}|SECU\d{4}|[A-Z]{2,5}-\d{3,4})\b")
+METRIC = re.compile(r"(px\w+)=([^;*]*)")
+FRAME = re.compile(r"^\s*at\s+(.+?)(?:\s+~\[.*\])?\s*$")
+FRAME_METHOD = re.compile(r"^(.*?)\(([^:)]*)(?::\d+)?\)$")
+MORE_FRAMES = re.compile(r"^\s*\.\.\.\s*\d+\s+more")
+PADDED_BRACKETS = re.compile(r"\[\s+([^\]]*?)\s*\]")
+EMPTY_BRACKETS = re.compile(r"\s*\[\s*\]")
+# Ids: long letter/digit mixes, hex traces, embedded timestamps, generated class hashes
+ID_TOKENS = [
+    (re.compile(r"\b(?=[A-Z0-9]*\d)(?=[A-Z0-9]*[A-Z])[A-Z0-9]{16,}\b"), "<id>"),
+    (re.compile(r"\b[0-9a-f]{16,}\b"), "<hash>"),
+    (re.compile(r"(Trace|Track): ?'?[0-9a-f]{6,}'?"), r"\1: <id>"),
+    (re.compile(r"#\d{8}T\d{6}\.\d{3} GMT"), "#<ts>"),
+]
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def mask_ids(text: str) -> str:
+    for pattern, replacement in ID_TOKENS:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+def collapse_frames(frames: List[str]) -> List[str]:
+    """Merge consecutive frames of the same method (recursion, overloads) into one with a count."""
+    collapsed: List[List[Any]] = []  # [method key, first frame, count]
+    for frame in frames:
+        match = FRAME_METHOD.match(frame)
+        key = f"{match.group(1)}({match.group(2)})" if match else frame
+        if collapsed and collapsed[-1][0] == key:
+            collapsed[-1][2] += 1
+        else:
+            collapsed.append([key, frame, 1])
+    return [frame if count == 1 else f"{frame} x{count}" for _, frame, count in collapsed]
+
+
+def trim_frames(frames: List[str], top: int, bottom: int) -> List[str]:
+    """Keep the throwing frames and the entry point, with the middle summarised."""
+    if len(frames) <= top + bottom:
+        return frames
+    kept = frames[:top]
+    kept.append(f"... {len(frames) - top - bottom} frames omitted ...")
+    if bottom:
+        kept.extend(frames[-bottom:])
+    return kept
+
+
+class PromptCompactor:
+    """Compacts a log event for the analysis prompt.
+
+    Alert lines (``*``-separated PegaRULES-ALERT records) keep the alert code,
+    message, operation context and a handful of key metrics. Rule log events
+    keep the header and, per exception in the ``Caused by`` chain, the top and
+    bottom frames with repeated frames collapsed. Ids are masked throughout.
+    When the result is still over ``token_budget`` fewer frames and metrics
+    are kept, then the text is cut.
+    """
+
+    def __init__(self, token_budget: int = 384, top_frames: int = 5, bottom_frames: int = 3):
+        """``token_budget`` of 0 disables compaction."""
+        self.token_budget = token_budget
+        self.top_frames = top_frames
+        self.bottom_frames = bottom_frames
+        self._lock = threading.Lock()
+        self.stats = {"compacted": 0, "original_tokens": 0, "compact_tokens": 0, "truncated": 0}
+
+    def compact(self, log_line: str) -> Tuple[str, Dict[str, Any]]:
+        """Return (prompt text, info) for a log event."""
+        original_tokens = estimate_tokens(log_line)
+        if not self.token_budget:
+            return log_line, {"original_tokens": original_tokens, "compact_tokens": original_tokens}
+
+        header, _, trace = log_line.partition("\n")
+        is_alert = header.count("*") >= 10
+        attempts = [(self.top_frames, self.bottom_frames, len(KEY_METRICS)),
+                    (min(self.top_frames, 3), min(self.bottom_frames, 1), 5),
+                    (1, 0, 3)]
+        for top, bottom, metrics in attempts:
+            head = self._alert(header, metrics) if is_alert else self._header(header)
+            text = "\n".join([head] + self._trace(trace, top, bottom)) if trace.strip() else head
+            if estimate_tokens(text) <= self.token_budget:
+                break
+        truncated = estimate_tokens(text) > self.token_budget
+        if truncated:
+            text = text[:self.token_budget * CHARS_PER_TOKEN - 15].rstrip() + " ...[truncated]"
+
+        info = {"original_tokens": original_tokens, "compact_tokens": estimate_tokens(text)}
+        with self._lock:
+            self.stats["compacted"] += 1
+            self.stats["original_tokens"] += info["original_tokens"]
+            self.stats["compact_tokens"] += info["compact_tokens"]
+            self.stats["truncated"] += 1 if truncated else 0
+        return text, info
+
+    def _alert(self, header: str, max_metrics: int) -> str:
+        fields = [field.strip() for field in header.split("*")]
+        code = ALERT_CODE.search(fields[2] if len(fields) > 2 else header)
+        message = next((field for field in reversed(fields) if field and "=" not in field[:40]), "")
+        metrics = dict(METRIC.findall(header))
+        kept = [f"{name}={metrics[name]}" for name in KEY_METRICS if name in metrics][:max_metrics]
+        context = [field for field in fields
+                   if field.startswith(("Rule-", "System-", "RULE-")) or " Step: " in field][:3]
+        parts = [f"{fields[0]} ALERT {code.group(0) if code else ''}".strip(),
+                 f"message: {message}"]
+        if context:
+            parts.append("context: " + "; ".join(context))
+        if kept:
+            parts.append("metrics: " + ", ".join(kept))
+        return mask_ids(" | ".join(parts))
+
+    def _header(self, header: str) -> str:
+        header = EMPTY_BRACKETS.sub("", header)
+        header = PADDED_BRACKETS.sub(r"[\1]", header)
+        return mask_ids(re.sub(r"\s{2,}", " ", header).strip())
+
+    def _trace(self, trace: str, top: int, bottom: int) -> List[str]:
+        lines: List[str] = []
+        frames: List[str] = []
+
+        def flush():
+            lines.extend(frame if frame.startswith("...") else "  at " + frame
+                         for frame in trim_frames(collapse_frames(frames), top, bottom))
+            frames.clear()
+
+        for raw in trace.splitlines():
+            frame = FRAME.match(raw)
+            if frame:
+                frames.append(frame.group(1))
+            elif MORE_FRAMES.match(raw) or not raw.strip():
+                continue
+            else:
+                # Exception and "Caused by:" lines start a new segment and are always kept
+                flush()
+                lines.append(raw.strip())
+        flush()
+        return [mask_ids(line) for line in lines]
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+        compacted = stats["compacted"]
+        stats["avg_original_tokens"] = round(stats["original_tokens"] / compacted, 1) if compacted else 0.0
+        stats["avg_compact_tokens"] = round(stats["compact_tokens"] / compacted, 1) if compacted else 0.0
+        stats["reduction"] = (round(stats["original_tokens"] / stats["compact_tokens"], 2)
+                              if stats["compact_tokens"] else 0.0)
+        return {"token_budget": self.token_budget, **stats}
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+In-Memory Query Index
+Cursor-based, filterable access to logs, analyses and tickets
+"""
+
+import bisect
+import heapq
+import threading
+import time
+from collections import OrderedDict
+from itertools import islice
+from typing import Dict, List, Any, Optional, Callable, Iterable
+
+
+class IndexedCollection:
+    """Bounded in-memory collection with secondary indexes and id cursors.
+
+    Every item gets a monotonically increasing integer ``id``. Secondary
+    indexes map a field value to the ascending list of ids carrying it, so a
+    filtered delta query ("everything with severity=Critical after id 4210")
+    only touches matching ids instead of scanning the whole collection.
+    Items are evicted oldest-first once ``max_items`` is exceeded; evicted
+    ids stay at the front of the posting and timestamp lists (every read
+    starts at ``_first_id``) until they make up half of a list, so eviction
+    is amortised O(1) instead of shifting each list.
+
+    ``version`` increases on every add or update, and each item remembers the
+    version of its last change, so clients can revalidate cheaply (ETags) or
+    ask for everything changed since a version they have already seen.
+    Filtered change feeds report items that moved out of the filter as
+    tombstones (``{"id", "removed": True}`` plus ``identity_fields``).
+    """
+
+    def __init__(self, name: str, indexes: Dict[str, Callable[[Dict[str, Any]], Any]],
+                 max_items: int = 1000, timestamp_field: str = "timestamp",
+                 identity_fields: Iterable[str] = ()):
+        """Create a collection indexed by the given field extractors."""
+        self.name = name
+        self.max_items = max_items
+        self.timestamp_field = timestamp_field
+        self.identity_fields = tuple(identity_fields)
+        self._extractors = indexes
+        self._items: Dict[int, Dict[str, Any]] = {}
+        self._keys: Dict[int, Dict[str, Any]] = {}
+        self._former: Dict[int, Dict[str, set]] = {}  # item id -> index values it had before an update
+        self._postings: Dict[str, Dict[Any, List[int]]] = {field: {} for field in indexes}
+        self._timestamps: List[str] = []
+        self._timestamps_start = 0  # position of _first_id's timestamp
+        self._first_id = 1
+        self._next_id = 1
+        self._lock = threading.RLock()
+        self.version = 0
+        self.modified_at = time.time()
+        # item id -> version of its last change, ordered by that version
+        self._changes: "OrderedDict[int, int]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    @property
+    def last_id(self) -> int:
+        """Id of the newest item (0 when empty)."""
+        return self._next_id - 1
+
+    def add(self, item: Dict[str, Any]) -> int:
+        """Append an item, assign its id and index it."""
+        with self._lock:
+            item_id = self._next_id
+            self._next_id += 1
+            item["id"] = item_id
+            self._items[item_id] = item
+            self._timestamps.append(str(item.get(self.timestamp_field, "")))
+
+            keys = {field: extract(item) for field, extract in self._extractors.items()}
+            self._keys[item_id] = keys
+            for field, value in keys.items():
+                self._postings[field].setdefault(value, []).append(item_id)
+            self._touch(item_id)
+
+            while len(self._items) > self.max_items:
+                self._evict_oldest()
+            return item_id
+
+    def update(self, item_id: int, changes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Apply field changes to an item and move it between index buckets."""
+        with self._lock:
+            item = self._items.get(item_id)
+            if item is None:
+                return None
+            item.update(changes)
+
+            old_keys = self._keys[item_id]
+            new_keys = {field: extract(item) for field, extract in self._extractors.items()}
+            for field, new_value in new_keys.items():
+                old_value = old_keys.get(field)
+                if old_value == new_value:
+                    continue
+                self._former.setdefault(item_id, {}).setdefault(field, set()).add(old_value)
+                self._remove_posting(field, old_value, item_id)
+                bisect.insort(self._postings[field].setdefault(new_value, []), item_id)
+            self._keys[item_id] = new_keys
+            self._touch(item_id)
+            return item
+
+    def get(self, item_id: int) -> Optional[Dict[str, Any]]:
+        """Return an item by id."""
+        return self._items.get(item_id)
+
+    def find_first(self, field: str, value: Any) -> Optional[Dict[str, Any]]:
+        """Return the newest item whose indexed field equals value."""
+        with self._lock:
+            ids = self._postings.get(field, {}).get(value, [])
+            for item_id in reversed(ids):
+                if item_id in self._items:
+                    return self._items[item_id]
+            return None
+
+    def counts(self, field: str) -> Dict[Any, int]:
+        """Number of retained items per value of an indexed field."""
+        with self._lock:
+            start = self._first_id
+            return {value: len(ids) - bisect.bisect_left(ids, start)
+                    for value, ids in self._postings.get(field, {}).items()
+                    if ids and ids[-1] >= start}
+
+    def query(self, since_id: Optional[int] = None, since_timestamp: Optional[str] = None,
+              filters: Optional[Dict[str, Iterable[Any]]] = None, limit: int = 50,
+              newest_first: bool = False) -> Dict[str, Any]:
+        """Return a page of items after a cursor, narrowed by indexed filters.
+
+        With a cursor (``since_id`` or ``since_timestamp``) the page walks
+        forward from the cursor in id order, so a poller can keep passing back
+        ``next_cursor`` and only ever receive deltas. Without a cursor the
+        newest ``limit`` matching items are returned. ``since_timestamp``
+        relies on items being added in timestamp order.
+        """
+        with self._lock:
+            lower = self._first_id
+            if since_id is not None:
+                lower = max(lower, since_id + 1)
+            if since_timestamp:
+                offset = bisect.bisect_right(self._timestamps, since_timestamp, lo=self._timestamps_start)
+                lower = max(lower, self._first_id + offset - self._timestamps_start)
+
+            forward = since_id is not None or bool(since_timestamp)
+            page_ids, has_more = self._candidate_ids(filters or {}, lower, limit, forward)
+
+            items = [self._items[item_id] for item_id in page_ids]
+            if newest_first:
+                items.reverse()
+
+            if forward:
+                next_cursor = page_ids[-1] if page_ids else lower - 1
+            else:
+                next_cursor = self.last_id
+            return {
+                "items": items,
+                "next_cursor": next_cursor,
+                "has_more": has_more,
+            }
+
+    def changes_since(self, since_version: int, filters: Optional[Dict[str, Iterable[Any]]] = None,
+                      limit: int = 50) -> Dict[str, Any]:
+        """Items added or updated after ``since_version``, oldest change first.
+
+        With filters, an item that no longer matches but may have matched
+        before its change comes back as a tombstone, so a client holding it
+        drops it (a client that never had it ignores the tombstone).
+        ``next_version`` is the cursor for the following call; it only equals
+        the collection version once every change has been returned.
+        """
+        with self._lock:
+            if since_version > self.version:
+                # Cursor from before a restart: resend what we have
+                since_version = 0
+            changed: List[int] = []
+            for item_id, item_version in reversed(self._changes.items()):
+                if item_version <= since_version:
+                    break
+                changed.append(item_id)
+            changed.reverse()
+
+            active = {field: set(values) for field, values in (filters or {}).items()
+                      if field in self._postings and values}
+            removed = set()
+            if active:
+                matching = []
+                for item_id in changed:
+                    keys = self._keys[item_id]
+                    if all(keys.get(field) in values for field, values in active.items()):
+                        matching.append(item_id)
+                    elif self._matched_before(item_id, active):
+                        matching.append(item_id)
+                        removed.add(item_id)
+                changed = matching
+
+            has_more = len(changed) > limit
+            page_ids = changed[:limit]
+            next_version = self._changes[page_ids[-1]] if has_more else self.version
+            return {
+                "items": [self._tombstone(item_id) if item_id in removed else self._items[item_id]
+                          for item_id in page_ids],
+                "next_version": next_version,
+                "has_more": has_more,
+            }
+
+    def _matched_before(self, item_id: int, active: Dict[str, set]) -> bool:
+        """Whether some earlier value of every filtered field was in the filter."""
+        former = self._former.get(item_id)
+        if not former:
+            return False
+        keys = self._keys[item_id]
+        return all(keys.get(field) in values or values & former.get(field, set())
+                   for field, values in active.items())
+
+    def _tombstone(self, item_id: int) -> Dict[str, Any]:
+        item = self._items[item_id]
+        return {"id": item_id, **{field: item.get(field) for field in self.identity_fields}, "removed": True}
+
+    def _touch(self, item_id: int):
+        """Bump the collection version and record it as this item's last change."""
+        self.version += 1
+        self.modified_at = time.time()
+        self._changes[item_id] = self.version
+        self._changes.move_to_end(item_id)
+
+    def _candidate_ids(self, filters: Dict[str, Iterable[Any]], lower: int, limit: int,
+                       forward: bool) -> tuple:
+        """Ascending ids >= lower that satisfy every filter, at most ``limit`` of them.
+
+        Forward pages take the first matches after ``lower``, other pages the
+        last ones; either way the walk stops one match past ``limit``, so a page
+        costs O(limit) rather than O(collection). Returns (ids, has_more).
+        """
+        active = {field: set(values) for field, values in filters.items()
+                  if field in self._postings and values}
+        if not active:
+            ids = range(lower, self._next_id)
+            page = ids[:limit] if forward else ids[max(len(ids) - limit, 0):]
+            return list(page), len(ids) > limit
+
+        # Drive the walk from the most selective field, then verify the others
+        # against each candidate's stored keys.
+        driver = min(active, key=lambda field: sum(
+            len(self._postings[field].get(value, [])) for value in active[field]))
+        others = [(field, values) for field, values in active.items() if field != driver]
+        walks = []
+        for value in active[driver]:
+            ids = self._postings[driver].get(value, [])
+            start = bisect.bisect_left(ids, lower)
+            walks.append(islice(ids, start, None) if forward else islice(reversed(ids), len(ids) - start))
+        page: List[int] = []
+        for item_id in heapq.merge(*walks, reverse=not forward):
+            if all(self._keys[item_id].get(field) in values for field, values in others):
+                if len(page) == limit:
+                    return (page if forward else page[::-1]), True
+                page.append(item_id)
+        return (page if forward else page[::-1]), False
+
+    def _evict_oldest(self):
+        """Drop the oldest item; its posting and timestamp entries are trimmed in batches."""
+        item_id = self._first_id
+        self._first_id += 1
+        self._items.pop(item_id, None)
+        self._changes.pop(item_id, None)
+        keys = self._keys.pop(item_id, {})
+        self._former.pop(item_id, None)
+        self._timestamps_start += 1
+        if self._timestamps_start * 2 > len(self._timestamps):
+            del self._timestamps[:self._timestamps_start]
+            self._timestamps_start = 0
+        for field, value in keys.items():
+            ids = self._postings[field].get(value)
+            if not ids:
+                continue
+            stale = bisect.bisect_left(ids, self._first_id)
+            if stale == len(ids):
+                del self._postings[field][value]
+            elif stale * 2 > len(ids):
+                del ids[:stale]
+
+    def _remove_posting(self, field: str, value: Any, item_id: int):
+        ids = self._postings[field].get(value)
+        if not ids:
+            return
+        position = bisect.bisect_left(ids, item_id)
+        if position < len(ids) and ids[position] == item_id:
+            del ids[position]
+        if not ids:
+            del self._postings[field][value]
+
+
+def parse_filter(value: Optional[str]) -> List[str]:
+    """Split a comma-separated query parameter into filter values."""
+    if not value:
+        return []
+    return [part.strip() for part in value.split(",") if part.strip()]
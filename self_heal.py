@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+Self-Heal Executor
+Runs KEDB fixes as registered actions with concurrency limits, idempotency and circuit breakers
+"""
+
+import json
+import os
+import subprocess
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Callable, Tuple
+
+try:
+    import httpx
+except ImportError:  # only needed by HttpAction
+    httpx = None
+
+
+class _SafeFormat(dict):
+    """Leaves unknown {placeholders} untouched when formatting templates."""
+
+    def __missing__(self, key):
+        return "{" + key + "}"
+
+
+def render(template: Any, context: Dict[str, Any]) -> Any:
+    """Fill {placeholders} in strings, lists and dicts from the heal context."""
+    if isinstance(template, str):
+        return template.format_map(_SafeFormat(context))
+    if isinstance(template, list):
+        return [render(item, context) for item in template]
+    if isinstance(template, dict):
+        return {key: render(value, context) for key, value in template.items()}
+    return template
+
+
+class HealAction(ABC):
+    """A registered remediation; ``run`` returns a short output or raises."""
+
+    type = "base"
+
+    def __init__(self, name: str, timeout: float = 30.0, concurrency: int = 1):
+        self.name = name
+        self.timeout = timeout
+        self.concurrency = concurrency
+
+    @abstractmethod
+    def run(self, context: Dict[str, Any]) -> str:
+        """Perform the remediation for ``context``."""
+
+
+class ScriptAction(HealAction):
+    """Runs a local command (argument list, no shell) with a hard timeout."""
+
+    type = "script"
+
+    def __init__(self, name: str, command: List[str], cwd: Optional[str] = None, **kwargs):
+        super().__init__(name, **kwargs)
+        self.command = command
+        self.cwd = cwd
+
+    def run(self, context: Dict[str, Any]) -> str:
+        result = subprocess.run(render(self.command, context), cwd=self.cwd, capture_output=True,
+                                text=True, timeout=self.timeout)
+        if result.returncode != 0:
+            raise RuntimeError(f"exit {result.returncode}: {result.stderr.strip()[-200:]}")
+        return result.stdout.strip()[-200:]
+
+
+class HttpAction(HealAction):
+    """Calls an HTTP endpoint (e.g. an admin API or runbook automation)."""
+
+    type = "http"
+
+    def __init__(self, name: str, url: str, method: str = "POST", body: Any = None,
+                 headers: Optional[Dict[str, str]] = None, **kwargs):
+        super().__init__(name, **kwargs)
+        if httpx is None:
+            raise ImportError("httpx is required for HTTP self-heal actions. Install with: pip install httpx")
+        self.url = url
+        self.method = method
+        self.body = body
+        self.client = httpx.Client(headers=headers or {}, timeout=self.timeout)
+
+    def run(self, context: Dict[str, Any]) -> str:
+        response = self.client.request(self.method, render(self.url, context),
+                                       json=render(self.body, context) if self.body is not None else None)
+        if response.status_code >= 400:
+            raise RuntimeError(f"HTTP {response.status_code}: {response.text[:200]}")
+        return f"HTTP {response.status_code}"
+
+
+class QueueAction(HealAction):
+    """Publishes a remediation message; the default publisher appends to a local spool file."""
+
+    type = "queue"
+
+    def __init__(self, name: str, queue: str, message: Any = None, spool_path: str = "self_heal_queue.jsonl",
+                 publisher: Optional[Callable[[str, Dict[str, Any]], None]] = None, **kwargs):
+        super().__init__(name, **kwargs)
+        self.queue = queue
+        self.message = message or {"fix": "{fix}", "kedb_error": "{kedb_error}", "log_line": "{log_line}"}
+        self.spool_path = spool_path
+        self.publisher = publisher or self._spool
+        self._lock = threading.Lock()
+
+    def _spool(self, queue: str, message: Dict[str, Any]):
+        with self._lock, open(self.spool_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"queue": queue, "at": datetime.now().isoformat(), "message": message},
+                               ensure_ascii=False) + "\n")
+
+    def run(self, context: Dict[str, Any]) -> str:
+        self.publisher(self.queue, render(self.message, context))
+        return f"queued on {self.queue}"
+
+
+class SimulatedAction(HealAction):
+    """Records the KEDB fix as applied without touching anything (demo default)."""
+
+    type = "simulate"
+
+    def run(self, context: Dict[str, Any]) -> str:
+        return f"simulated: {context.get('fix', '')}"
+
+
+ACTION_TYPES = {cls.type: cls for cls in (ScriptAction, HttpAction, QueueAction, SimulatedAction)}
+
+
+def load_actions(path: str) -> Tuple[Dict[str, HealAction], Dict[str, str]]:
+    """Read action definitions and the KEDB error -> action mapping from a JSON file.
+
+    Format: ``{"actions": {"name": {"type": "script", "command": [...], "timeout": 30,
+    "concurrency": 2}}, "kedb": {"PEGA0001": "name"}}``.
+    """
+    actions: Dict[str, HealAction] = {"simulate": SimulatedAction("simulate", concurrency=64)}
+    if not path or not os.path.exists(path):
+        return actions, {}
+    with open(path, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    for name, spec in config.get("actions", {}).items():
+        spec = dict(spec)
+        action_type = spec.pop("type", None)
+        if action_type not in ACTION_TYPES:
+            raise ValueError(f"Self-heal action '{name}' has unknown type '{action_type}'")
+        actions[name] = ACTION_TYPES[action_type](name, **spec)
+    mapping = {error.upper(): name for error, name in config.get("kedb", {}).items()}
+    unknown = sorted(set(mapping.values()) - set(actions))
+    if unknown:
+        raise ValueError(f"KEDB mapping refers to unknown actions: {', '.join(unknown)}")
+    print(f"✅ Loaded {len(actions) - 1} self-heal actions and {len(mapping)} KEDB mappings from {path}")
+    return actions, mapping
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures; after ``reset_timeout`` one trial run is let through."""
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 120.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if time.monotonic() - self.opened_at >= self.reset_timeout else "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record(self, ok: bool):
+        with self._lock:
+            self._trial_running = False
+            if ok:
+                self.failures = 0
+                self.opened_at = None
+                return
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+class SelfHealExecutor:
+    """Worker pool that executes self-heal actions.
+
+    * per-action concurrency: a semaphore per action caps parallel runs
+    * timeouts: enforced by the action itself (subprocess/HTTP timeouts)
+    * idempotency: submissions with the same key inside ``dedupe_window``
+      share one execution. The first submission's callback runs on the
+      worker right after the action; duplicates wait on the run until that
+      callback has returned, then get its return value (e.g. the ticket it
+      raised) as ``primary_outcome`` alongside ``deduplicated: True``
+    * circuit breaker per fix: after repeated failures the fix is skipped
+      and callers escalate straight to a ticket until the breaker resets
+
+    Callbacks receive a result dict with ``ok``, ``action``, ``duration_ms``
+    and ``output``/``error``; they run on a worker thread (or inline when a
+    breaker is open). Runs cancelled by ``shutdown`` report ``cancelled: True``.
+    """
+
+    def __init__(self, actions: Dict[str, HealAction], max_workers: int = 8, dedupe_window: float = 300.0,
+                 failure_threshold: int = 3, reset_timeout: float = 120.0):
+        """Create the pool."""
+        self.actions = actions
+        self.dedupe_window = dedupe_window
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="self-heal")
+        self._semaphores = {name: threading.BoundedSemaphore(max(1, action.concurrency))
+                            for name, action in actions.items()}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._inflight: Dict[str, Tuple[float, Dict[str, Any]]] = {}  # key -> (expiry, run)
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+        self.stats = {"submitted": 0, "succeeded": 0, "failed": 0, "deduplicated": 0,
+                      "short_circuited": 0, "cancelled": 0, "in_flight": 0, "total_duration_ms": 0.0}
+        self.per_action: Dict[str, Dict[str, float]] = {}
+
+    def submit(self, action_name: str, fix_key: str, idempotency_key: str, context: Dict[str, Any],
+               callback: Callable[[Dict[str, Any]], None]):
+        """Run an action for a fix (or join an identical recent run) and report via callback."""
+        now = time.monotonic()
+        settled = None
+        with self._lock:
+            self.stats["submitted"] += 1
+            self._inflight = {key: entry for key, entry in self._inflight.items() if entry[0] > now}
+            existing = self._inflight.get(idempotency_key)
+            run = None
+            if existing:
+                self.stats["deduplicated"] += 1
+                if existing[1]["settled"]:
+                    settled = existing[1]
+                else:
+                    existing[1]["waiters"].append(callback)
+            else:
+                breaker = self._breakers.setdefault(fix_key, CircuitBreaker(self.failure_threshold, self.reset_timeout))
+                if action_name in self.actions and breaker.allow():
+                    self.stats["in_flight"] += 1
+                    # Published with its waiter list before the worker can settle it (that needs the lock)
+                    run = {"action": action_name, "outcome": None, "result": None, "settled": False, "waiters": []}
+                    run["future"] = self._pool.submit(self._run, run, action_name, breaker, context, callback)
+                    self._inflight[idempotency_key] = (now + self.dedupe_window, run)
+                else:
+                    self.stats["short_circuited"] += 1
+
+        if settled is not None:
+            self._notify(callback, settled)
+        elif run is not None:
+            run["future"].add_done_callback(
+                lambda f: self._settle(run, callback, self._cancelled(action_name)) if f.cancelled() else None)
+        elif not existing:
+            reason = (f"unknown action '{action_name}'" if action_name not in self.actions
+                      else f"circuit open for {fix_key} after {breaker.failures} failures")
+            callback({"ok": False, "action": action_name, "duration_ms": 0.0, "error": reason,
+                      "circuit_open": True})
+
+    def _run(self, run: Dict[str, Any], action_name: str, breaker: CircuitBreaker, context: Dict[str, Any],
+             callback: Callable[[Dict[str, Any]], Any]) -> Dict[str, Any]:
+        result = self._execute(action_name, breaker, context)
+        self._settle(run, callback, result)
+        return result
+
+    def _settle(self, run: Dict[str, Any], callback: Callable[[Dict[str, Any]], Any], result: Dict[str, Any]):
+        """Report a run to its first submitter, then to the duplicates that joined meanwhile."""
+        outcome = None
+        try:
+            outcome = callback(result)
+        except Exception as e:
+            print(f"❌ Self-heal callback for {run['action']} failed: {e}")
+        with self._lock:
+            run.update(outcome=outcome, result=result, settled=True)
+            waiters, run["waiters"] = run["waiters"], []
+        for waiter in waiters:
+            self._notify(waiter, run)
+
+    @staticmethod
+    def _notify(callback: Callable[[Dict[str, Any]], Any], run: Dict[str, Any]):
+        try:
+            callback({**run["result"], "deduplicated": True, "primary_outcome": run["outcome"]})
+        except Exception as e:
+            print(f"❌ Self-heal callback for {run['action']} failed: {e}")
+
+    def _cancelled(self, action_name: str) -> Dict[str, Any]:
+        with self._lock:
+            self.stats["cancelled"] += 1
+            self.stats["in_flight"] -= 1
+        return {"ok": False, "action": action_name, "duration_ms": 0.0, "error": "cancelled at shutdown",
+                "cancelled": True}
+
+    def _execute(self, action_name: str, breaker: CircuitBreaker, context: Dict[str, Any]) -> Dict[str, Any]:
+        action = self.actions[action_name]
+        started = time.perf_counter()
+        result: Dict[str, Any] = {"action": action_name}
+        semaphore = self._semaphores[action_name]
+        if not semaphore.acquire(timeout=action.timeout):
+            result.update(ok=False, error=f"concurrency limit ({action.concurrency}) wait timed out")
+        else:
+            try:
+                result.update(ok=True, output=action.run(context))
+            except subprocess.TimeoutExpired:
+                result.update(ok=False, error=f"timed out after {action.timeout}s")
+            except Exception as e:
+                result.update(ok=False, error=f"{type(e).__name__}: {e}")
+            finally:
+                semaphore.release()
+        result["duration_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        breaker.record(result["ok"])
+
+        with self._lock:
+            self.stats["in_flight"] -= 1
+            self.stats["succeeded" if result["ok"] else "failed"] += 1
+            self.stats["total_duration_ms"] += result["duration_ms"]
+            counters = self.per_action.setdefault(action_name, {"runs": 0, "failures": 0, "total_duration_ms": 0.0})
+            counters["runs"] += 1
+            counters["failures"] += 0 if result["ok"] else 1
+            counters["total_duration_ms"] += result["duration_ms"]
+        return result
+
+    def status(self) -> Dict[str, Any]:
+        """Counters, throughput and breaker states."""
+        with self._lock:
+            stats = dict(self.stats)
+            completed = stats["succeeded"] + stats["failed"]
+            elapsed = max(time.time() - self.started_at, 1e-9)
+            stats["heals_per_minute"] = round(stats["succeeded"] / elapsed * 60, 2)
+            stats["avg_duration_ms"] = round(stats.pop("total_duration_ms") / completed, 2) if completed else 0.0
+            actions = {name: {"runs": int(c["runs"]), "failures": int(c["failures"]),
+                              "avg_duration_ms": round(c["total_duration_ms"] / c["runs"], 2)}
+                       for name, c in self.per_action.items()}
+            breakers = {key: {"state": breaker.state, "failures": breaker.failures}
+                        for key, breaker in self._breakers.items() if breaker.state != "closed" or breaker.failures}
+        return {**stats, "actions": actions, "open_circuits": breakers}
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
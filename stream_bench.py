@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Stream Benchmark
+Server CPU spent fanning broadcast events out to WebSocket and Server-Sent Events subscribers
+
+    python stream_bench.py --subscribers 1000 --events 2000
+    python stream_bench.py --subscribers 5000 --rate 200 --flush-ms 250 --transport sse
+
+Both transports run through the API's real broadcast path (journal, subscription
+index, shared frame cache) inside one process. Subscribers end at the ASGI
+boundary: a WebSocket subscriber's send is counted but not written to a socket,
+and an SSE subscriber is drained by a task that behaves like the /stream/sse
+response loop. The figures therefore cover routing, encoding and batching, not
+kernel socket writes; the "writes" column shows how many of those each
+transport would have made.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from typing import Dict, List, Any
+
+import api_streamlit_logic as api
+from event_journal import EventJournal
+from stream_protocol import Subscription, StreamClient, SseClient
+
+
+class NullWebSocket:
+    """Accepts frames like a Starlette WebSocket and only counts them."""
+
+    def __init__(self):
+        self.writes = 0
+        self.bytes = 0
+
+    async def send_text(self, text: str):
+        self.writes += 1
+        self.bytes += len(text)
+
+    async def send_bytes(self, data: bytes):
+        self.writes += 1
+        self.bytes += len(data)
+
+
+def sample_events(count: int) -> List[tuple]:
+    """(message, attributes) pairs shaped like the analysis pipeline's broadcasts."""
+    codes = ["PEGA0001", "PEGA0005", "PEGA0019", "PEGA0035", "SECU0001"]
+    events = []
+    for i in range(count):
+        code = codes[i % len(codes)]
+        events.append(({"type": "new_log", "data": {
+            "id": i, "timestamp": "2024-01-01T00:00:00", "level": "ERROR", "alert_code": code,
+            "message": f"{code} Interaction time exceeded threshold for MyCo-Claims-Work {i}",
+            "analysis": {"severity": "High", "category": "performance", "action": "self_heal",
+                         "summary": "Long-running interaction", "support_hours_saved": 1.5}}},
+                       {"alert_code": code, "app": "MyCo-Claims", "category": "performance",
+                        "action": "self_heal", "severity": "High"}))
+        if i % 10 == 9:
+            events.append(({"type": "stats_update", "data": {"total_logs": i + 1, "self_healed": i // 2,
+                                                             "tickets_raised": i // 5}}, None))
+    return events
+
+
+async def run(transport: str, subscribers: int, events: List[tuple], rate: float, flush: float) -> Dict[str, Any]:
+    api.stream_index = api.SubscriptionIndex()
+    api.stream_journal = EventJournal(capacity=len(events) + 1)
+    sockets = []
+    drainers = []
+    sse_writes = [0, 0]  # writes, bytes
+    running = True
+
+    async def drain(client: SseClient):
+        # The /stream/sse response loop, minus the socket write
+        while running or client._pending:
+            chunk = await client.drain(0.05)
+            if chunk:
+                sse_writes[0] += 1
+                sse_writes[1] += len(chunk)
+            await asyncio.sleep(flush)
+
+    for _ in range(subscribers):
+        if transport == "websocket":
+            socket = NullWebSocket()
+            sockets.append(socket)
+            api.stream_index.add(StreamClient(socket, Subscription()))
+        else:
+            client = SseClient(Subscription(), max_pending=api.SSE_MAX_PENDING)
+            api.stream_index.add(client)
+            drainers.append(asyncio.ensure_future(drain(client)))
+
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    for i, (message, attributes) in enumerate(events):
+        await api.broadcast_to_websockets(dict(message), attributes)
+        if rate:
+            await asyncio.sleep(max(0.0, wall + (i + 1) / rate - time.perf_counter()))
+        elif i % 50 == 49:
+            await asyncio.sleep(0)  # let SSE drainers run as they would between broadcasts
+    running = False
+    await asyncio.gather(*drainers)
+    cpu = time.process_time() - cpu
+    wall = time.perf_counter() - wall
+
+    writes = sum(socket.writes for socket in sockets) if sockets else sse_writes[0]
+    sent = sum(socket.bytes for socket in sockets) if sockets else sse_writes[1]
+    return {
+        "transport": transport,
+        "subscribers": subscribers,
+        "events": len(events),
+        "cpu_seconds": round(cpu, 3),
+        "wall_seconds": round(wall, 3),
+        # CPU per event for every 1,000 subscribers it reached
+        "cpu_ms_per_event_per_1k": round(cpu * 1000 / len(events) / (subscribers / 1000), 4),
+        "writes": writes,
+        "mb_sent": round(sent / 1e6, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare broadcast CPU cost of /stream and /stream/sse")
+    parser.add_argument("--subscribers", type=int, default=1000)
+    parser.add_argument("--events", type=int, default=2000, help="new_log events (plus a stats update every 10)")
+    parser.add_argument("--rate", type=float, default=0, help="events per second (0 = as fast as possible)")
+    parser.add_argument("--flush-ms", type=float, default=float(os.getenv("PEGA_SSE_FLUSH_MS", "100")),
+                        help="SSE batch interval")
+    parser.add_argument("--transport", choices=("both", "websocket", "sse"), default="both")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    events = sample_events(args.events)
+    transports = ("websocket", "sse") if args.transport == "both" else (args.transport,)
+    results = [asyncio.run(run(transport, args.subscribers, events, args.rate, args.flush_ms / 1000))
+               for transport in transports]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'transport':<10} {'subscribers':>11} {'events':>7} {'cpu s':>8} {'wall s':>8} "
+          f"{'cpu ms/event/1k':>16} {'writes':>10} {'MB':>8}")
+    for result in results:
+        print(f"{result['transport']:<10} {result['subscribers']:>11} {result['events']:>7} "
+              f"{result['cpu_seconds']:>8} {result['wall_seconds']:>8} {result['cpu_ms_per_event_per_1k']:>16} "
+              f"{result['writes']:>10} {result['mb_sent']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+"""
+Stream Protocol
+Per-client encoding, event-type subscriptions, field projection and stat deltas for /stream
+"""
+
+import asyncio
+import json
+import zlib
+from typing import Dict, List, Any, Optional, Mapping
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+ENCODINGS = ("json", "msgpack", "deflate")
+# initial_data section -> the event type whose subscription and fields it follows
+INITIAL_SECTIONS = {"logs": "new_log", "tickets": "tickets_update", "stats": "stats_update"}
+DELTA_TYPES = {"stats_update": "stats_delta"}
+# Protocol messages every client receives whatever it subscribed to
+CONTROL_TYPES = {"initial_data", "subscribed", "resumed", "error"}
+# Event attributes clients can filter on, in anchor order (most selective first)
+FILTER_DIMENSIONS = ("alert_code", "app", "category", "action", "severity")
+
+
+def _split(value: Any) -> List[str]:
+    if isinstance(value, str):
+        return [part.strip() for part in value.split(",") if part.strip()]
+    return [str(part) for part in value or []]
+
+
+def _norm(value: Any) -> str:
+    return str(value).strip().lower()
+
+
+def project(data: Any, fields: Optional[List[str]]) -> Any:
+    """Keep only ``fields`` of a dict, or of each dict in a list; other payloads pass through."""
+    if not fields:
+        return data
+    if isinstance(data, dict):
+        return {key: data[key] for key in fields if key in data}
+    if isinstance(data, list):
+        return [project(item, fields) for item in data]
+    return data
+
+
+def parse_control(message: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Decode a client frame (JSON text, or MessagePack bytes) into a control dict, if it is one."""
+    try:
+        if message.get("text") is not None:
+            control = json.loads(message["text"])
+        elif message.get("bytes") is not None and msgpack is not None:
+            control = msgpack.unpackb(message["bytes"])
+        else:
+            return None
+    except (ValueError, TypeError) as e:
+        return {"error": f"Unreadable control message: {e}"}
+    return control if isinstance(control, dict) else None
+
+
+class Subscription:
+    """What a /stream client wants: encoding, event types, fields per type and stat deltas.
+
+    Set from query parameters (``?encoding=msgpack&types=new_log,stats_update
+    &fields.new_log=timestamp,level,alert_code&deltas=true&category=pega_security``)
+    and changed later with a ``{"subscribe": {...}}`` control message using the
+    same keys (``fields`` as a ``{type: [field, ...]}`` object, ``filters`` as a
+    ``{dimension: [value, ...]}`` object). No options means the original
+    protocol: JSON text, every type, full objects, no filters.
+
+    Filters (on FILTER_DIMENSIONS, case-insensitive) apply to events broadcast
+    with attributes: values within a dimension are alternatives, dimensions
+    must all match. Events without attributes (stats, ticket lists) are not
+    filtered.
+    """
+
+    def __init__(self, encoding: str = "json", types: Optional[List[str]] = None,
+                 fields: Optional[Dict[str, List[str]]] = None, deltas: bool = False,
+                 filters: Optional[Dict[str, List[str]]] = None):
+        self.encoding = "json"
+        self.types: Optional[set] = None
+        self.fields: Dict[str, List[str]] = {}
+        self.deltas = False
+        self.filters: Dict[str, set] = {}
+        self.update({"encoding": encoding, "types": types, "fields": fields, "deltas": deltas,
+                     "filters": filters})
+
+    @classmethod
+    def from_params(cls, params: Mapping[str, str]) -> "Subscription":
+        fields = {key[len("fields."):]: _split(value) for key, value in params.items() if key.startswith("fields.")}
+        filters = {dimension: _split(params[dimension]) for dimension in FILTER_DIMENSIONS if dimension in params}
+        return cls(encoding=params.get("encoding", "json"), types=_split(params.get("types")) or None,
+                   fields=fields, deltas=str(params.get("deltas", "")).lower() in ("1", "true", "yes"),
+                   filters=filters)
+
+    def update(self, options: Dict[str, Any]):
+        """Apply the options present in a subscribe message; invalid ones raise ValueError and change nothing."""
+        encoding = options.get("encoding")
+        if encoding and encoding not in ENCODINGS:
+            raise ValueError(f"encoding must be one of {', '.join(ENCODINGS)}")
+        unknown = set(options.get("filters") or {}) - set(FILTER_DIMENSIONS)
+        if unknown:
+            raise ValueError(f"Unknown filter {', '.join(sorted(unknown))}; filter on {', '.join(FILTER_DIMENSIONS)}")
+        if encoding:
+            # Without msgpack installed the client is told it got JSON instead
+            self.encoding = "json" if encoding == "msgpack" and msgpack is None else encoding
+        if "types" in options:
+            self.types = set(_split(options["types"])) or None
+        if options.get("fields") is not None:
+            self.fields = {event_type: _split(names) for event_type, names in options["fields"].items()}
+        if options.get("deltas") is not None:
+            self.deltas = bool(options["deltas"])
+        if options.get("filters") is not None:
+            self.filters = {dimension: {_norm(value) for value in _split(values)}
+                            for dimension, values in options["filters"].items() if _split(values)}
+
+    def matches(self, attributes: Dict[str, Any]) -> bool:
+        """Whether an event with these attributes passes every filter."""
+        for dimension, values in self.filters.items():
+            value = attributes.get(dimension)
+            if value is None or _norm(value) not in values:
+                return False
+        return True
+
+    def anchor(self) -> Optional[tuple]:
+        """(dimension, values) the index files this subscription under; None when unfiltered."""
+        for dimension in FILTER_DIMENSIONS:
+            if dimension in self.filters:
+                return dimension, self.filters[dimension]
+        return None
+
+    def wants(self, event_type: str) -> bool:
+        return self.types is None or event_type in self.types or event_type in CONTROL_TYPES
+
+    def shape(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """The message as this client should see it (sections and fields it subscribed to)."""
+        event_type = message.get("type")
+        if event_type == "initial_data":
+            data = {}
+            for section, value in message["data"].items():
+                section_type = INITIAL_SECTIONS.get(section)
+                if section_type is None:
+                    data[section] = value
+                elif self.wants(section_type):
+                    data[section] = project(value, self.fields.get(section_type))
+            return {**message, "data": data}
+        return {**message, "data": project(message.get("data"), self.fields.get(event_type))}
+
+    def key(self, event_type: str) -> tuple:
+        """Clients with equal keys receive byte-identical frames for this event type."""
+        fields = self.fields.get(event_type)
+        return self.encoding, tuple(fields) if fields else None
+
+    def describe(self) -> Dict[str, Any]:
+        return {"encoding": self.encoding, "types": sorted(self.types) if self.types else None,
+                "fields": self.fields, "deltas": self.deltas,
+                "filters": {dimension: sorted(values) for dimension, values in self.filters.items()}}
+
+
+class StreamClient:
+    """One /stream connection and its per-client protocol state."""
+
+    transport = "websocket"
+
+    def __init__(self, websocket, subscription: Subscription):
+        self.websocket = websocket
+        self.subscription = subscription
+        self.sent = {"messages": 0, "bytes": 0}
+        self._last: Dict[str, Dict[str, Any]] = {}  # last full payload per delta type
+        self._compressor = None
+
+    def prepare(self, message: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Shape a message for this client, turning stat updates into deltas; None when there is nothing to send."""
+        subscription = self.subscription
+        event_type = message.get("type")
+        if not subscription.wants(event_type):
+            return None
+        shaped = subscription.shape(message)
+        if not subscription.deltas:
+            return shaped
+        if event_type == "initial_data" and isinstance(shaped["data"].get("stats"), dict):
+            self._last["stats_update"] = dict(shaped["data"]["stats"])
+        if event_type not in DELTA_TYPES or not isinstance(shaped["data"], dict):
+            return shaped
+        previous = self._last.get(event_type)
+        self._last[event_type] = dict(shaped["data"])
+        if previous is None:
+            return shaped
+        changed = {key: value for key, value in shaped["data"].items() if previous.get(key) != value}
+        return {"type": DELTA_TYPES[event_type], "data": changed} if changed else None
+
+    def encode(self, message: Dict[str, Any]):
+        """Frame payload: str for JSON text frames, bytes for binary ones."""
+        encoding = self.subscription.encoding
+        if encoding == "msgpack":
+            return msgpack.packb(message, default=str)
+        text = json.dumps(message, separators=(",", ":"), default=str)
+        if encoding == "json":
+            return text
+        # One zlib stream per connection: later frames reuse earlier ones as dictionary
+        if self._compressor is None:
+            self._compressor = zlib.compressobj(6)
+        return self._compressor.compress(text.encode("utf-8")) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def shareable(self, message: Dict[str, Any]) -> bool:
+        """Whether the encoded frame depends only on the subscription key (no per-client state)."""
+        return self.subscription.encoding != "deflate" and not (
+            self.subscription.deltas and message.get("type") in DELTA_TYPES)
+
+    def frame_key(self, event_type: str) -> tuple:
+        """Cache key of the encoded frame, shared with every client that would produce the same bytes."""
+        return self.subscription.key(event_type)
+
+    async def send(self, message: Dict[str, Any], cache: Optional[Dict[tuple, Any]] = None):
+        """Send a message, encoding it once per subscription key when ``cache`` is shared across clients."""
+        if cache is not None and self.shareable(message):
+            if not self.subscription.wants(message.get("type")):
+                return
+            key = self.frame_key(message.get("type"))
+            if key not in cache:
+                cache[key] = self.encode(self.subscription.shape(message))
+            frame = cache[key]
+        else:
+            prepared = self.prepare(message)
+            if prepared is None:
+                return
+            frame = self.encode(prepared)
+        await self.deliver(frame)
+        self.sent["messages"] += 1
+        self.sent["bytes"] += len(frame.encode("utf-8")) if isinstance(frame, str) else len(frame)
+
+    async def deliver(self, frame):
+        if isinstance(frame, str):
+            await self.websocket.send_text(frame)
+        else:
+            await self.websocket.send_bytes(frame)
+
+    def reset_deltas(self):
+        """Next stat update goes out in full (after a resubscribe)."""
+        self._last.clear()
+
+
+class SseClient(StreamClient):
+    """One /stream/sse connection: the same subscription and routing as a WebSocket client.
+
+    Broadcasts only append the (shared, pre-framed) event to a pending list;
+    the response generator collects everything pending in one ``drain`` and
+    writes it as a single chunk, so a burst of events costs one write per
+    flush interval instead of one per event. A client that lets
+    ``max_pending`` frames pile up is closed rather than buffered without
+    bound; it can reconnect with Last-Event-ID.
+    """
+
+    transport = "sse"
+
+    def __init__(self, subscription: Subscription, max_pending: int = 1000):
+        super().__init__(None, subscription)
+        self.max_pending = max_pending
+        self.closed = False
+        self._pending: List[str] = []
+        self._ready = asyncio.Event()
+
+    def encode(self, message: Dict[str, Any]) -> str:
+        """An SSE event: journaled events carry their seq as the event id for Last-Event-ID."""
+        seq = message.get("seq")
+        head = f"id: {seq}\nevent: {message.get('type')}\n" if seq is not None else f"event: {message.get('type')}\n"
+        return head + "data: " + json.dumps(message, separators=(",", ":"), default=str) + "\n\n"
+
+    def frame_key(self, event_type: str) -> tuple:
+        return ("sse",) + self.subscription.key(event_type)
+
+    def shareable(self, message: Dict[str, Any]) -> bool:
+        return not (self.subscription.deltas and message.get("type") in DELTA_TYPES)
+
+    async def deliver(self, frame: str):
+        if self.closed:
+            raise ConnectionError("SSE client disconnected")
+        if len(self._pending) >= self.max_pending:
+            self.close()
+            raise ConnectionError(f"SSE client fell {self.max_pending} events behind")
+        self._pending.append(frame)
+        self._ready.set()
+
+    async def drain(self, timeout: float) -> Optional[str]:
+        """Every pending frame as one chunk; None when nothing arrived within ``timeout`` seconds."""
+        if not self._pending and not self.closed:
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        self._ready.clear()
+        chunk = "".join(self._pending)
+        self._pending.clear()
+        return chunk
+
+    def close(self):
+        self.closed = True
+        self._ready.set()
+
+
+class SubscriptionIndex:
+    """Connected clients indexed by one filter value each, for routing attributed events.
+
+    A filtered client is filed under every value of its anchor dimension (the
+    first of FILTER_DIMENSIONS it filters on); unfiltered clients sit in one
+    set. An event's candidates are the unfiltered clients plus the clients
+    filed under its own attribute values, and only those are checked against
+    their full filters, so fan-out cost follows the matching subscribers rather
+    than the number of connections. Changes happen on the event loop, between
+    broadcasts.
+    """
+
+    def __init__(self):
+        self._clients: Dict[int, StreamClient] = {}
+        self._unfiltered: set = set()
+        self._anchored: Dict[str, Dict[str, set]] = {dimension: {} for dimension in FILTER_DIMENSIONS}
+        self._filed: Dict[int, Optional[tuple]] = {}
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+    def __iter__(self):
+        return iter(list(self._clients.values()))
+
+    def __contains__(self, client: StreamClient) -> bool:
+        return id(client) in self._clients
+
+    def add(self, client: StreamClient):
+        self._clients[id(client)] = client
+        self._file(client)
+
+    def remove(self, client: StreamClient):
+        if self._clients.pop(id(client), None) is not None:
+            self._unfile(client)
+
+    def update(self, client: StreamClient):
+        """Re-file a client after its filters changed."""
+        if id(client) in self._clients:
+            self._unfile(client)
+            self._file(client)
+
+    def _file(self, client: StreamClient):
+        anchor = client.subscription.anchor()
+        self._filed[id(client)] = anchor
+        if anchor is None:
+            self._unfiltered.add(id(client))
+            return
+        dimension, values = anchor
+        for value in values:
+            self._anchored[dimension].setdefault(value, set()).add(id(client))
+
+    def _unfile(self, client: StreamClient):
+        anchor = self._filed.pop(id(client), None)
+        if anchor is None:
+            self._unfiltered.discard(id(client))
+            return
+        dimension, values = anchor
+        for value in values:
+            bucket = self._anchored[dimension].get(value)
+            if bucket is not None:
+                bucket.discard(id(client))
+                if not bucket:
+                    del self._anchored[dimension][value]
+
+    def match(self, attributes: Optional[Dict[str, Any]] = None) -> List[StreamClient]:
+        """Clients whose filters accept an event; every client when the event has no attributes."""
+        if attributes is None:
+            return list(self._clients.values())
+        candidates = set(self._unfiltered)
+        for dimension, value in attributes.items():
+            if value is not None and dimension in self._anchored:
+                candidates |= self._anchored[dimension].get(_norm(value), set())
+        matched = []
+        for client_id in candidates:
+            client = self._clients[client_id]
+            if client.subscription.matches(attributes):
+                matched.append(client)
+        return matched
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "clients": len(self._clients),
+            "unfiltered": len(self._unfiltered),
+            "anchors": {dimension: {value: len(ids) for value, ids in values.items()}
+                        for dimension, values in self._anchored.items() if values},
+        }
@@ -0,0 +1,165 @@
+"""Tests for the event bus backends, the bus follower and leader forwarding."""
+
+import time
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from event_bus import BusFollower, ForwardToLeader, MemoryEventBus, open_bus, run_request
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def bus_url(request, tmp_path):
+    return "memory://" if request.param == "memory" else f"sqlite:///{tmp_path / 'bus.db'}"
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_publish_and_read_in_order(bus_url):
+    bus = open_bus(bus_url)
+    assert bus.last_id() == 0 and bus.oldest_id() == 1
+    ids = [bus.publish({"n": number}, {"kind": "log"} if number % 2 else None, origin="a") for number in range(10)]
+    assert ids == sorted(ids) and len(set(ids)) == 10
+    assert bus.last_id() == ids[-1]
+
+    events = bus.read(0, limit=4)
+    assert [event["message"]["n"] for event in events] == [0, 1, 2, 3]
+    assert events[1] == {"id": ids[1], "origin": "a", "message": {"n": 1}, "attributes": {"kind": "log"}}
+    assert events[0]["attributes"] is None
+    assert [event["id"] for event in bus.read(ids[6])] == ids[7:]
+    assert bus.read(ids[-1]) == []
+    bus.close()
+
+
+def test_retention_trims_the_oldest_events(tmp_path):
+    memory = MemoryEventBus(retain=10)
+    for number in range(25):
+        memory.publish({"n": number})
+    assert memory.oldest_id() == 16
+    assert [event["id"] for event in memory.read(0, limit=3)] == [16, 17, 18]
+
+    sqlite = open_bus(f"sqlite:///{tmp_path / 'bus.db'}", retain=10)
+    for number in range(1000):  # trimmed every 1000 publishes
+        sqlite.publish({"n": number})
+    assert sqlite.oldest_id() == 991
+    assert sqlite.last_id() == 1000
+    sqlite.close()
+
+
+def test_follower_counts_events_lost_to_retention():
+    bus = MemoryEventBus(retain=10)
+    for number in range(25):
+        bus.publish({"n": number})
+    received = []
+    follower = BusFollower(bus, received.extend, poll_interval=0.01, batch_size=4)
+    follower.start()
+    assert wait_for(lambda: follower.position == 25)
+    bus.publish({"n": 25})
+    assert wait_for(lambda: follower.position == 26)
+    follower.stop()
+
+    assert [event["message"]["n"] for event in received] == list(range(15, 26))
+    assert follower.stats["lost"] == 15
+    assert follower.status()["lag"] == 0
+
+
+def test_follower_retries_a_batch_its_handler_rejected():
+    bus = MemoryEventBus()
+    bus.publish({"n": 0})
+    calls = []
+
+    def handler(events):
+        calls.append([event["id"] for event in events])
+        if len(calls) == 1:
+            raise RuntimeError("store unavailable")
+
+    follower = BusFollower(bus, handler, poll_interval=0.01)
+    follower._stop.wait = lambda timeout: None  # skip the error back-off
+    follower.start()
+    assert wait_for(lambda: follower.position == 1)
+    follower.stop()
+    assert calls[:2] == [[1], [1]]
+    assert follower.stats["errors"] == 1
+
+
+def test_lease_is_exclusive_and_renewed(bus_url):
+    first = open_bus(bus_url)
+    # Two instances on one SQLite file; the memory bus is shared in-process
+    second = first if bus_url == "memory://" else open_bus(bus_url)
+    assert first.try_lead("a", ttl=0.3)
+    assert not second.try_lead("b", ttl=0.3)
+    acquired = first.leader()["acquired"]
+
+    time.sleep(0.15)
+    assert first.try_lead("a", ttl=0.3)  # renewal keeps the original acquisition time
+    lease = second.leader()
+    assert lease["holder"] == "a" and lease["acquired"] == acquired
+    time.sleep(0.2)
+    assert not second.try_lead("b", ttl=0.3)  # the renewal outlived the first ttl
+
+    time.sleep(0.35)
+    assert first.leader() is None
+    assert second.try_lead("b", ttl=0.3)
+    assert first.leader()["holder"] == "b"
+    first.close()
+    second.close()
+
+
+def test_resign_hands_the_lease_over_at_once(bus_url):
+    bus = open_bus(bus_url)
+    assert bus.try_lead("a", ttl=60)
+    bus.resign("b")  # only the holder can resign
+    assert bus.leader()["holder"] == "a"
+    bus.resign("a")
+    assert bus.leader() is None
+    assert bus.try_lead("b", ttl=60)
+    bus.close()
+
+
+def test_open_bus_rejects_unknown_schemes():
+    with pytest.raises(ValueError):
+        open_bus("kafka://broker:9092")
+
+
+def test_forwarded_write_round_trips_through_the_leader():
+    leader = FastAPI()
+
+    @leader.post("/tickets/{ticket_id}/close")
+    async def close_ticket(ticket_id: str, request: Request, reason: str = ""):
+        return {"answered_by": "leader", "ticket_id": ticket_id, "reason": reason,
+                "body": (await request.json())["note"]}
+
+    forwarded = []
+
+    async def forward(request):
+        forwarded.append(request)
+        return await run_request(leader, request) if request["path"].startswith("/tickets") else None
+
+    follower = FastAPI()
+
+    @follower.get("/health")
+    def health():
+        return {"answered_by": "follower"}
+
+    follower.add_middleware(ForwardToLeader, should_forward=lambda scope: scope["method"] != "GET",
+                            forward=forward)
+    client = TestClient(follower)
+
+    response = client.post("/tickets/TKT-7/close?reason=fixed", json={"note": "restarted node"})
+    assert response.status_code == 200
+    assert response.json() == {"answered_by": "leader", "ticket_id": "TKT-7", "reason": "fixed",
+                               "body": "restarted node"}
+    assert forwarded[0]["method"] == "POST" and forwarded[0]["query"] == "reason=fixed"
+
+    assert client.get("/health").json() == {"answered_by": "follower"}
+    assert len(forwarded) == 1
+
+    unanswered = client.post("/other", json={})
+    assert unanswered.status_code == 503
+    assert unanswered.json() == {"detail": "No leader instance answered"}
@@ -0,0 +1,60 @@
+"""Tests for the resumable stream event journal."""
+
+import pytest
+
+from event_journal import EventJournal
+
+
+def test_since_returns_events_after_seq():
+    journal = EventJournal(capacity=10, first_seq=100)
+    for number in range(5):
+        assert journal.append({"n": number}) == 100 + number
+    assert [seq for seq, _, _ in journal.since(101)] == [102, 103, 104]
+    assert journal.since(104) == []
+    assert journal.last_seq == 104
+
+
+def test_gap_and_future_seq_return_none():
+    journal = EventJournal(capacity=3, first_seq=1)
+    for number in range(6):
+        journal.append({"n": number})
+    assert journal.oldest_seq() == 3
+    assert journal.since(1) is None
+    assert [seq for seq, _, _ in journal.since(3)] == [4, 5, 6]
+    assert journal.since(50) is None
+    assert journal.stats["gaps"] == 2
+
+
+def test_upstream_numbers_must_increase():
+    journal = EventJournal(capacity=10, first_seq=1)
+    journal.append({"n": 1}, seq=5)
+    journal.append({"n": 2}, seq=9)
+    assert [seq for seq, _, _ in journal.since(5)] == [9]
+    with pytest.raises(ValueError):
+        journal.append({"n": 3}, seq=9)
+
+
+def test_spilled_events_survive_a_clean_restart(tmp_path):
+    spill = str(tmp_path / "journal")
+    journal = EventJournal(capacity=2, spill_dir=spill, segment_events=3, first_seq=1)
+    for number in range(8):
+        journal.append({"n": number}, {"type": "new_log"})
+    assert [message["n"] for _, message, _ in journal.since(2)] == [2, 3, 4, 5, 6, 7]
+    journal.close()
+
+    reopened = EventJournal(capacity=2, spill_dir=spill, segment_events=3, first_seq=1)
+    assert reopened.next_seq == 9
+    replayed = reopened.since(0)
+    assert [seq for seq, _, _ in replayed] == list(range(1, 9))
+    assert replayed[0][2] == {"type": "new_log"}
+
+
+def test_spill_is_discarded_after_a_crash(tmp_path):
+    spill = str(tmp_path / "journal")
+    journal = EventJournal(capacity=2, spill_dir=spill, first_seq=1)
+    for number in range(5):
+        journal.append({"n": number})
+    # no close(): the clean marker is missing on the next start
+    reopened = EventJournal(capacity=2, spill_dir=spill, first_seq=100)
+    assert reopened.status()["spilled_events"] == 0
+    assert reopened.since(3) is None
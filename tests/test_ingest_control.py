@@ -0,0 +1,99 @@
+"""Tests for adaptive ingest shedding."""
+
+import threading
+
+from ingest_control import (IngestController, AnalysisWorkers, ANALYZE, CRITICAL, DEFER, NEW_SIGNATURE,
+                            SAMPLED_OUT)
+
+
+def pressured_controller(**options):
+    # One worker at 1s per analysis: a queue depth of N is an N-second backlog
+    return IngestController(workers=1, target_delay=10, overload_delay=100, initial_latency=1.0,
+                            max_sample_every=4, **options)
+
+
+def test_no_shedding_without_backlog():
+    controller = pressured_controller()
+    assert controller.decide("sig", depth=0) == NEW_SIGNATURE
+    assert controller.decide("sig", depth=0) == ANALYZE
+    assert controller.level == "normal"
+
+
+def test_repeats_are_sampled_under_pressure():
+    controller = pressured_controller()
+    controller.decide("sig", depth=0)
+    outcomes = [controller.decide("sig", depth=20) for _ in range(8)]
+    assert controller.level == "pressured"
+    assert outcomes.count(ANALYZE) == 4  # 1 in 2 at twice the target delay
+    assert outcomes.count(SAMPLED_OUT) == 4
+    assert controller.status()["shed"] == {SAMPLED_OUT: 4}
+
+
+def test_critical_and_new_signatures_are_never_shed():
+    controller = pressured_controller(critical_codes=["SECU0003"])
+    controller.decide("known", depth=0)
+    assert controller.decide("known", alert_code="SECU0003", depth=500) == CRITICAL
+    assert controller.level == "overloaded"
+    assert controller.decide("brand-new", depth=500) == NEW_SIGNATURE
+    controller.learn("DB-1", "Critical")
+    assert controller.decide("known", alert_code="DB-1", depth=500) == CRITICAL
+
+
+def test_level_falls_only_below_half_the_threshold():
+    controller = pressured_controller()
+    controller.decide("sig", depth=15)
+    assert controller.level == "pressured"
+    controller.decide("sig", depth=7)
+    assert controller.level == "pressured"
+    controller.decide("sig", depth=4)
+    assert controller.level == "normal"
+
+
+def test_info_events_are_deferred_and_released_when_normal():
+    controller = pressured_controller(deferred_size=2)
+    controller.decide("info", level="INFO", depth=0)
+    assert controller.decide("info", level="INFO", depth=20) == DEFER
+    assert controller.defer("a") is None
+    assert controller.defer("b") is None
+    assert controller.defer("c") == "a"  # oldest dropped to make room
+    assert controller.release(depth=1) is None  # the only worker is busy
+    assert controller.release(depth=0) == "b"  # idle again, so the level drops back to normal
+    assert controller.level == "normal"
+    assert controller.release(depth=0) == "c"
+    assert controller.release(depth=0) is None
+    assert controller.status()["shed"]["deferred_dropped"] == 1
+
+
+def test_disabled_controller_analyses_everything():
+    controller = pressured_controller(enabled=False)
+    controller.decide("sig", depth=0)
+    assert all(controller.decide("sig", level="INFO", depth=500) == ANALYZE for _ in range(5))
+
+
+def test_pace_stretches_with_backlog():
+    controller = pressured_controller()
+    assert controller.pace(3) == 3
+    controller.decide("sig", depth=20)
+    assert controller.pace(3) == 9
+    controller.decide("sig", depth=10000)
+    assert controller.pace(3, limit=10) == 30
+
+
+def test_analysis_workers_run_items_and_call_after():
+    handled, after_calls = [], []
+    done = threading.Event()
+
+    def handler(item):
+        handled.append(item)
+        if len(handled) == 5:
+            done.set()
+
+    workers = AnalysisWorkers(handler, workers=2, max_size=10, after=lambda: after_calls.append(1))
+    workers.start()
+    for item in range(5):
+        workers.submit(item)
+    assert done.wait(5)
+    workers.stop()
+    assert sorted(handled) == [0, 1, 2, 3, 4]
+    assert len(after_calls) == 5
+    assert workers.depth() == 0
@@ -0,0 +1,152 @@
+"""Tests for the inverted log search index."""
+
+import random
+from datetime import datetime, timedelta
+
+import log_search
+from log_search import LogSearchIndex, BLOCK_SIZE, extract_terms, parse_time
+
+BASE = datetime(2026, 1, 1)
+WORDS = ["error", "failed", "service", "timeout", "connection", "cache", "retry"] + [f"w{n}" for n in range(40)]
+
+
+def build_index(count, segment_size=500, shuffle_every=0, seed=3):
+    random.seed(seed)
+    index = LogSearchIndex(segment_size=segment_size)
+    docs = []
+    for number in range(count):
+        line = " ".join(random.sample(WORDS, 4))
+        stamp = BASE + timedelta(seconds=number)
+        if shuffle_every and number % shuffle_every == 0:
+            stamp -= timedelta(hours=1)
+        code = random.choice([None, "CONN-1001", "PEGA0001"])
+        index.add(line, stamp.isoformat(), number, code)
+        docs.append((extract_terms(line, code), stamp.timestamp(), number))
+    return index, docs
+
+
+def expected_refs(docs, terms, since=None, until=None):
+    # Every generated line has four words, so ranking reduces to recency
+    matches = [(stamp, ref) for doc_terms, stamp, ref in docs
+               if all(term in doc_terms for term in terms)
+               and (since is None or stamp >= since.timestamp())
+               and (until is None or stamp < until.timestamp())]
+    return [ref for stamp, ref in sorted(matches, reverse=True)]
+
+
+def check(index, docs, query, terms, since=None, until=None, limit=15, offset=4):
+    result = index.search(query, since=since.isoformat() if since else None,
+                          until=until.isoformat() if until else None, limit=limit, offset=offset)
+    expected = expected_refs(docs, terms, since, until)
+    assert result["total"] == len(expected), query
+    assert [hit["ref"] for hit in result["hits"]] == expected[offset:offset + limit], query
+
+
+def test_extract_terms_indexes_words_and_fields():
+    terms = extract_terms("Rule not found: MyActivity at http-nio-8080-exec-3 calling /api/v1/cases", "CONN-1001")
+    assert {"rule", "found", "code:conn-1001", "thread:http-nio-8080-exec-3", "rule:myactivity",
+            "endpoint:/api/v1/cases"} <= terms
+
+
+def test_every_term_must_match():
+    index, docs = build_index(3000)
+    check(index, docs, "error failed", ["error", "failed"])
+    check(index, docs, "error failed service", ["error", "failed", "service"])
+    check(index, docs, "code:CONN-1001 timeout", ["code:conn-1001", "timeout"])
+    check(index, docs, "PEGA0001", ["code:pega0001"])
+    check(index, docs, "cache", ["cache"])
+    assert index.search("nosuchword")["total"] == 0
+
+
+def test_query_without_terms_matches_nothing():
+    index, _ = build_index(200)
+    for query in ("", "a b", "  - 42 "):
+        result = index.search(query)
+        assert result["total"] == 0 and result["hits"] == []
+
+
+def test_time_window_bounds_hits():
+    index, docs = build_index(3000)
+    since, until = BASE + timedelta(seconds=700), BASE + timedelta(seconds=2100)
+    check(index, docs, "error failed", ["error", "failed"], since=since, until=until)
+    check(index, docs, "retry", ["retry"], since=since)
+    check(index, docs, "code:PEGA0001", ["code:pega0001"], until=until)
+
+
+def test_out_of_order_lines_still_match_the_window():
+    index, docs = build_index(3000, shuffle_every=7)
+    since, until = BASE + timedelta(seconds=900), BASE + timedelta(seconds=2500)
+    check(index, docs, "error", ["error"], since=since, until=until)
+    check(index, docs, "CONN-1001", ["code:conn-1001"], since=since)
+
+
+def test_shorter_matching_lines_rank_higher():
+    index = LogSearchIndex()
+    stamp = BASE.isoformat()
+    for number in range(50):
+        index.add(f"filler entry w{number % 7}", stamp, f"filler{number}")
+    index.add("connection timeout to service w1 w2 w3 w4 w5", stamp, "long")
+    index.add("connection timeout", stamp, "short")
+    index.add("connection timeout on node w6", stamp, "medium")
+    hits = index.search("connection timeout")["hits"]
+    assert [hit["ref"] for hit in hits] == ["short", "medium", "long"]
+    assert hits[0]["score"] > hits[1]["score"] > hits[2]["score"]
+
+
+def test_recency_breaks_ties_and_decays():
+    index = LogSearchIndex()
+    for hours in (48, 0, 12):
+        index.add("service failed", (BASE + timedelta(hours=hours)).isoformat(), hours)
+    hits = index.search("service failed")["hits"]
+    assert [hit["ref"] for hit in hits] == [48, 12, 0]
+    assert hits[0]["score"] - hits[1]["score"] > hits[1]["score"] - hits[2]["score"] > 0
+
+
+def test_pages_past_the_rank_window_continue_newest_first(monkeypatch):
+    monkeypatch.setattr(log_search, "RANK_WINDOW", 10)
+    index = LogSearchIndex(segment_size=8)
+    for number in range(30):
+        index.add("cache miss" + (" extra words" * (number % 3)), (BASE + timedelta(seconds=number)).isoformat(), number)
+    first = [hit["ref"] for hit in index.search("cache miss", limit=10)["hits"]]
+    assert sorted(first) == list(range(20, 30))
+    later = [hit["ref"] for hit in index.search("cache miss", limit=10, offset=10)["hits"]]
+    assert later == list(reversed(range(10, 20)))
+
+
+def test_long_posting_lists_span_blocks():
+    index = LogSearchIndex(segment_size=10000)
+    for number in range(BLOCK_SIZE * 5 + 3):
+        index.add("common" + (" rare" if number % 97 == 0 else ""), None, number)
+    assert index.search("common", limit=1)["total"] == BLOCK_SIZE * 5 + 3
+    rare = index.search("common rare", limit=100)
+    assert [hit["ref"] for hit in rare["hits"]] == [n for n in reversed(range(BLOCK_SIZE * 5 + 3)) if n % 97 == 0]
+
+
+def test_oldest_segment_is_dropped_past_max_docs():
+    index = LogSearchIndex(segment_size=100, max_docs=250)
+    for number in range(400):
+        index.add(f"line alpha{number % 2}", None, number)
+    assert len(index) <= 250
+    result = index.search("line", limit=1)
+    assert result["total"] == len(index)
+    assert result["hits"][0]["ref"] == 399
+    assert index._doc_freq["line"] == len(index)
+
+
+def test_backfill_is_indexed_before_submitted_lines():
+    backfill = [(f"old entry {number}", (BASE + timedelta(seconds=number)).isoformat(), number, None)
+                for number in range(50)]
+    index = LogSearchIndex(segment_size=1000, backfill=iter(backfill))
+    index.submit("new entry", (BASE + timedelta(hours=1)).isoformat(), "live")
+    index.flush()
+    hits = index.search("entry", limit=100)["hits"]
+    assert [hit["ref"] for hit in hits] == ["live"] + list(reversed(range(50)))
+    assert index._segments[0].ordered
+    index.close()
+
+
+def test_parse_time_accepts_relative_windows():
+    now = datetime(2026, 1, 2, 12, 0)
+    assert parse_time("24h", now) == (now - timedelta(hours=24)).timestamp()
+    assert parse_time("2026-01-01T00:00:00") == datetime(2026, 1, 1).timestamp()
+    assert parse_time(None) is None
@@ -0,0 +1,111 @@
+"""Tests for the cursor-based in-memory query index."""
+
+import random
+
+from query_index import IndexedCollection, parse_filter
+
+
+def make_collection(max_items=1000):
+    return IndexedCollection("logs", {
+        "level": lambda entry: entry.get("level"),
+        "code": lambda entry: entry.get("code"),
+    }, max_items=max_items, identity_fields=("name",))
+
+
+def add_entries(collection, count, levels=("INFO", "ERROR")):
+    for number in range(count):
+        collection.add({"name": f"entry-{number}", "level": levels[number % len(levels)],
+                        "code": f"C{number % 3}", "timestamp": f"2026-01-01T00:{number // 60:02d}:{number % 60:02d}"})
+
+
+def test_newest_page_without_cursor():
+    collection = make_collection()
+    add_entries(collection, 10)
+    page = collection.query(limit=3)
+    assert [item["id"] for item in page["items"]] == [8, 9, 10]
+    assert page["has_more"] is True
+    assert page["next_cursor"] == 10
+
+
+def test_cursor_walks_forward_through_filtered_items():
+    collection = make_collection()
+    add_entries(collection, 20)
+    seen, cursor = [], 0
+    while True:
+        page = collection.query(since_id=cursor, filters={"level": ["ERROR"]}, limit=4)
+        seen.extend(item["id"] for item in page["items"])
+        cursor = page["next_cursor"]
+        if not page["has_more"]:
+            break
+    assert seen == list(range(2, 21, 2))
+    assert collection.query(since_id=cursor, filters={"level": ["ERROR"]})["items"] == []
+
+
+def test_since_timestamp_starts_after_the_timestamp():
+    collection = make_collection()
+    add_entries(collection, 5)
+    page = collection.query(since_timestamp="2026-01-01T00:00:02")
+    assert [item["id"] for item in page["items"]] == [4, 5]
+
+
+def test_filters_match_brute_force_after_eviction():
+    random.seed(7)
+    collection = make_collection(max_items=50)
+    entries = []
+    for number in range(400):
+        entry = {"level": random.choice(["INFO", "WARN", "ERROR"]), "code": random.choice(["A", "B", "C", "D"])}
+        collection.add(dict(entry))
+        entries.append(entry)
+    live = list(range(351, 401))
+    filters = {"level": ["ERROR", "WARN"], "code": ["A", "C"]}
+    expected = [item_id for item_id in live
+                if entries[item_id - 1]["level"] in filters["level"] and entries[item_id - 1]["code"] in filters["code"]]
+    page = collection.query(since_id=0, filters=filters, limit=len(live))
+    assert [item["id"] for item in page["items"]] == expected
+    newest = collection.query(filters=filters, limit=3, newest_first=True)
+    assert [item["id"] for item in newest["items"]] == expected[::-1][:3]
+    assert len(collection) == 50
+    assert sum(collection.counts("level").values()) == 50
+
+
+def test_update_moves_item_between_buckets_and_feeds_changes():
+    collection = make_collection()
+    add_entries(collection, 4)
+    version = collection.version
+    collection.update(1, {"level": "ERROR"})
+    assert [item["id"] for item in collection.query(since_id=0, filters={"level": ["ERROR"]})["items"]] == [1, 2, 4]
+    changes = collection.changes_since(version)
+    assert [item["id"] for item in changes["items"]] == [1]
+    assert changes["next_version"] == collection.version
+
+
+def test_filtered_change_feed_reports_items_leaving_the_filter():
+    collection = make_collection()
+    add_entries(collection, 2)
+    version = collection.version
+    collection.update(2, {"level": "INFO"})
+    changes = collection.changes_since(version, filters={"level": ["ERROR"]})
+    assert changes["items"] == [{"id": 2, "name": "entry-1", "removed": True}]
+    assert collection.changes_since(version, filters={"level": ["WARN"]})["items"] == []
+
+
+def test_change_feed_pages_by_version():
+    collection = make_collection()
+    add_entries(collection, 5)
+    first = collection.changes_since(0, limit=2)
+    assert [item["id"] for item in first["items"]] == [1, 2]
+    assert first["has_more"] is True
+    rest = collection.changes_since(first["next_version"], limit=10)
+    assert [item["id"] for item in rest["items"]] == [3, 4, 5]
+
+
+def test_find_first_returns_newest_match():
+    collection = make_collection()
+    add_entries(collection, 6)
+    assert collection.find_first("code", "C0")["id"] == 4
+    assert collection.find_first("code", "missing") is None
+
+
+def test_parse_filter():
+    assert parse_filter(" ERROR, WARN ,,") == ["ERROR", "WARN"]
+    assert parse_filter(None) == []
@@ -0,0 +1,91 @@
+"""Tests for the self-heal executor's deduplication and circuit breaker."""
+
+import json
+import threading
+
+from self_heal import HealAction, QueueAction, SelfHealExecutor, load_actions
+
+
+class FailingAction(HealAction):
+    type = "fail"
+
+    def run(self, context):
+        raise RuntimeError("service still down")
+
+
+def _escalating_callback(tickets, escalating, release):
+    """Stand-in for finish_self_heal: open a ticket unless the primary already did."""
+    def callback(result):
+        if result.get("deduplicated") and result.get("primary_outcome"):
+            return result["primary_outcome"]
+        escalating.set()
+        release.wait(5)
+        tickets.append(f"TKT-{len(tickets) + 1}")
+        return tickets[-1]
+    return callback
+
+
+def test_duplicate_during_escalation_reuses_primary_ticket():
+    executor = SelfHealExecutor({"restart": FailingAction("restart")}, max_workers=2)
+    tickets, results = [], []
+    escalating, release, done = threading.Event(), threading.Event(), threading.Event()
+    callback = _escalating_callback(tickets, escalating, release)
+
+    executor.submit("restart", "E1", "E1:node1", {}, callback)
+    assert escalating.wait(5)  # primary future finished, its callback is mid-escalation
+    executor.submit("restart", "E1", "E1:node1", {},
+                    lambda result: (results.append(result), done.set(), callback(result))[-1])
+    assert not done.is_set()
+    release.set()
+    assert done.wait(5)
+
+    assert tickets == ["TKT-1"]
+    assert results[0]["deduplicated"] is True
+    assert results[0]["primary_outcome"] == "TKT-1"
+    assert results[0]["ok"] is False
+    executor.shutdown()
+
+
+def test_duplicate_after_settle_is_answered_inline():
+    executor = SelfHealExecutor({"restart": FailingAction("restart")}, max_workers=1)
+    executor.submit("restart", "E1", "E1:node1", {}, lambda result: "TKT-9")
+    executor._inflight["E1:node1"][1]["future"].result(5)  # the worker returns once the run is settled
+
+    results = []
+    executor.submit("restart", "E1", "E1:node1", {}, results.append)
+    assert results[0]["primary_outcome"] == "TKT-9"
+    assert executor.status()["deduplicated"] == 1
+    executor.shutdown()
+
+
+def test_circuit_opens_after_repeated_failures():
+    executor = SelfHealExecutor({"restart": FailingAction("restart")}, max_workers=1,
+                                dedupe_window=0, failure_threshold=2)
+    for attempt in range(2):
+        finished = threading.Event()
+        executor.submit("restart", "E1", f"E1:{attempt}", {}, lambda result: finished.set())
+        assert finished.wait(5)
+
+    results = []
+    executor.submit("restart", "E1", "E1:2", {}, results.append)
+    assert results[0]["circuit_open"] is True
+    assert executor.status()["short_circuited"] == 1
+    executor.shutdown()
+
+
+def test_sample_config_maps_every_self_healable_kedb_entry(tmp_path):
+    actions, mapping = load_actions("self_heal_actions.json")
+    with open("kebd.json", "r", encoding="utf-8") as f:
+        healable = {entry["error"].upper() for entry in json.load(f) if entry.get("self_healable")}
+    assert set(mapping) == healable
+    assert set(mapping.values()) <= set(actions)
+
+    action = actions[mapping["SECU0001"]]
+    assert isinstance(action, QueueAction)
+    action.spool_path = str(tmp_path / "queue.jsonl")
+    action.run({"fix": "Block malicious IP", "kedb_error": "SECU0001", "alert_code": "SECU0001",
+                "signature": "sig", "log_line": "XSS blocked"})
+    with open(action.spool_path, "r", encoding="utf-8") as f:
+        spooled = json.loads(f.readline())
+    assert spooled["queue"] == "pega.remediation.security"
+    assert spooled["message"]["fix"] == "Block malicious IP"
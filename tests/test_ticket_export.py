@@ -0,0 +1,133 @@
+"""Tests for the ticket outbox and exporter against the mock ITSM."""
+
+import random
+import time
+
+import pytest
+
+from mock_itsm import MockITSMServer
+from ticket_export import HttpTicketSink, TicketExporter, TicketOutbox
+
+
+@pytest.fixture
+def itsm():
+    server = MockITSMServer(port=0)
+    server.start_background()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def tickets(count, start=0):
+    return [{"ticket_id": f"TKT-{number}", "anomaly": f"anomaly {number}", "severity": "High"}
+            for number in range(start, start + count)]
+
+
+def make_exporter(itsm, tmp_path, path="/api/tickets/batch", **kwargs):
+    outbox = TicketOutbox(str(tmp_path / "outbox.db"))
+    return TicketExporter(HttpTicketSink(itsm.url, path=path), outbox, **kwargs)
+
+
+def test_drains_in_batches_and_reports_references(itsm, tmp_path):
+    exported = {}
+    exporter = make_exporter(itsm, tmp_path, batch_size=50, on_exported=exported.update)
+    for ticket in tickets(120):
+        exporter.submit(ticket)
+
+    assert [exporter._drain_once() for _ in range(4)] == [50, 50, 20, 0]
+    assert itsm.batches == 3
+    assert set(itsm.tickets) == {f"TKT-{number}" for number in range(120)}
+    assert exported == {ticket_id: ticket["external_id"] for ticket_id, ticket in itsm.tickets.items()}
+    assert exporter.status()["outbox"] == {}
+    assert exporter.stats["exported"] == 120
+    exporter.stop()
+
+
+def test_failed_batch_backs_off_then_retries(itsm, tmp_path):
+    itsm.fail_rate = 1.0
+    exporter = make_exporter(itsm, tmp_path, base_backoff=10.0, max_backoff=15.0)
+    for ticket in tickets(3):
+        exporter.submit(ticket)
+
+    before = time.time()
+    assert exporter._drain_once() == 0
+    rows = exporter.outbox._conn.execute("SELECT attempts, next_attempt, last_error FROM outbox").fetchall()
+    assert [attempts for attempts, _, _ in rows] == [1, 1, 1]
+    assert all(before + 5 <= next_attempt <= time.time() + 15 for _, next_attempt, _ in rows)
+    assert rows[0][2] == "HTTP 503"
+    assert exporter.outbox.due(10) == []  # nothing is due until the backoff expires
+
+    itsm.fail_rate = 0.0
+    exporter.outbox._conn.execute("UPDATE outbox SET next_attempt = 0")
+    assert exporter._drain_once() == 3
+    assert exporter.stats["failed_batches"] == 1
+    assert len(itsm.tickets) == 3
+    exporter.stop()
+
+
+def test_tickets_are_dead_lettered_after_max_attempts(itsm, tmp_path):
+    itsm.fail_rate = 1.0
+    exporter = make_exporter(itsm, tmp_path, max_attempts=3, base_backoff=0.0)
+    for ticket in tickets(2):
+        exporter.submit(ticket)
+
+    for _ in range(3):
+        exporter._drain_once()
+    assert exporter.status()["outbox"] == {"dead": 2}
+    assert exporter.stats["dead_lettered"] == 2
+    assert itsm.failures == 3
+
+    itsm.fail_rate = 0.0
+    assert exporter.outbox.requeue_dead() == 2
+    assert exporter._drain_once() == 2
+    assert exporter.status()["outbox"] == {}
+    exporter.stop()
+
+
+def test_rejected_batch_is_dead_lettered_without_retry(itsm, tmp_path):
+    exporter = make_exporter(itsm, tmp_path, path="/api/unknown")
+    exporter.submit(tickets(1)[0])
+    exporter._drain_once()
+    assert exporter.status()["outbox"] == {"dead": 1}
+    assert exporter.stats["last_error"].startswith("HTTP 404")
+    exporter.stop()
+
+
+def test_outbox_survives_a_restart(itsm, tmp_path):
+    itsm.fail_rate = 1.0
+    exporter = make_exporter(itsm, tmp_path, base_backoff=0.0)
+    for ticket in tickets(5):
+        exporter.submit(ticket)
+    exporter._drain_once()
+    exporter.stop()  # nothing delivered; all five stay in the outbox
+
+    itsm.fail_rate = 0.0
+    restarted = make_exporter(itsm, tmp_path, flush_interval=0.05)
+    assert restarted.status()["outbox"] == {"pending": 5}
+    restarted.start()
+    deadline = time.time() + 5
+    while len(itsm.tickets) < 5 and time.time() < deadline:
+        time.sleep(0.02)
+    restarted.stop()
+    assert set(itsm.tickets) == {f"TKT-{number}" for number in range(5)}
+    assert TicketOutbox(str(tmp_path / "outbox.db")).counts() == {}
+
+
+def test_flaky_itsm_receives_every_ticket_once(itsm, tmp_path):
+    random.seed(7)
+    itsm.fail_rate = 0.5
+    exported = {}
+    exporter = make_exporter(itsm, tmp_path, batch_size=10, flush_interval=0.01, max_attempts=50,
+                             base_backoff=0.001, max_backoff=0.01, on_exported=exported.update)
+    exporter.start()
+    for ticket in tickets(60):
+        exporter.submit(ticket)
+    deadline = time.time() + 10
+    while exporter.outbox.counts() and time.time() < deadline:
+        time.sleep(0.02)
+    exporter.stop()
+
+    assert itsm.failures > 0
+    assert len(itsm.tickets) == 60
+    assert len(set(ticket["external_id"] for ticket in itsm.tickets.values())) == 60
+    assert set(exported) == set(itsm.tickets)
@@ -0,0 +1,38 @@
+"""Tests for the ticket write-ahead log."""
+
+from ticket_wal import TicketWAL, read_ticket_wal
+
+
+def test_append_replay_and_reset(tmp_path):
+    path = str(tmp_path / "tickets.wal")
+    wal = TicketWAL(path, fsync=False)
+    wal.append([{"ticket_id": "TKT-1", "ticket": {"ticket_id": "TKT-1", "status": "Open"}}])
+    wal.append([{"ticket_id": "TKT-1", "changes": {"status": "Closed"}},
+                {"ticket_id": "TKT-2", "changes": {"severity": "High"}}])
+    assert len(wal) == 3
+    records = list(wal.replay())
+    assert [record["ticket_id"] for record in records] == ["TKT-1", "TKT-1", "TKT-2"]
+    assert records[1]["changes"] == {"status": "Closed"}
+    assert all("at" in record for record in records)
+
+    wal.reset()
+    assert len(wal) == 0
+    assert list(wal.replay()) == []
+    wal.append([{"ticket_id": "TKT-3", "changes": {"status": "Open"}}])
+    wal.close()
+    assert [record["ticket_id"] for record in read_ticket_wal(path)] == ["TKT-3"]
+
+
+def test_reopen_counts_records_and_repairs_torn_line(tmp_path):
+    path = tmp_path / "tickets.wal"
+    path.write_text('{"ticket_id": "TKT-1", "changes": {"status": "Closed"}}\n{"ticket_id": "TKT-2", "chan',
+                    encoding="utf-8")
+    wal = TicketWAL(str(path), fsync=False)
+    assert len(wal) == 1
+    wal.append([{"ticket_id": "TKT-3", "changes": {"status": "Open"}}])
+    wal.close()
+    assert [record["ticket_id"] for record in read_ticket_wal(str(path))] == ["TKT-1", "TKT-3"]
+
+
+def test_reading_a_missing_log_yields_nothing(tmp_path):
+    assert list(read_ticket_wal(str(tmp_path / "absent.wal"))) == []
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Ticket Export
+Durable outbox and background exporter that pushes tickets to an external ITSM
+"""
+
+import json
+import random
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Callable
+
+try:
+    import httpx
+except ImportError:  # only needed by HttpTicketSink
+    httpx = None
+
+
+class SinkError(Exception):
+    """A batch could not be delivered; ``retryable`` says whether to try again later."""
+
+    def __init__(self, message: str, retryable: bool = True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class TicketSink(ABC):
+    """Destination for exported tickets (ServiceNow, Jira, a mock...).
+
+    ``send_batch`` delivers tickets all-or-nothing and returns a mapping of
+    ticket_id to the external reference the ITSM assigned (may be empty).
+    """
+
+    name = "sink"
+
+    @abstractmethod
+    def send_batch(self, tickets: List[Dict[str, Any]]) -> Dict[str, str]:
+        """Deliver every ticket or raise SinkError."""
+
+    def close(self):
+        pass
+
+
+class HttpTicketSink(TicketSink):
+    """POSTs ticket batches as JSON over a pooled keep-alive HTTP client.
+
+    Override ``to_payload`` to map tickets onto a specific ITSM's schema.
+    """
+
+    name = "http"
+
+    def __init__(self, base_url: str, path: str = "/api/tickets/batch", token: Optional[str] = None,
+                 timeout: float = 10.0, pool_size: int = 4):
+        """Create the pooled client."""
+        if httpx is None:
+            raise ImportError("httpx is required for HTTP ticket export. Install with: pip install httpx")
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        self.path = path
+        self.client = httpx.Client(
+            base_url=base_url,
+            headers=headers,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+        )
+
+    def to_payload(self, tickets: List[Dict[str, Any]]) -> Dict[str, Any]:
+        return {"tickets": [{
+            "ticket_id": ticket.get("ticket_id"),
+            "opened_at": ticket.get("timestamp"),
+            "short_description": ticket.get("anomaly"),
+            "description": ticket.get("description"),
+            "severity": ticket.get("severity"),
+            "category": ticket.get("category"),
+            "alert_code": ticket.get("alert_code"),
+            "log_line": ticket.get("log_line"),
+        } for ticket in tickets]}
+
+    def send_batch(self, tickets: List[Dict[str, Any]]) -> Dict[str, str]:
+        try:
+            response = self.client.post(self.path, json=self.to_payload(tickets))
+        except httpx.HTTPError as e:
+            raise SinkError(f"{type(e).__name__}: {e}")
+        if response.status_code == 429 or response.status_code >= 500:
+            raise SinkError(f"HTTP {response.status_code}")
+        if response.status_code >= 400:
+            raise SinkError(f"HTTP {response.status_code}: {response.text[:200]}", retryable=False)
+        try:
+            created = response.json().get("created", [])
+            return {item["ticket_id"]: str(item["external_id"]) for item in created}
+        except (ValueError, KeyError, TypeError, AttributeError):
+            return {}
+
+    def close(self):
+        self.client.close()
+
+
+class TicketOutbox:
+    """SQLite outbox: a ticket is only forgotten once the sink has accepted it."""
+
+    def __init__(self, db_path: str = "ticket_outbox.db"):
+        """Open (or create) the outbox."""
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS outbox (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    ticket_id TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    state TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_attempt REAL NOT NULL,
+                    last_error TEXT,
+                    created_at TEXT NOT NULL
+                )""")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox (state, next_attempt)")
+
+    def put(self, ticket: Dict[str, Any]):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO outbox (ticket_id, payload, next_attempt, created_at) VALUES (?, ?, ?, ?)",
+                (ticket.get("ticket_id"), json.dumps(ticket, ensure_ascii=False, default=str),
+                 time.time(), datetime.now().isoformat()))
+
+    def due(self, limit: int) -> List[tuple]:
+        """(row id, attempts, ticket) for pending rows whose retry time has come."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, attempts, payload FROM outbox WHERE state = 'pending' AND next_attempt <= ? "
+                "ORDER BY id LIMIT ?", (time.time(), limit)).fetchall()
+        return [(row_id, attempts, json.loads(payload)) for row_id, attempts, payload in rows]
+
+    def ack(self, row_ids: List[int]):
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM outbox WHERE id = ?", [(row_id,) for row_id in row_ids])
+
+    def retry(self, row_ids: List[int], error: str, next_attempt: float):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE outbox SET attempts = attempts + 1, next_attempt = ?, last_error = ? WHERE id = ?",
+                [(next_attempt, error, row_id) for row_id in row_ids])
+
+    def dead_letter(self, row_ids: List[int], error: str):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE outbox SET state = 'dead', attempts = attempts + 1, last_error = ? WHERE id = ?",
+                [(error, row_id) for row_id in row_ids])
+
+    def requeue_dead(self) -> int:
+        """Give dead-lettered tickets another round (e.g. after fixing sink config)."""
+        with self._lock, self._conn:
+            return self._conn.execute(
+                "UPDATE outbox SET state = 'pending', attempts = 0, next_attempt = ? WHERE state = 'dead'",
+                (time.time(),)).rowcount
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT state, COUNT(*) FROM outbox GROUP BY state").fetchall()
+        return {state: count for state, count in rows}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class TicketExporter:
+    """Drains the outbox to a sink in batches on a background thread.
+
+    ``submit`` is a local SQLite insert, so the analysis path never waits on
+    the ITSM. Failed batches back off exponentially with jitter; tickets that
+    are rejected outright or exhaust ``max_attempts`` are dead-lettered.
+    """
+
+    def __init__(self, sink: TicketSink, outbox: TicketOutbox, batch_size: int = 50,
+                 flush_interval: float = 1.0, max_attempts: int = 8, base_backoff: float = 1.0,
+                 max_backoff: float = 300.0,
+                 on_exported: Optional[Callable[[Dict[str, str]], None]] = None):
+        """Create the exporter; call start() to begin draining."""
+        self.sink = sink
+        self.outbox = outbox
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.on_exported = on_exported
+        self.stats = {"exported": 0, "failed_batches": 0, "dead_lettered": 0, "last_error": None,
+                      "last_export": None}
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+
+    def start(self):
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def stop(self):
+        """Stop the worker; anything undelivered stays in the outbox for next start."""
+        self._stop.set()
+        self._wake.set()
+        if self._worker:
+            self._worker.join(timeout=15)
+        self.sink.close()
+        self.outbox.close()
+
+    def submit(self, ticket: Dict[str, Any]):
+        """Queue a ticket for export."""
+        self.outbox.put(ticket)
+        self._wake.set()
+
+    def status(self) -> Dict[str, Any]:
+        return {"sink": self.sink.name, "outbox": self.outbox.counts(), **self.stats}
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            # Keep draining while full batches are waiting
+            while not self._stop.is_set() and self._drain_once() == self.batch_size:
+                pass
+
+    def _drain_once(self) -> int:
+        batch = self.outbox.due(self.batch_size)
+        if not batch:
+            return 0
+        row_ids = [row_id for row_id, _, _ in batch]
+        try:
+            refs = self.sink.send_batch([ticket for _, _, ticket in batch])
+        except Exception as e:
+            self._handle_failure(batch, e)
+            return 0
+
+        self.outbox.ack(row_ids)
+        self.stats["exported"] += len(batch)
+        self.stats["last_export"] = datetime.now().isoformat()
+        if refs and self.on_exported:
+            try:
+                self.on_exported(refs)
+            except Exception as e:
+                print(f"⚠️ Failed to record ITSM references: {e}")
+        print(f"📤 Exported {len(batch)} tickets to {self.sink.name}")
+        return len(batch)
+
+    def _handle_failure(self, batch: List[tuple], error: Exception):
+        message = str(error)
+        self.stats["failed_batches"] += 1
+        self.stats["last_error"] = message
+        retryable = getattr(error, "retryable", True)
+        dead = [row_id for row_id, attempts, _ in batch if not retryable or attempts + 1 >= self.max_attempts]
+        retry = [(row_id, attempts) for row_id, attempts, _ in batch if row_id not in dead]
+        if dead:
+            self.outbox.dead_letter(dead, message)
+            self.stats["dead_lettered"] += len(dead)
+            print(f"❌ Dead-lettered {len(dead)} tickets: {message}")
+        if retry:
+            # Batch rows share their backoff, keyed on the most-tried ticket
+            attempts = max(attempts for _, attempts in retry)
+            delay = min(self.max_backoff, self.base_backoff * 2 ** attempts) * random.uniform(0.5, 1.5)
+            self.outbox.retry([row_id for row_id, _ in retry], message, time.time() + delay)
+            print(f"⚠️ Ticket export failed ({message}); retrying {len(retry)} tickets in {delay:.1f}s")
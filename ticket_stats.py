@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Ticket Statistics
+Incrementally maintained ticket counts by severity, status, category and day
+"""
+
+import threading
+from collections import Counter
+from typing import Dict, List, Any, Iterable, Optional
+
+# Ticket field -> summary key; "day" is derived from the timestamp
+DIMENSIONS = {
+    "severity": "by_severity",
+    "status": "by_status",
+    "category": "by_category",
+    "day": "by_day",
+}
+
+
+def ticket_keys(ticket: Dict[str, Any]) -> Dict[str, str]:
+    """The value a ticket contributes to each summary dimension."""
+    return {
+        "severity": ticket.get("severity") or "Unknown",
+        "status": ticket.get("status") or "Unknown",
+        "category": ticket.get("category") or "unknown",
+        "day": str(ticket.get("timestamp", ""))[:10] or "unknown",
+    }
+
+
+class TicketStats:
+    """Ticket counters updated on insert and on field changes.
+
+    Tickets are never deleted; a merged one stays counted under its
+    "Merged" status.
+
+    Reading a summary costs O(distinct values) instead of a scan over every
+    ticket, so dashboards and pollers can ask for it on every refresh.
+    """
+
+    def __init__(self, tickets: Optional[Iterable[Dict[str, Any]]] = None):
+        """Start from an existing ticket list (counted once)."""
+        self._lock = threading.Lock()
+        self.total = 0
+        self._counts: Dict[str, Counter] = {dimension: Counter() for dimension in DIMENSIONS}
+        for ticket in tickets or []:
+            self.add(ticket)
+
+    def add(self, ticket: Dict[str, Any]):
+        """Count a new ticket."""
+        with self._lock:
+            self.total += 1
+            for dimension, value in ticket_keys(ticket).items():
+                self._counts[dimension][value] += 1
+
+    def update(self, before: Dict[str, Any], after: Dict[str, Any]):
+        """Move a ticket between buckets after a status (or other field) change.
+
+        ``before`` only needs the fields that were counted, e.g. a copy of the
+        ticket taken before the change was applied.
+        """
+        old_keys, new_keys = ticket_keys(before), ticket_keys(after)
+        with self._lock:
+            for dimension, new_value in new_keys.items():
+                old_value = old_keys[dimension]
+                if old_value != new_value:
+                    self._decrement(dimension, old_value)
+                    self._counts[dimension][new_value] += 1
+
+    def count(self, dimension: str, value: str) -> int:
+        """Number of tickets with one value, e.g. count("severity", "Critical")."""
+        return self._counts[dimension].get(value, 0)
+
+    def summary(self, days: Optional[int] = None) -> Dict[str, Any]:
+        """All counters; ``days`` limits by_day to the most recent days."""
+        with self._lock:
+            result = {"total": self.total}
+            for dimension, key in DIMENSIONS.items():
+                result[key] = dict(self._counts[dimension])
+        if days is not None:
+            recent: List[str] = sorted(result["by_day"])[-days:] if days > 0 else []
+            result["by_day"] = {day: result["by_day"][day] for day in recent}
+        result["by_day"] = dict(sorted(result["by_day"].items()))
+        return result
+
+    def _decrement(self, dimension: str, value: str):
+        counter = self._counts[dimension]
+        counter[value] -= 1
+        if counter[value] <= 0:
+            del counter[value]
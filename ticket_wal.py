@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Ticket Write-Ahead Log
+Durable, append-only record of ticket changes between full ticket file rewrites
+"""
+
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Dict, List, Any, Iterator
+
+
+def read_ticket_wal(path: str) -> Iterator[Dict[str, Any]]:
+    """Yield the records of a ticket WAL in order without opening it for writing."""
+    if not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                print(f"⚠️ Skipping unreadable ticket WAL record in {path}")
+
+
+class TicketWAL:
+    """Append-only JSONL log of new tickets and ticket field changes.
+
+    A record holds either a whole new ticket (``{"ticket_id", "ticket"}``) or
+    absolute field values (``{"ticket_id", "changes": {"status": "Closed"}}``),
+    never deltas, so replaying a record twice is harmless. Once the full
+    ticket files have been rewritten with the current state the log is reset.
+    """
+
+    def __init__(self, path: str = "tickets.wal", fsync: bool = True):
+        """Open the log for appending."""
+        self.path = path
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self._records = sum(1 for _ in self.replay())
+        self._file = open(self.path, "a", encoding="utf-8")
+        # Terminate a torn final line so new records start on their own line
+        if self._file.tell() and not self._ends_with_newline():
+            self._file.write("\n")
+            self._file.flush()
+
+    def _ends_with_newline(self) -> bool:
+        with open(self.path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def __len__(self) -> int:
+        return self._records
+
+    def append(self, changes: List[Dict[str, Any]]):
+        """Durably append records with one write and fsync."""
+        if not changes:
+            return
+        at = datetime.now().isoformat()
+        lines = "".join(json.dumps({"at": at, **record}, ensure_ascii=False, default=str) + "\n"
+                        for record in changes)
+        with self._lock:
+            self._file.write(lines)
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            self._records += len(changes)
+
+    def replay(self) -> Iterator[Dict[str, Any]]:
+        """Yield logged records in order, skipping a torn final line."""
+        return read_ticket_wal(self.path)
+
+    def reset(self):
+        """Truncate the log after the ticket files were rewritten with every change."""
+        with self._lock:
+            self._file.truncate(0)
+            self._file.seek(0)
+            self._records = 0
+
+    def close(self):
+        """Close the log file."""
+        with self._lock:
+            self._file.close()